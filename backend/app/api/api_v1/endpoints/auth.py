@@ -6,11 +6,12 @@ from datetime import timedelta
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr, validator
 import re
 
-from app.database import get_db, User
+from app.database import get_async_db, User
 from app.services.auth_service import auth_service
 from app.services.api_key_service import api_key_service
 from app.api.deps import get_current_user, get_current_user_optional
@@ -111,14 +112,14 @@ class SettingUpdate(BaseModel):
 @router.post("/register", response_model=Token)
 async def register(
     user_data: UserRegister,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None,
     background_tasks: BackgroundTasks = None
 ):
     """Register a new user"""
     try:
         # Create user
-        user = auth_service.create_user(
+        user = await auth_service.create_user(
             db=db,
             email=user_data.email,
             password=user_data.password,
@@ -126,23 +127,23 @@ async def register(
         )
         # Update profile if full_name provided
         if user_data.full_name:
-            auth_service.update_user_profile(db, user.id, full_name=user_data.full_name)
+            await auth_service.update_user_profile(db, user.id, full_name=user_data.full_name)
         # Send verification email
         if background_tasks:
-            background_tasks.add_task(auth_service.send_verification_email, db, user)
+            background_tasks.add_task(auth_service.send_verification_email, user.id)
         else:
-            auth_service.send_verification_email(db, user)
-        # Create access token
-        access_token_expires = timedelta(minutes=auth_service.access_token_expire_minutes)
-        access_token = auth_service.create_access_token(
-            data={"sub": user.id}, expires_delta=access_token_expires
-        )
+            await auth_service.send_verification_email(user.id)
         # Create session
         ip_address = request.client.host if request else None
         user_agent = request.headers.get("user-agent") if request else None
-        session_token = auth_service.create_user_session(
+        session = await auth_service.create_user_session(
             db, user.id, ip_address, user_agent
         )
+        # Create access token bound to the session
+        access_token_expires = timedelta(minutes=auth_service.access_token_expire_minutes)
+        access_token = auth_service.create_access_token(
+            data={"sub": user.id, "sid": session.id}, expires_delta=access_token_expires
+        )
         return {
             "access_token": access_token,
             "token_type": "bearer",
@@ -158,12 +159,12 @@ async def register(
 @router.post("/login", response_model=Token)
 async def login(
     user_data: UserLogin,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None
 ):
     """Login user"""
     # Authenticate user
-    user = auth_service.authenticate_user(db, user_data.email, user_data.password)
+    user = await auth_service.authenticate_user(db, user_data.email, user_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -171,19 +172,19 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=auth_service.access_token_expire_minutes)
-    access_token = auth_service.create_access_token(
-        data={"sub": user.id}, expires_delta=access_token_expires
-    )
-    
     # Create session
     ip_address = request.client.host if request else None
     user_agent = request.headers.get("user-agent") if request else None
-    session_token = auth_service.create_user_session(
+    session = await auth_service.create_user_session(
         db, user.id, ip_address, user_agent
     )
     
+    # Create access token bound to the session
+    access_token_expires = timedelta(minutes=auth_service.access_token_expire_minutes)
+    access_token = auth_service.create_access_token(
+        data={"sub": user.id, "sid": session.id}, expires_delta=access_token_expires
+    )
+    
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -194,7 +195,7 @@ async def login(
 @router.post("/logout")
 async def logout(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None
 ):
     """Logout user"""
@@ -202,15 +203,17 @@ async def logout(
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
         token = auth_header.split(" ")[1]
-        # In a real implementation, you'd store session tokens separately
-        # For now, we'll just return success
-        return {"message": "Successfully logged out"}
+        payload = auth_service.verify_token(token)
+        if payload and payload.get("sid"):
+            # Deny the token immediately and end its session
+            await auth_service.revoke_session(db, payload["sid"], payload.get("exp"))
+    return {"message": "Successfully logged out"}
 
 # User profile endpoints
 @router.get("/profile", response_model=UserProfile)
-async def get_profile(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_profile(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get current user profile"""
-    profile = auth_service.get_user_profile(db, current_user.id)
+    profile = await auth_service.get_user_profile(db, current_user.id)
     if not profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -222,10 +225,10 @@ async def get_profile(current_user: User = Depends(get_current_user), db: Sessio
 async def update_profile(
     profile_data: UserProfileUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user profile"""
-    updated_user = auth_service.update_user_profile(
+    updated_user = await auth_service.update_user_profile(
         db, current_user.id, **profile_data.dict(exclude_unset=True)
     )
     if not updated_user:
@@ -234,17 +237,17 @@ async def update_profile(
             detail="User not found"
         )
     
-    profile = auth_service.get_user_profile(db, current_user.id)
+    profile = await auth_service.get_user_profile(db, current_user.id)
     return profile
 
 @router.post("/change-password")
 async def change_password(
     password_data: PasswordChange,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Change user password"""
-    success = auth_service.change_password(
+    success = await auth_service.change_password(
         db, current_user.id, password_data.current_password, password_data.new_password
     )
     if not success:
@@ -256,26 +259,22 @@ async def change_password(
 
 # Settings endpoints
 @router.get("/settings")
-async def get_settings(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_settings(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get user settings"""
-    from app.database import UserSettings, get_user_setting
-    
-    settings = {}
-    for setting in db.query(UserSettings).filter(UserSettings.user_id == current_user.id).all():
-        settings[setting.setting_key] = get_user_setting(db, current_user.id, setting.setting_key)
+    from app.services.settings_store import settings_store
     
-    return settings
+    return await settings_store.get_all(db, current_user.id)
 
 @router.put("/settings")
 async def update_setting(
     setting_data: SettingUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a user setting"""
-    from app.database import set_user_setting
+    from app.services.settings_store import settings_store
     
-    set_user_setting(
+    await settings_store.set(
         db, current_user.id, setting_data.key, setting_data.value, setting_data.value_type
     )
     return {"message": "Setting updated successfully"}
@@ -285,11 +284,11 @@ async def update_setting(
 async def create_api_key(
     api_key_data: APIKeyCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new API key"""
     try:
-        api_key_record = api_key_service.store_api_key(
+        api_key_record = await api_key_service.store_api_key(
             db, current_user.id, api_key_data.service_name, 
             api_key_data.key_name, api_key_data.api_key
         )
@@ -311,19 +310,19 @@ async def create_api_key(
         )
 
 @router.get("/api-keys", response_model=List[APIKeyResponse])
-async def list_api_keys(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def list_api_keys(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """List all API keys for the current user"""
-    api_keys = api_key_service.list_api_keys(db, current_user.id)
+    api_keys = await api_key_service.list_api_keys(db, current_user.id)
     return api_keys
 
 @router.get("/api-keys/{service_name}", response_model=List[APIKeyResponse])
 async def get_service_api_keys(
     service_name: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get API keys for a specific service"""
-    api_keys = api_key_service.get_service_keys(db, current_user.id, service_name)
+    api_keys = await api_key_service.get_service_keys(db, current_user.id, service_name)
     return api_keys
 
 @router.put("/api-keys/{key_id}")
@@ -331,11 +330,12 @@ async def update_api_key(
     key_id: int,
     api_key_data: APIKeyCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an existing API key"""
-    success = api_key_service.update_api_key(
-        db, current_user.id, key_id, api_key_data.api_key
+    success = await api_key_service.update_api_key(
+        db, current_user.id, key_id, api_key_data.service_name,
+        api_key_data.key_name, api_key_data.api_key
     )
     if not success:
         raise HTTPException(
@@ -348,10 +348,10 @@ async def update_api_key(
 async def delete_api_key(
     key_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete an API key"""
-    success = api_key_service.delete_api_key(db, current_user.id, key_id)
+    success = await api_key_service.delete_api_key(db, current_user.id, key_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -363,10 +363,10 @@ async def delete_api_key(
 async def deactivate_api_key(
     key_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Deactivate an API key"""
-    success = api_key_service.deactivate_api_key(db, current_user.id, key_id)
+    success = await api_key_service.deactivate_api_key(db, current_user.id, key_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -378,10 +378,10 @@ async def deactivate_api_key(
 async def activate_api_key(
     key_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Activate an API key"""
-    success = api_key_service.activate_api_key(db, current_user.id, key_id)
+    success = await api_key_service.activate_api_key(db, current_user.id, key_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -391,10 +391,10 @@ async def activate_api_key(
 
 # Usage statistics
 @router.get("/usage-stats")
-async def get_usage_stats(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_usage_stats(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get user usage statistics"""
-    usage_stats = auth_service.get_user_usage_stats(db, current_user.id)
-    api_key_stats = api_key_service.get_api_key_usage_stats(db, current_user.id)
+    usage_stats = await auth_service.get_user_usage_stats(db, current_user.id)
+    api_key_stats = await api_key_service.get_api_key_usage_stats(db, current_user.id)
     
     return {
         "generation_stats": usage_stats,
@@ -402,9 +402,9 @@ async def get_usage_stats(current_user: User = Depends(get_current_user), db: Se
     }
 
 @router.get("/verify-email")
-async def verify_email(user: str, token: str, db: Session = Depends(get_db)):
+async def verify_email(user: str, token: str, db: AsyncSession = Depends(get_async_db)):
     """Verify user email address"""
-    success = auth_service.verify_email(db, user, token)
+    success = await auth_service.verify_email(db, user, token)
     if not success:
         raise HTTPException(status_code=400, detail="Invalid or expired verification token")
     return {"message": "Email verified successfully"}
@@ -415,17 +415,17 @@ class LostPasswordRequest(BaseModel):
 @router.post("/lost-password")
 async def lost_password(
     data: LostPasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     background_tasks: BackgroundTasks = None
 ):
     """Request a password reset email"""
-    user = db.query(User).filter(User.email == data.email).first()
+    user = await db.scalar(select(User).where(User.email == data.email).limit(1))
     if not user:
         return {"message": "If the email exists, a reset link will be sent."}
     if background_tasks:
-        background_tasks.add_task(auth_service.send_password_reset_email, db, user)
+        background_tasks.add_task(auth_service.send_password_reset_email, user.id)
     else:
-        auth_service.send_password_reset_email(db, user)
+        await auth_service.send_password_reset_email(user.id)
     return {"message": "If the email exists, a reset link will be sent."}
 
 class PasswordResetRequest(BaseModel):
@@ -436,10 +436,10 @@ class PasswordResetRequest(BaseModel):
 @router.post("/reset-password")
 async def reset_password(
     data: PasswordResetRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reset password using token"""
-    success = auth_service.reset_password(db, data.user, data.token, data.new_password)
+    success = await auth_service.reset_password(db, data.user, data.token, data.new_password)
     if not success:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
     return {"message": "Password reset successfully"} 
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Progress endpoints for VeoGen
+Push job and movie progress over WebSocket or Server-Sent Events instead of status polling
+"""
+
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.api.deps import get_current_stream_user
+from app.models.user import User
+from app.services.progress_hub import progress_hub, ProgressSubscription
+from app.services.movie_project_store import movie_project_store
+
+router = APIRouter()
+
+async def _topics(user: User, movie_ids: Optional[List[str]]) -> List[str]:
+    """The user's own topic plus the listed movies they own (movie streams carry full scene content)"""
+    owners = await movie_project_store.owners(list(dict.fromkeys(movie_ids or [])))
+    owned = [
+        movie_id for movie_id, owner in owners.items()
+        # Projects created without a user are shared only while authentication is off
+        if owner == user.id or (owner is None and not settings.AUTH_REQUIRED)
+    ]
+    return [f"user:{user.id}"] + [f"movie:{movie_id}" for movie_id in owned]
+
+async def _next_batch(subscription: ProgressSubscription):
+    """Next coalesced batch, or None when the stream has been idle for a heartbeat interval"""
+    try:
+        return await asyncio.wait_for(subscription.next_batch(), timeout=settings.PROGRESS_HEARTBEAT_INTERVAL)
+    except asyncio.TimeoutError:
+        return None
+
+@router.websocket("/ws")
+async def progress_websocket(
+    websocket: WebSocket,
+    movie_ids: Optional[List[str]] = Query(None),
+    current_user: User = Depends(get_current_stream_user)
+):
+    """Stream the user's job progress (and any listed movie projects) as JSON messages"""
+    if not settings.WEBSOCKET_ENABLED:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = progress_hub.subscribe(await _topics(current_user, movie_ids))
+    try:
+        while True:
+            batch = await _next_batch(subscription)
+            await websocket.send_json({"type": "heartbeat"} if batch is None else {"type": "progress", "events": batch})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
+
+@router.get("/stream")
+async def progress_stream(
+    request: Request,
+    movie_ids: Optional[List[str]] = Query(None),
+    current_user: User = Depends(get_current_stream_user)
+):
+    """Server-Sent Events stream of the user's job progress (and any listed movie projects)"""
+    subscription = progress_hub.subscribe(await _topics(current_user, movie_ids))
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                batch = await _next_batch(subscription)
+                if batch is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in batch:
+                    yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
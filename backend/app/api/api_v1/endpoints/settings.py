@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db, User
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, User
 from app.api.deps import get_current_user, get_current_user_optional
 from app.schemas.user_settings import UserSettingsRequest, UserSettingsResponse
 from app.services.user_settings_service import UserSettingsService
@@ -10,7 +10,7 @@ router = APIRouter()
 @router.get("/", response_model=UserSettingsResponse)
 async def get_settings(
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's settings"""
     if not current_user:
@@ -18,7 +18,7 @@ async def get_settings(
         return UserSettingsResponse()
     
     try:
-        settings = UserSettingsService.get_user_settings(db, current_user.id)
+        settings = await UserSettingsService.get_user_settings(db, current_user.id)
         return settings
     except Exception as e:
         raise HTTPException(
@@ -30,7 +30,7 @@ async def get_settings(
 async def update_settings(
     settings_data: UserSettingsRequest,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user's settings"""
     if not current_user:
@@ -40,7 +40,7 @@ async def update_settings(
         )
     
     try:
-        updated_settings = UserSettingsService.update_user_settings(
+        updated_settings = await UserSettingsService.update_user_settings(
             db, current_user.id, settings_data
         )
         return updated_settings
@@ -54,7 +54,7 @@ async def update_settings(
 async def get_setting(
     setting_key: str,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific setting"""
     if not current_user:
@@ -64,7 +64,7 @@ async def get_setting(
         )
     
     try:
-        value = UserSettingsService.get_setting(db, current_user.id, setting_key)
+        value = await UserSettingsService.get_setting(db, current_user.id, setting_key)
         return {"key": setting_key, "value": value}
     except Exception as e:
         raise HTTPException(
@@ -77,7 +77,7 @@ async def set_setting(
     setting_key: str,
     value: dict,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Set a specific setting"""
     if not current_user:
@@ -90,7 +90,7 @@ async def set_setting(
         setting_value = value.get("value")
         setting_type = value.get("type", "string")
         
-        UserSettingsService.set_setting(
+        await UserSettingsService.set_setting(
             db, current_user.id, setting_key, setting_value, setting_type
         )
         
@@ -3,15 +3,21 @@ System endpoints for VeoGen
 Includes connection testing, system status, and diagnostics
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 from typing import Dict, Any
 from pydantic import BaseModel
 
+from app.config import settings
 from app.database import get_db
-from app.api.deps import get_current_user_optional
+from app.api.deps import get_current_user, get_current_user_optional, get_current_admin
 from app.models.user import User
 from app.services.connection_test_service import connection_test_service
+from app.services.tracing import tracer
+from app.services.profiler import profiler, ProfilerBusy
 
 router = APIRouter()
 
@@ -140,4 +146,53 @@ async def get_system_diagnostics(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Diagnostics failed: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.get("/traces")
+async def list_traces(
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(get_current_user)
+):
+    """Recently finished traces (their root spans), newest first"""
+    return {"traces": tracer.recent_traces(limit)}
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, current_user: User = Depends(get_current_user)):
+    """All finished spans of a trace (a running production's finished stages show up before its root span)"""
+    spans = tracer.get_trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return {"trace_id": trace_id, "spans": spans}
+
+@router.get("/profile")
+async def get_profile_status(current_user: User = Depends(get_current_admin)):
+    """State of the sampling profiler in this worker"""
+    return profiler.status()
+
+@router.post("/profile/start")
+async def start_profile(
+    seconds: float = Query(30, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    interval: float = Query(settings.PROFILER_INTERVAL, ge=0.001, le=1.0),
+    include_idle: bool = Query(False, description="Also count threads waiting in select/locks/queues"),
+    current_user: User = Depends(get_current_admin)
+):
+    """Sample every thread's stack in this worker for `seconds`; fetch the result from /profile/collapsed"""
+    try:
+        profiler.start(seconds, interval, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return profiler.status()
+
+@router.post("/profile/stop", response_class=PlainTextResponse)
+async def stop_profile(current_user: User = Depends(get_current_admin)):
+    """Stop the running profile early and return its collapsed stacks"""
+    await asyncio.to_thread(profiler.stop)
+    return PlainTextResponse(profiler.collapsed())
+
+@router.get("/profile/collapsed", response_class=PlainTextResponse)
+async def get_profile_collapsed(current_user: User = Depends(get_current_admin)):
+    """Collapsed stacks of the current or last profile (input for flamegraph.pl, speedscope or inferno)"""
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"Content-Disposition": 'attachment; filename="veogen-profile.folded"'}
+    )
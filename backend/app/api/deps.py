@@ -1,14 +1,21 @@
 # API Dependencies
 
-from typing import Generator
+from typing import Generator, Optional
+from fastapi import HTTPException, status
+from starlette.requests import HTTPConnection
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
 from app.database import SessionLocal
+from app.services.auth_service import auth_service
 
-# Mock User model for now
 class User:
-    def __init__(self, id: str = "user-1", email: str = "test@example.com"):
+    def __init__(self, id: str = "user-1", email: str = "test@example.com", username: Optional[str] = None,
+                 plan: str = "free", session_id: Optional[str] = None):
         self.id = id
         self.email = email
+        self.username = username
+        self.plan = plan
+        self.session_id = session_id
 
 async def get_db() -> Generator[AsyncSession, None, None]:
     """Get database session"""
@@ -16,14 +23,49 @@ async def get_db() -> Generator[AsyncSession, None, None]:
     # In production, this would create a real database session
     yield None
 
-async def get_current_user() -> User:
+def _bearer_token(connection: HTTPConnection, allow_query_token: bool = False) -> Optional[str]:
+    """Token from the Authorization header, or ?token= where allowed (WebSocket/EventSource clients can't set headers)"""
+    auth_header = connection.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        return auth_header[len("Bearer "):]
+    # Query strings end up in access logs and Referer headers, so only the progress streams accept them
+    return connection.query_params.get("token") if allow_query_token else None
+
+async def _authenticate(connection: HTTPConnection, allow_query_token: bool = False) -> Optional[User]:
+    token = _bearer_token(connection, allow_query_token)
+    if not token:
+        # Development mode: unauthenticated requests act as the default user
+        return None if settings.AUTH_REQUIRED else User()
+    principal = await auth_service.authenticate_token(token)
+    return User(**principal) if principal else None
+
+def _require(user: Optional[User]) -> User:
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing authentication token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return user
+
+async def get_current_user(connection: HTTPConnection) -> User:
     """Get current authenticated user"""
-    # For now, return a mock user
-    # In production, this would validate JWT token and return real user
-    return User()
+    return _require(await _authenticate(connection))
+
+async def get_current_stream_user(connection: HTTPConnection) -> User:
+    """Get current authenticated user of a WebSocket/SSE progress stream (also accepts ?token=)"""
+    return _require(await _authenticate(connection, allow_query_token=True))
+
+async def get_current_admin(connection: HTTPConnection) -> User:
+    """Get current user, who must be on the admin plan"""
+    user = await get_current_user(connection)
+    if user.plan != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return user
 
-async def get_current_user_optional() -> User | None:
+async def get_current_user_optional(connection: HTTPConnection) -> User | None:
     """Get current authenticated user (optional - returns None if not authenticated)"""
-    # For now, return a mock user
-    # In production, this would validate JWT token and return real user or None
-    return User()
+    return await _authenticate(connection)
@@ -38,6 +38,14 @@ class Settings(BaseSettings):
     OUTPUT_DIR: str = "outputs"
     TEMP_DIR: str = "temp"
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
+    
+    # Generated Media Cache
+    MEDIA_CACHE_ENABLED: bool = True
+    MEDIA_CACHE_DIR: str = "cache/media"
+    MEDIA_CACHE_MAX_BYTES: int = 10 * 1024 * 1024 * 1024  # 10GB
+    MEDIA_CACHE_RETRY_WINDOW: int = 3600  # seconds unseeded results are reused for retries
+    MEDIA_DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB reads when sendfile is unavailable
+    MEDIA_DOWNLOAD_CACHE_REMOTE: bool = True  # keep completed remote downloads in the media cache
     ALLOWED_VIDEO_EXTENSIONS: set = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
     ALLOWED_IMAGE_EXTENSIONS: set = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
     
@@ -45,17 +53,59 @@ class Settings(BaseSettings):
     MAX_CONCURRENT_GENERATIONS: int = 3
     MAX_QUEUE_SIZE: int = 20
     GENERATION_TIMEOUT: int = 300  # 5 minutes
+    GENERATION_JOB_LEASE: int = 60  # seconds before an unrenewed job is recovered by another worker
+    
+    # Movie Production
+    MOVIE_RENDER_MODE: str = "parallel"  # sequential, parallel, speculative
+    MOVIE_SCENE_CONCURRENCY: int = 3  # scenes rendered at once per project
+    MOVIE_GLOBAL_SCENE_CONCURRENCY: int = 6  # scenes rendered at once across all projects
+    MOVIE_CONTINUITY_DIFF_THRESHOLD: float = 0.12  # 0-1, re-render speculative scenes above this
+    MOVIE_SCRIPT_FORMAT: str = "json"  # json (schema-validated structured output) or text
+    MOVIE_SCENE_MAX_ATTEMPTS: int = 3  # render attempts per scene before the production fails
+    MOVIE_SCENE_RETRY_BACKOFF: float = 5.0  # seconds before the first retry, doubled per attempt
+    MOVIE_SCENE_RETRY_MAX_DELAY: float = 60.0  # cap on the delay between scene retries
+    MOVIE_PRODUCTION_LEASE: int = 120  # seconds before an unrenewed production is resumed by another worker
+    MOVIE_PROJECTS_PAGE_SIZE: int = 20  # default page size for project listings
+    
+    # FFmpeg Encoding
+    FFMPEG_PRESET: str = "veryfast"
+    FFMPEG_CRF: int = 20
+    FFMPEG_TRANSITION_DURATION: float = 0.5  # seconds, 0 disables crossfades
     
     # Database Configuration
     DATABASE_URL: Optional[str] = "sqlite:///./veogen.db"
+    DB_POOL_SIZE: int = 10  # persistent async connections (asyncpg)
+    DB_MAX_OVERFLOW: int = 20  # extra connections allowed under burst load
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a pooled connection is replaced
+    SQLITE_POOL_SIZE: int = 5  # aiosqlite connections (SQLite serializes writers)
+    SQLITE_BUSY_TIMEOUT: float = 30.0  # seconds a writer waits on a locked database
+    SETTINGS_CACHE_TTL: float = 30.0  # seconds a cached settings snapshot may hide other workers' writes
+    SETTINGS_CACHE_MAX_USERS: int = 10000  # snapshots kept in memory (least recently used evicted)
     
     # Redis Configuration
     REDIS_URL: str = "redis://localhost:6379"
     REDIS_ENABLED: bool = False
     
+    # Outbound HTTP Client Pools
+    HTTP_POOL_MAX_CONNECTIONS: int = 100
+    HTTP_POOL_MAX_KEEPALIVE: int = 20  # idle keep-alive connections kept by httpx pools
+    HTTP_POOL_MAX_PER_HOST: int = 0  # concurrent connections per host for aiohttp pools, 0 = only the total limit
+    HTTP_POOL_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    HTTP_CONNECT_TIMEOUT: float = 10.0
+    HTTP_READ_TIMEOUT: float = 300.0
+    HTTP2_ENABLED: bool = True  # used when the h2 package is installed
+    
     # Security
     SECRET_KEY: str = "your-secret-key-change-this-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = 12  # work factor; existing hashes are upgraded on next login
+    PASSWORD_HASH_WORKERS: int = 0  # bcrypt threads, 0 = one per CPU (max 8)
+    PASSWORD_HASH_MAX_PENDING: int = 256  # queued hash/verify calls before rejecting with 503
+    AUTH_REQUIRED: bool = False  # False: requests without a token act as the development user
+    AUTH_CACHE_TTL: float = 60.0  # seconds a resolved token/session is trusted without a DB lookup
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_ACTIVITY_FLUSH_INTERVAL: float = 30.0  # seconds between batched last_activity writes
     
     # CORS
     ALLOWED_ORIGINS: List[str] = [
@@ -74,13 +124,45 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FILE: Optional[str] = "veogen.log"
+    LOG_DIR: str = "/app/logs"
+    LOG_QUEUE_ENABLED: bool = True  # write log records from a background thread instead of the caller
+    LOG_QUEUE_SIZE: int = 10000  # queued records before new ones are dropped (and counted)
+    LOG_PROGRESS_INTERVAL: float = 5.0  # seconds between progress log lines per job
     
     # Monitoring
     ENABLE_METRICS: bool = True
     METRICS_PORT: int = 8001
+    SYSTEM_METRICS_INTERVAL: float = 15.0  # seconds between background CPU/memory/disk samples
+    STORAGE_RECONCILE_INTERVAL: float = 300.0  # seconds between full storage directory recounts
+    TRACING_ENABLED: bool = True
+    TRACE_BUFFER_SIZE: int = 5000  # finished spans kept in memory for /api/v1/system/traces
+    TRACE_EXPORT_FILE: Optional[str] = None  # append spans as OTLP/JSON lines (e.g. "/app/logs/traces.jsonl")
+    TRACE_EXPORT_QUEUE_SIZE: int = 10000  # finished spans waiting for the export thread before new ones are dropped
+    PROFILER_INTERVAL: float = 0.01  # seconds between stack samples while a profile runs
+    PROFILER_MAX_SECONDS: float = 300.0  # longest profile /api/v1/system/profile will run
+    SLOW_REQUEST_THRESHOLD: float = 5.0  # seconds before a running request's stack is sampled and logged
+    LOOP_LAG_INTERVAL: float = 0.25  # seconds between event loop heartbeats
+    LOOP_BLOCK_THRESHOLD: float = 1.0  # seconds the loop must be stalled before its stack is logged
     
     # WebSocket
     WEBSOCKET_ENABLED: bool = True
+    PROGRESS_COALESCE_INTERVAL: float = 0.25  # seconds; watchers get at most one update per job per interval
+    PROGRESS_HEARTBEAT_INTERVAL: float = 15.0  # seconds between keep-alives on idle progress streams
+    
+    # Startup
+    SERVICE_WARMUP: bool = True  # initialize Google SDKs / check FFmpeg in the background at boot
+    
+    # MCP Server Supervision
+    MCP_AUTOSTART: bool = True  # start all MCP servers concurrently at app boot
+    MCP_STUB_SERVERS: bool = False  # run mcp_stub_server.py instead of the Go binaries (offline testing)
+    MCP_STARTUP_TIMEOUT: float = 30.0  # seconds to wait for /health after spawning
+    MCP_HEALTH_INTERVAL: float = 15.0  # seconds between background health checks
+    MCP_MAX_RESTARTS: int = 5  # restart attempts after a crash (failed restarts included) before a server is marked failed
+    MCP_MAX_WORKERS: int = 10  # total MCP processes across all server types and credentials
+    MCP_WORKER_IDLE_TTL: int = 600  # seconds before an idle per-credential worker is stopped
+    MCP_WORKER_ACQUIRE_TIMEOUT: float = 60.0  # seconds to wait for a worker slot when all are busy
+    MCP_WORKER_PORT_START: int = 8100  # ports for additional per-credential workers
+    MCP_WORKER_PORT_END: int = 8199
     
     # Email Configuration
     EMAIL_FROM: str = "noreply@veogen.local"
@@ -3,28 +3,68 @@ Database configuration and session management for VeoGen
 """
 
 import os
-from typing import Generator, AsyncGenerator
-from sqlalchemy import create_engine, Column, String, Integer, Boolean, DateTime, Text, JSON
+from typing import Generator, AsyncGenerator, Dict, Any
+from sqlalchemy import create_engine, event, select, Column, String, Integer, Float, Boolean, DateTime, Text, JSON, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 from datetime import datetime
 import json
 
+from app.config import settings
+
 # Database URL from config
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./veogen.db")
 
-# Create async engine for SQLAlchemy 2.0 style
-if DATABASE_URL.startswith("sqlite"):
-    # Convert to async SQLite URL
-    async_database_url = DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///")
-else:
-    # For PostgreSQL, MySQL, etc.
-    async_database_url = DATABASE_URL.replace("://", "+asyncpg://")
+def _async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    if backend == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if backend in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    # Other backends must already name an async driver
+    return url
+
+def _async_engine_options(url: str) -> Dict[str, Any]:
+    """Connection pool sizing for the async engine"""
+    if url.startswith("sqlite"):
+        options = {"connect_args": {"timeout": settings.SQLITE_BUSY_TIMEOUT}}
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite+aiosqlite:"):
+            # One shared connection, otherwise every session sees an empty database
+            options["poolclass"] = StaticPool
+        else:
+            # Keep aiosqlite connections (each owns a thread) open instead of reconnecting per session
+            options.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.SQLITE_POOL_SIZE,
+                max_overflow=0,
+                pool_timeout=settings.DB_POOL_TIMEOUT
+            )
+        return options
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True
+    }
+
+async_database_url = _async_database_url(DATABASE_URL)
 
 # Create engines
 engine = create_engine(DATABASE_URL, echo=False)
-async_engine = create_async_engine(async_database_url, echo=False)
+async_engine = create_async_engine(async_database_url, echo=False, **_async_engine_options(async_database_url))
+
+if async_database_url.startswith("sqlite"):
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _sqlite_wal(dbapi_connection, connection_record):
+        """WAL lets readers proceed while a writer holds the database"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
 
 # Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -126,6 +166,92 @@ class GenerationHistory(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime)
 
+class GenerationJob(Base):
+    """Queued generation jobs (survive process restarts)"""
+    __tablename__ = "generation_jobs"
+    
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, nullable=False, index=True)
+    job_type = Column(String, nullable=False)  # video, image, music
+    status = Column(String, default="queued", index=True)  # queued, processing, completed, failed
+    progress = Column(Integer, default=0)
+    message = Column(Text)
+    payload = Column(JSON, default=dict)
+    result = Column(JSON)
+    error = Column(Text)
+    attempts = Column(Integer, default=0)
+    owner = Column(String)  # worker that queued or is running the job
+    lease_expires_at = Column(DateTime)  # owner must renew before this or another worker recovers the job
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+
+class MediaCacheEntry(Base):
+    """Content-addressed cache of generated media artifacts"""
+    __tablename__ = "media_cache"
+    
+    key = Column(String, primary_key=True, index=True)  # sha256 of normalized generation params
+    kind = Column(String, nullable=False, index=True)  # video, image, music, scene
+    file_path = Column(String)  # artifact on disk (None for metadata-only entries)
+    size_bytes = Column(Integer, default=0)
+    deterministic = Column(Boolean, default=False)  # seeded request, reusable indefinitely
+    entry_metadata = Column(JSON, default=dict)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed = Column(DateTime, default=datetime.utcnow, index=True)
+    hit_count = Column(Integer, default=0)
+
+class MovieProject(Base):
+    """Movie maker projects (survive restarts and are shared across workers)"""
+    __tablename__ = "movie_projects"
+    
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, index=True)
+    title = Column(String, nullable=False)
+    description = Column(Text)  # the project concept
+    style = Column(String, nullable=False)
+    preset = Column(String)
+    max_clips = Column(Integer, default=10)
+    budget = Column(Float, default=5.0)
+    render_mode = Column(String)
+    status = Column(String, default="created", index=True)
+    progress = Column(Integer, default=0)
+    script = Column(Text)
+    total_scenes = Column(Integer, default=0)
+    completed_scenes = Column(Integer, default=0)
+    output_url = Column(String)  # final movie path
+    thumbnail_path = Column(String)
+    error_message = Column(Text)
+    production_owner = Column(String)  # worker currently producing the movie
+    lease_expires_at = Column(DateTime)  # owner must renew before this or another worker resumes
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime)
+
+class MovieScene(Base):
+    """Scenes of a movie project with their per-scene render state"""
+    __tablename__ = "movie_scenes"
+    __table_args__ = (UniqueConstraint("project_id", "scene_number"),)
+    
+    id = Column(String, primary_key=True, index=True)
+    project_id = Column(String, nullable=False, index=True)
+    scene_number = Column(Integer, nullable=False)
+    title = Column(String)
+    description = Column(Text)
+    prompt = Column(Text, nullable=False)  # visual prompt for video generation
+    duration = Column(Integer, default=8)
+    continuity = Column(Text)
+    continuity_required = Column(Boolean, default=False)
+    status = Column(String, default="pending", index=True)  # pending, generating, retrying, clip_ready, completed, failed
+    output_url = Column(String)  # generated clip path
+    continuity_frame = Column(String)  # styled final frame handed to the next scene
+    reference_frame = Column(String)  # frame this scene was rendered from
+    error_message = Column(Text)
+    generation_time_seconds = Column(Integer)
+    attempts = Column(Integer, default=0)  # render attempts across all production runs
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime)
+
 class PasswordResetToken(Base):
     """Password reset tokens for lost password flow"""
     __tablename__ = "password_reset_tokens"
@@ -184,6 +310,26 @@ async def init_async_db():
         await conn.run_sync(Base.metadata.create_all)
 
 # Utility functions for settings management
+def decode_setting(setting: "UserSettings", default=None):
+    """Convert a stored setting back to its typed value"""
+    if setting.setting_type == "json":
+        return json.loads(setting.setting_value) if setting.setting_value else default
+    elif setting.setting_type == "boolean":
+        return setting.setting_value.lower() == "true" if setting.setting_value else default
+    elif setting.setting_type == "number":
+        return float(setting.setting_value) if setting.setting_value else default
+    else:
+        return setting.setting_value or default
+
+def encode_setting(value, value_type: str):
+    """Convert a setting value to its stored string form"""
+    if value_type == "json":
+        return json.dumps(value) if value else None
+    elif value_type == "boolean":
+        return str(value).lower() if value is not None else None
+    else:
+        return str(value) if value is not None else None
+
 def get_user_setting(db: Session, user_id: str, key: str, default=None):
     """Get a user setting"""
     setting = db.query(UserSettings).filter(
@@ -194,27 +340,11 @@ def get_user_setting(db: Session, user_id: str, key: str, default=None):
     if not setting:
         return default
     
-    # Convert based on type
-    if setting.setting_type == "json":
-        return json.loads(setting.setting_value) if setting.setting_value else default
-    elif setting.setting_type == "boolean":
-        return setting.setting_value.lower() == "true" if setting.setting_value else default
-    elif setting.setting_type == "number":
-        return float(setting.setting_value) if setting.setting_value else default
-    else:
-        return setting.setting_value or default
+    return decode_setting(setting, default)
 
 def set_user_setting(db: Session, user_id: str, key: str, value, value_type="string"):
     """Set a user setting"""
-    # Convert value to string for storage
-    if value_type == "json":
-        value_str = json.dumps(value) if value else None
-    elif value_type == "boolean":
-        value_str = str(value).lower() if value is not None else None
-    elif value_type == "number":
-        value_str = str(value) if value is not None else None
-    else:
-        value_str = str(value) if value is not None else None
+    value_str = encode_setting(value, value_type)
     
     # Check if setting exists
     setting = db.query(UserSettings).filter(
@@ -238,5 +368,21 @@ def set_user_setting(db: Session, user_id: str, key: str, value, value_type="str
     db.commit()
     return setting
 
-# Initialize database on import
-init_db() 
\ No newline at end of file
+async def get_user_setting_async(db: AsyncSession, user_id: str, key: str, default=None):
+    """Get a user setting without blocking the event loop"""
+    setting = await db.scalar(
+        select(UserSettings).where(
+            UserSettings.user_id == user_id,
+            UserSettings.setting_key == key
+        ).limit(1)
+    )
+    
+    if not setting:
+        return default
+    
+    return decode_setting(setting, default)
+
+async def get_all_user_settings_async(db: AsyncSession, user_id: str) -> Dict[str, Any]:
+    """Get every setting for a user in a single query"""
+    result = await db.scalars(select(UserSettings).where(UserSettings.user_id == user_id))
+    return {setting.setting_key: decode_setting(setting) for setting in result}
@@ -3,14 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from app.config import settings
 from app.routers import video, movie
 from app.api.api_v1.endpoints import music, image, book, code, translation, auth
 from app.api.api_v1.endpoints import settings as settings_endpoints
-from app.api.api_v1.endpoints import system
+from app.api.api_v1.endpoints import system, progress
 # from app.api.api_v1.endpoints import chat
 from app.middleware.metrics import PrometheusMetricsMiddleware, metrics_endpoint
+from app.services.password_hasher import PasswordHasherBusy
 import uvicorn
 
 # Configure logging
@@ -18,6 +20,20 @@ from app.utils.logging_config import setup_logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+async def warm_up_services():
+    """Import and initialize heavy dependencies concurrently, off the event loop"""
+    from app.services import google_sdk
+    from app.services.ffmpeg import ffmpeg_service
+    
+    _, ffmpeg_available = await asyncio.gather(
+        asyncio.to_thread(google_sdk.warm_up),
+        ffmpeg_service.check_available()
+    )
+    if ffmpeg_available:
+        logger.info("FFmpeg service initialized")
+    else:
+        logger.warning(f"FFmpeg not available at {ffmpeg_service.ffmpeg_path}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
@@ -26,17 +42,44 @@ async def lifespan(app: FastAPI):
     
     # Initialize services here if needed
     try:
-        # Test FFmpeg availability
-        from app.services.ffmpeg import ffmpeg_service
-        logger.info("FFmpeg service initialized")
+        # Create tables (no longer done as a side effect of importing app.database)
+        from app.database import init_db
+        await asyncio.to_thread(init_db)
+        
+        # Batched session last_activity writes for the auth fast path
+        from app.services.auth_service import auth_service
+        auth_service.start()
         
-        # Test Gemini CLI availability
-        from app.services.gemini_cli import gemini_service
-        logger.info("Gemini CLI service initialized")
+        # System and storage gauges are sampled in the background, never per request
+        if settings.ENABLE_METRICS:
+            from app.services.system_metrics import system_metrics
+            system_metrics.start()
+            
+            # Event loop lag histogram, loop stall and slow request stack sampling
+            from app.services.profiler import loop_monitor
+            loop_monitor.start()
         
-        # Test Movie Maker service
+        # Shared outbound HTTP connection pools
+        from app.services.http_clients import http_clients
+        http_clients.start()
+        
+        # Warm up Google SDKs and check FFmpeg in the background; services also initialize on first use
+        if settings.SERVICE_WARMUP:
+            app.state.warm_up = asyncio.create_task(warm_up_services())
+        
+        # Start all MCP servers concurrently; requests wait on readiness per server
+        if settings.MCP_AUTOSTART:
+            from app.services.mcp_media_service import mcp_media_service
+            app.state.mcp_startup = asyncio.create_task(mcp_media_service.start_all_servers())
+        
+        # Start the generation queue workers (recovers unfinished jobs)
+        from app.services.job_queue import generation_queue
+        await generation_queue.start()
+        
+        # Pick up movie productions left unfinished by a previous process, and keep scanning
+        # for productions whose worker dies later
         from app.services.movie_maker import movie_maker_service
-        logger.info("Movie Maker service initialized")
+        movie_maker_service.start()
         
     except Exception as e:
         logger.warning(f"Service initialization warning: {e}")
@@ -45,12 +88,78 @@ async def lifespan(app: FastAPI):
     
     logger.info("Shutting down VeoGen API...")
     # Cleanup here if needed
+    try:
+        from app.services.job_queue import generation_queue
+        await generation_queue.stop()
+    except Exception as e:
+        logger.warning(f"Generation queue shutdown warning: {e}")
+    
+    try:
+        from app.services.movie_maker import movie_maker_service
+        await movie_maker_service.stop()
+    except Exception as e:
+        logger.warning(f"Movie production scan shutdown warning: {e}")
+    
+    try:
+        from app.services.mcp_media_service import mcp_media_service
+        await mcp_media_service.stop_all_servers()
+    except Exception as e:
+        logger.warning(f"MCP server shutdown warning: {e}")
+    
+    try:
+        from app.services.http_clients import http_clients
+        await http_clients.close()
+    except Exception as e:
+        logger.warning(f"HTTP client shutdown warning: {e}")
+    
+    try:
+        from app.services.system_metrics import system_metrics
+        await system_metrics.stop()
+    except Exception as e:
+        logger.warning(f"System metrics collector shutdown warning: {e}")
+    
+    try:
+        from app.services.profiler import loop_monitor, profiler
+        await loop_monitor.stop()
+        profiler.stop()
+    except Exception as e:
+        logger.warning(f"Loop monitor shutdown warning: {e}")
+    
+    try:
+        from app.services.auth_service import auth_service
+        await auth_service.stop()
+    except Exception as e:
+        logger.warning(f"Auth activity flush warning: {e}")
+    
+    try:
+        from app.services.password_hasher import password_hasher
+        password_hasher.shutdown()
+    except Exception as e:
+        logger.warning(f"Password hasher shutdown warning: {e}")
+    
+    try:
+        from app.services.tracing import tracer
+        tracer.close()
+    except Exception as e:
+        logger.warning(f"Trace export shutdown warning: {e}")
+    
+    try:
+        from app.database import async_engine
+        await async_engine.dispose()
+    except Exception as e:
+        logger.warning(f"Database pool shutdown warning: {e}")
+    
     try:
         # Cleanup temporary files
+        from app.services.ffmpeg import ffmpeg_service
         ffmpeg_service.cleanup_temp_files()
         logger.info("Cleaned up temporary files")
     except Exception as e:
         logger.warning(f"Cleanup warning: {e}")
+    
+    # Last: write out everything still queued for the log files
+    from app.utils.logging_config import shutdown_logging
+    shutdown_logging()
 
 # Create FastAPI app
 app = FastAPI(
@@ -145,6 +254,13 @@ app.include_router(
     tags=["system"]
 )
 
+# Push progress endpoints (WebSocket / SSE)
+app.include_router(
+    progress.router,
+    prefix=f"{settings.API_V1_STR}/progress",
+    tags=["progress"]
+)
+
 # Chat endpoints
 # app.include_router(
 #     chat.router,
@@ -212,7 +328,7 @@ async def health_check():
         # Check Movie Maker
         try:
             from app.services.movie_maker import movie_maker_service
-            active_projects = len(movie_maker_service.list_projects())
+            active_projects = await movie_maker_service.count_active_projects()
             health_status["components"]["movie_maker"] = f"available ({active_projects} active projects)"
         except Exception as e:
             health_status["components"]["movie_maker"] = f"error: {str(e)}"
@@ -264,6 +380,16 @@ async def api_info():
     }
 
 # Global exception handler
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request, exc):
+    """Shed login/registration bursts instead of queuing them without bound"""
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication service busy, please retry"},
+        headers={"Retry-After": "2"}
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
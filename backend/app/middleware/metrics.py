@@ -1,14 +1,13 @@
 """
 Prometheus metrics middleware for VeoGen API
 """
+import asyncio
 import time
 import logging
-from typing import Callable
-from fastapi import Request, Response
-from fastapi.routing import Match
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi import Response
 from prometheus_client import Counter, Histogram, Gauge, Info, generate_latest, CONTENT_TYPE_LATEST
 from prometheus_client.core import CollectorRegistry
-import psutil
 import os
 
 logger = logging.getLogger(__name__)
@@ -183,6 +182,73 @@ GEMINI_TOKENS_TOTAL = Counter(
     registry=REGISTRY
 )
 
+# Outbound HTTP client pool metrics
+HTTP_CLIENT_POOL_CONNECTIONS = Gauge(
+    'veogen_http_client_pool_connections',
+    'Outbound HTTP pool connections by pool and state (in_use, idle, limit)',
+    ['pool', 'state'],
+    registry=REGISTRY
+)
+
+# MCP server process metrics
+MCP_SERVER_UP = Gauge(
+    'veogen_mcp_server_up',
+    'Whether an MCP server process is running and ready',
+    ['server'],
+    registry=REGISTRY
+)
+
+MCP_SERVER_HEALTH_LATENCY = Gauge(
+    'veogen_mcp_server_health_latency_seconds',
+    'Latency of the last MCP server health check',
+    ['server'],
+    registry=REGISTRY
+)
+
+MCP_WORKERS = Gauge(
+    'veogen_mcp_workers',
+    'MCP worker processes in the per-credential pool',
+    ['server_type'],
+    registry=REGISTRY
+)
+
+MCP_SERVER_RESTARTS = Counter(
+    'veogen_mcp_server_restarts_total',
+    'MCP server restarts after a crash or failed health checks',
+    ['server'],
+    registry=REGISTRY
+)
+
+# Password hashing metrics
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    'veogen_password_hash_queue_depth',
+    'bcrypt operations waiting for or running on the hashing pool',
+    registry=REGISTRY
+)
+
+PASSWORD_HASH_DURATION = Histogram(
+    'veogen_password_hash_duration_seconds',
+    'bcrypt operation time including queue wait',
+    ['operation'],
+    buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+    registry=REGISTRY
+)
+
+# Event loop and slow request metrics (observed by app.services.profiler)
+EVENT_LOOP_LAG = Histogram(
+    'veogen_event_loop_lag_seconds',
+    'How late the event loop heartbeat woke up (time the loop was blocked)',
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+    registry=REGISTRY
+)
+
+SLOW_REQUESTS_TOTAL = Counter(
+    'veogen_slow_requests_total',
+    'Requests still running after SLOW_REQUEST_THRESHOLD seconds (stack sampled and logged)',
+    ['method', 'endpoint'],
+    registry=REGISTRY
+)
+
 # Error metrics
 ERROR_TOTAL = Counter(
     'veogen_errors_total',
@@ -191,97 +257,91 @@ ERROR_TOTAL = Counter(
     registry=REGISTRY
 )
 
-def get_route_name(request: Request) -> str:
-    """Extract route name from request"""
-    try:
-        for route in request.app.routes:
-            match, _ = route.matches({"type": "http", "path": request.url.path, "method": request.method})
-            if match == Match.FULL:
-                return route.path
-        return request.url.path
-    except Exception:
-        return request.url.path
-
-def update_system_metrics():
-    """Update system-level metrics"""
-    try:
-        # CPU usage
-        cpu_percent = psutil.cpu_percent(interval=None)
-        SYSTEM_CPU_USAGE.set(cpu_percent)
-        
-        # Memory usage
-        memory = psutil.virtual_memory()
-        SYSTEM_MEMORY_USAGE.labels(type='used').set(memory.used)
-        SYSTEM_MEMORY_USAGE.labels(type='available').set(memory.available)
-        SYSTEM_MEMORY_USAGE.labels(type='total').set(memory.total)
-        
-        # Disk usage
-        for partition in psutil.disk_partitions():
-            try:
-                disk_usage = psutil.disk_usage(partition.mountpoint)
-                SYSTEM_DISK_USAGE.labels(mount_point=partition.mountpoint, type='used').set(disk_usage.used)
-                SYSTEM_DISK_USAGE.labels(mount_point=partition.mountpoint, type='free').set(disk_usage.free)
-                SYSTEM_DISK_USAGE.labels(mount_point=partition.mountpoint, type='total').set(disk_usage.total)
-            except (PermissionError, OSError):
-                continue
-                
-        # File storage metrics
-        storage_paths = {
-            'uploads': '/app/uploads',
-            'outputs': '/app/outputs', 
-            'temp': '/app/temp',
-            'logs': '/app/logs'
-        }
-        
-        for storage_type, path in storage_paths.items():
-            if os.path.exists(path):
-                total_size = 0
-                for dirpath, dirnames, filenames in os.walk(path):
-                    for filename in filenames:
-                        try:
-                            filepath = os.path.join(dirpath, filename)
-                            total_size += os.path.getsize(filepath)
-                        except (OSError, IOError):
-                            continue
-                FILE_STORAGE_BYTES.labels(storage_type=storage_type).set(total_size)
-                
-    except Exception as e:
-        logger.warning(f"Failed to update system metrics: {e}")
+# Endpoint label for requests no route matched, so clients probing random
+# paths can't create a new time series per path
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Anything else in the method label is folded into OTHER
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+# Requests being handled: task -> (monotonic start, method, scope, middleware);
+# the slow request sampler walks this to find requests over the threshold
+in_flight_requests: Dict[asyncio.Task, Tuple[float, str, Any, "PrometheusMetricsMiddleware"]] = {}
 
 class PrometheusMetricsMiddleware:
-    """Middleware to collect Prometheus metrics"""
+    """Middleware to collect Prometheus metrics
+    
+    The endpoint label is the route template the router matched while
+    handling the request (FastAPI stores the route in the scope), so no
+    route matching is repeated here. Plain Starlette routes (/docs,
+    /openapi.json) only leave their endpoint in the scope; their templates
+    are looked up once per endpoint and cached.
+    
+    Requests are registered in in_flight_requests while they run, so the
+    slow request sampler can capture what a long request is waiting on.
+    """
     
     def __init__(self, app):
         self.app = app
+        self._endpoint_templates: Dict[Callable, Optional[str]] = {}
+        self._label_series: Dict[Tuple[str, str, int], Tuple] = {}
+    
+    def _series(self, method: str, endpoint: str, status_code: int) -> Tuple:
+        """Labelled HTTP metrics for a request, resolved once per label set (labels() locks and hashes per call)"""
+        series = self._label_series.get((method, endpoint, status_code))
+        if series is None:
+            series = self._label_series[(method, endpoint, status_code)] = (
+                HTTP_REQUESTS_TOTAL.labels(method=method, endpoint=endpoint, status=str(status_code)),
+                HTTP_REQUEST_DURATION.labels(method=method, endpoint=endpoint),
+                HTTP_REQUEST_SIZE.labels(method=method, endpoint=endpoint),
+                HTTP_RESPONSE_SIZE.labels(method=method, endpoint=endpoint)
+            )
+        return series
+    
+    def route_template(self, scope) -> str:
+        """Route template of a handled request, or UNMATCHED_ROUTE"""
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if endpoint not in self._endpoint_templates:
+            paths = [
+                route.path for route in getattr(scope.get("app"), "routes", [])
+                if getattr(route, "endpoint", None) is endpoint
+            ]
+            self._endpoint_templates[endpoint] = paths[0] if len(paths) == 1 else None
+        return self._endpoint_templates[endpoint] or UNMATCHED_ROUTE
         
     async def __call__(self, scope, receive, send):
         if scope["type"] != "http":
             await self.app(scope, receive, send)
             return
-            
-        request = Request(scope, receive)
         
         # Skip metrics endpoint itself
-        if request.url.path == "/metrics":
+        if scope["path"] == "/metrics":
             await self.app(scope, receive, send)
             return
-            
-        method = request.method
-        endpoint = get_route_name(request)
+        
+        method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
         
         # Start timer
         start_time = time.time()
+        task = asyncio.current_task()
+        in_flight_requests[task] = (time.monotonic(), method, scope, self)
         
         # Get request size
         request_size = 0
-        if "content-length" in request.headers:
-            try:
-                request_size = int(request.headers["content-length"])
-            except ValueError:
-                pass
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    request_size = int(value)
+                except ValueError:
+                    pass
+                break
                 
         # Process request
-        response_data = {}
         status_code = 500
         response_size = 0
         
@@ -308,40 +368,24 @@ class PrometheusMetricsMiddleware:
             logger.error(f"Request failed: {e}")
             raise
         finally:
+            in_flight_requests.pop(task, None)
             # Calculate duration
             duration = time.time() - start_time
+            endpoint = self.route_template(scope)
             
             # Update metrics
-            HTTP_REQUESTS_TOTAL.labels(
-                method=method,
-                endpoint=endpoint,
-                status=str(status_code)
-            ).inc()
-            
-            HTTP_REQUEST_DURATION.labels(
-                method=method,
-                endpoint=endpoint
-            ).observe(duration)
-            
+            requests_total, request_duration, request_sizes, response_sizes = self._series(
+                method, endpoint, status_code
+            )
+            requests_total.inc()
+            request_duration.observe(duration)
             if request_size > 0:
-                HTTP_REQUEST_SIZE.labels(
-                    method=method,
-                    endpoint=endpoint
-                ).observe(request_size)
-                
+                request_sizes.observe(request_size)
             if response_size > 0:
-                HTTP_RESPONSE_SIZE.labels(
-                    method=method,
-                    endpoint=endpoint
-                ).observe(response_size)
-            
-            # Update system metrics periodically
-            if int(time.time()) % 30 == 0:  # Every 30 seconds
-                update_system_metrics()
+                response_sizes.observe(response_size)
 
 async def metrics_endpoint():
-    """Prometheus metrics endpoint"""
-    update_system_metrics()
+    """Prometheus metrics endpoint (system/storage gauges are kept current by app.services.system_metrics)"""
     return Response(
         content=generate_latest(REGISTRY),
         media_type=CONTENT_TYPE_LATEST
@@ -21,6 +21,11 @@ class MoviePreset(str, Enum):
     STORY = "story"
     FEATURE = "feature"
 
+class RenderMode(str, Enum):
+    SEQUENTIAL = "sequential"
+    PARALLEL = "parallel"
+    SPECULATIVE = "speculative"
+
 class MovieStatus(str, Enum):
     CREATED = "created"
     SCRIPT_GENERATION = "script_generation"
@@ -38,6 +43,8 @@ class MovieProjectRequest(BaseModel):
     max_clips: int = Field(10, description="Maximum number of clips/scenes", ge=3, le=50)
     budget: float = Field(5.0, description="Budget limit in USD", ge=1.0, le=100.0)
     auto_generate_script: bool = Field(True, description="Automatically generate script after project creation")
+    early_render: bool = Field(False, description="Render scenes while the script is still being written, then produce the movie (requires auto_generate_script)")
+    render_mode: Optional[RenderMode] = Field(None, description="Scene rendering mode (defaults to server setting)")
     
     class Config:
         use_enum_values = True
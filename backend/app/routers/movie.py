@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Query
+from fastapi.responses import JSONResponse
 from typing import Optional, List, Dict, Any
 import logging
-from app.services.movie_maker import movie_maker_service
+from app.services.movie_maker import movie_maker_service, ProductionConflictError, InvalidScriptError
+from app.services.media_delivery import media_delivery_service
+from app.api.deps import get_current_user_optional
+from app.models.user import User
 from app.models.movie_request import (
     MovieProjectRequest,
     MovieProjectResponse,
@@ -19,18 +22,22 @@ router = APIRouter()
 @router.post("/create", response_model=MovieProjectResponse)
 async def create_movie_project(
     request: MovieProjectRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     Create a new movie project
     """
     try:
-        project = await movie_maker_service.create_movie_project(request.dict())
+        # The owner decides who may watch the project's progress stream
+        project_data = {**request.dict(), "user_id": current_user.id if current_user else None}
+        project = await movie_maker_service.create_movie_project(project_data)
         
         if request.auto_generate_script:
             background_tasks.add_task(
                 generate_script_background,
-                project["id"]
+                project["id"],
+                request.early_render
             )
         
         return MovieProjectResponse(
@@ -49,11 +56,13 @@ async def create_movie_project(
             detail=f"Movie project creation failed: {str(e)}"
         )
 
-async def generate_script_background(project_id: str):
-    """Background task for script generation"""
+async def generate_script_background(project_id: str, early_render: bool = False):
+    """Background task for script generation (and production, when rendering started early)"""
     try:
-        await movie_maker_service.generate_script(project_id)
+        await movie_maker_service.generate_script(project_id, early_render=early_render)
         logger.info(f"Script generation completed for project {project_id}")
+        if early_render:
+            await movie_maker_service.start_movie_production(project_id)
     except Exception as e:
         logger.error(f"Background script generation failed for project {project_id}: {str(e)}")
 
@@ -67,18 +76,25 @@ async def generate_or_update_script(
     """
     try:
         if request and request.script_content:
-            project = movie_maker_service.update_script(project_id, request.script_content)
+            project = await movie_maker_service.update_script(project_id, request.script_content)
         else:
             project = await movie_maker_service.generate_script(project_id)
         
-        return {
+        response = {
             "project_id": project["id"],
             "script": project["script"],
             "scenes": project["scenes"],
             "status": project["status"],
             "progress": project["progress"]
         }
+        if "script_update" in project:
+            response["script_update"] = project.pop("script_update")
+        return response
         
+    except ProductionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except InvalidScriptError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Script generation/update failed: {str(e)}")
         raise HTTPException(
@@ -86,6 +102,24 @@ async def generate_or_update_script(
             detail=f"Script operation failed: {str(e)}"
         )
 
+@router.post("/{project_id}/script/estimate")
+async def estimate_script_update(project_id: str, request: ScriptUpdateRequest):
+    """
+    Report which scenes an edited script would re-render and what that would cost
+    """
+    try:
+        estimate = await movie_maker_service.estimate_script_update(project_id, request.script_content)
+        return {"project_id": project_id, **estimate}
+        
+    except InvalidScriptError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Script update estimate failed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Script update estimate failed: {str(e)}"
+        )
+
 @router.post("/{project_id}/produce")
 async def start_movie_production(
     project_id: str,
@@ -105,6 +139,8 @@ async def start_movie_production(
             "scenes_count": len(project.get("scenes", []))
         }
         
+    except ProductionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Movie production start failed: {str(e)}")
         raise HTTPException(
@@ -112,13 +148,40 @@ async def start_movie_production(
             detail=f"Movie production failed: {str(e)}"
         )
 
+@router.post("/{project_id}/resume")
+async def resume_movie_production(project_id: str):
+    """
+    Resume a failed or interrupted production, re-running only stages without a checkpoint
+    """
+    try:
+        project = await movie_maker_service.resume_production(project_id)
+        scenes = project.get("scenes", [])
+        
+        return {
+            "project_id": project["id"],
+            "status": project["status"],
+            "progress": project["progress"],
+            "message": "Movie is already complete" if project["status"] == "completed" else "Movie production resumed",
+            "scenes_count": len(scenes),
+            "scenes_remaining": len([s for s in scenes if s.get("status") != "completed"])
+        }
+        
+    except ProductionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Movie production resume failed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Movie production resume failed: {str(e)}"
+        )
+
 @router.get("/{project_id}/status", response_model=MovieStatusResponse)
 async def get_movie_status(project_id: str):
     """
     Get the status of a movie project
     """
     try:
-        project = movie_maker_service.get_project_status(project_id)
+        project = await movie_maker_service.get_project_status(project_id)
         
         if not project:
             raise HTTPException(
@@ -148,12 +211,12 @@ async def get_movie_status(project_id: str):
         )
 
 @router.get("/{project_id}/download")
-async def download_movie(project_id: str):
+async def download_movie(project_id: str, request: Request):
     """
-    Download the completed movie
+    Download the completed movie (supports Range and ETag revalidation)
     """
     try:
-        project = movie_maker_service.get_project_status(project_id)
+        project = await movie_maker_service.get_project_status(project_id)
         
         if not project:
             raise HTTPException(
@@ -174,20 +237,11 @@ async def download_movie(project_id: str):
                 detail="Movie file not found"
             )
         
-        def generate_movie_stream():
-            with open(movie_path, 'rb') as f:
-                while True:
-                    chunk = f.read(8192)
-                    if not chunk:
-                        break
-                    yield chunk
-        
-        return StreamingResponse(
-            generate_movie_stream(),
+        return media_delivery_service.file_response(
+            request,
+            movie_path,
             media_type="video/mp4",
-            headers={
-                "Content-Disposition": f"attachment; filename={project['title'].replace(' ', '_')}.mp4"
-            }
+            filename=f"{project['title'].replace(' ', '_')}.mp4"
         )
         
     except HTTPException:
@@ -200,14 +254,20 @@ async def download_movie(project_id: str):
         )
 
 @router.get("/projects")
-async def list_movie_projects():
+async def list_movie_projects(
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size"),
+    offset: int = Query(0, ge=0, description="Number of projects to skip"),
+    status: Optional[str] = Query(None, description="Only projects with this status")
+):
     """
-    List all movie projects
+    List movie projects, newest first
     """
     try:
-        projects = movie_maker_service.list_projects()
+        projects, total = await movie_maker_service.list_projects(limit, offset, status)
         
         return {
+            "total": total,
+            "offset": offset,
             "projects": [
                 {
                     "project_id": project["id"],
@@ -217,7 +277,7 @@ async def list_movie_projects():
                     "created_at": project["created_at"],
                     "style": project["style"],
                     "preset": project["preset"],
-                    "scenes_count": len(project.get("scenes", []))
+                    "scenes_count": project["scenes_count"]
                 }
                 for project in projects
             ]
@@ -236,7 +296,7 @@ async def delete_movie_project(project_id: str):
     Delete a movie project
     """
     try:
-        success = movie_maker_service.delete_project(project_id)
+        success = await movie_maker_service.delete_project(project_id)
         
         if not success:
             raise HTTPException(
@@ -366,7 +426,7 @@ async def movie_maker_health():
     Health check for movie maker service
     """
     try:
-        active_projects = len(movie_maker_service.list_projects())
+        active_projects = await movie_maker_service.count_active_projects()
         
         return {
             "status": "healthy",
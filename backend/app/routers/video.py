@@ -3,18 +3,17 @@ Video Generation API Router
 Handles video generation requests using Google's Veo model via MCP
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Request
+from fastapi.responses import JSONResponse
 from typing import Optional, List, Dict, Any
 import logging
-import uuid
 import base64
 from PIL import Image
-import io
 import json
-from datetime import datetime
 
 from ..services.video_service import video_service
+from ..services.job_queue import generation_queue, QueueFullError
+from ..services.media_delivery import media_delivery_service
 from ..models.video_request import (
     VideoGenerationRequest,
     VideoGenerationResponse,
@@ -23,99 +22,52 @@ from ..models.video_request import (
 )
 from ..deps import get_current_user
 from ..models.user import User
+from ..utils.logging_config import log_progress
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/video", tags=["video"])
 
-# In-memory job tracker (in production, use Redis or database)
-job_tracker = {}
+async def generate_video_background(job_id: str, request_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    """Queue handler for video generation with progress tracking"""
+    request = VideoGenerationRequest(**request_data)
+    
+    # Progress callback function
+    def progress_callback(progress: int, status: str = None, message: str = None):
+        generation_queue.update_progress(job_id, progress, status, message)
+        log_progress(logger, job_id, progress, f"Job {job_id} progress: {progress}% - {message}", status)
+    
+    # Generate video using enhanced service
+    result = await video_service.generate_video(
+        prompt=request.prompt,
+        duration=request.duration,
+        aspect_ratio=request.aspect_ratio,
+        style=request.style,
+        seed=request.seed,
+        temperature=request.temperature,
+        user_id=user_id,
+        progress_callback=progress_callback
+    )
+    
+    if result["status"] != "success":
+        raise Exception(result.get("error", "Unknown error"))
+    
+    logger.info(f"Video generation completed for job {job_id}")
+    return result
 
-async def generate_video_background(job_id: str, request: VideoGenerationRequest, user_id: int):
-    """Background task for video generation with progress tracking"""
-    try:
-        # Update initial progress
-        job_tracker[job_id]["progress"] = 5
-        job_tracker[job_id]["status"] = "processing"
-        
-        # Progress callback function
-        def progress_callback(progress: int, status: str = None, message: str = None):
-            job_tracker[job_id]["progress"] = progress
-            if status:
-                job_tracker[job_id]["status"] = status
-            if message:
-                job_tracker[job_id]["message"] = message
-            logger.info(f"Job {job_id} progress: {progress}% - {message}")
-        
-        # Generate video using enhanced service
-        result = await video_service.generate_video(
-            prompt=request.prompt,
-            duration=request.duration,
-            aspect_ratio=request.aspect_ratio,
-            style=request.style,
-            seed=request.seed,
-            temperature=request.temperature,
-            user_id=user_id,
-            progress_callback=progress_callback
-        )
-        
-        if result["status"] == "success":
-            # Update job tracker with success
-            job_tracker[job_id].update({
-                "status": "completed",
-                "progress": 100,
-                "result": result,
-                "completed_at": result.get("completed_at")
-            })
-            logger.info(f"Video generation completed for job {job_id}")
-        else:
-            # Update job tracker with error
-            job_tracker[job_id].update({
-                "status": "failed",
-                "error": result.get("error", "Unknown error"),
-                "failed_at": result.get("failed_at")
-            })
-            logger.error(f"Video generation failed for job {job_id}: {result.get('error')}")
-        
-    except Exception as e:
-        logger.error(f"Background video generation failed for job {job_id}: {str(e)}")
-        job_tracker[job_id].update({
-            "status": "failed",
-            "error": str(e),
-            "failed_at": result.get("failed_at") if 'result' in locals() else None
-        })
+generation_queue.register_handler("video", generate_video_background)
 
 @router.post("/generate", response_model=VideoGenerationResponse)
 async def generate_video(
     request: VideoGenerationRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """
     Generate a video using Google's Veo model via MCP
     """
     try:
-        # Create job ID
-        job_id = str(uuid.uuid4())
-        
-        # Initialize job tracker
-        job_tracker[job_id] = {
-            "job_id": job_id,
-            "user_id": current_user.id,
-            "status": "queued",
-            "progress": 0,
-            "request": request.dict(),
-            "created_at": datetime.utcnow().isoformat(),
-            "message": "Job queued for processing"
-        }
-        
-        # Add background task
-        background_tasks.add_task(
-            generate_video_background,
-            job_id,
-            request,
-            current_user.id
-        )
+        job = await generation_queue.submit("video", current_user.id, request.dict())
+        job_id = job["job_id"]
         
         logger.info(f"Video generation job {job_id} queued for user {current_user.id}")
         
@@ -125,6 +77,13 @@ async def generate_video(
             message="Video generation job queued successfully"
         )
         
+    except QueueFullError as e:
+        logger.warning(f"Rejected video generation for user {current_user.id}: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": "30"}
+        )
     except Exception as e:
         logger.error(f"Error queuing video generation: {e}")
         raise HTTPException(
@@ -141,9 +100,9 @@ async def get_generation_status(
     Get the status of a video generation job
     """
     try:
-        # First check in-memory tracker
-        if job_id in job_tracker:
-            job_info = job_tracker[job_id]
+        # First check the generation queue
+        job_info = await generation_queue.get_job(job_id)
+        if job_info:
             
             # Check authorization
             if job_info["user_id"] != current_user.id:
@@ -213,9 +172,9 @@ async def list_jobs(current_user: User = Depends(get_current_user)):
                 detail=f"Error listing jobs: {result['error']}"
             )
         
-        # Combine with in-memory jobs
+        # Combine with queued jobs
         mcp_jobs = result["jobs"]
-        memory_jobs = [
+        queue_jobs = [
             {
                 "job_id": job["job_id"],
                 "status": job["status"],
@@ -223,17 +182,16 @@ async def list_jobs(current_user: User = Depends(get_current_user)):
                 "created_at": job["created_at"],
                 "completed_at": job.get("completed_at")
             }
-            for job in job_tracker.values()
-            if job["user_id"] == current_user.id
+            for job in await generation_queue.list_user_jobs(current_user.id)
         ]
         
         # Merge and deduplicate
         all_jobs = {}
-        for job in mcp_jobs + memory_jobs:
+        for job in mcp_jobs + queue_jobs:
             if job["job_id"] not in all_jobs:
                 all_jobs[job["job_id"]] = job
             else:
-                # Prefer memory job if it has more recent info
+                # Prefer queue job if it has more recent info
                 existing = all_jobs[job["job_id"]]
                 if job.get("progress", 0) > existing.get("progress", 0):
                     all_jobs[job["job_id"]] = job
@@ -255,29 +213,45 @@ async def list_jobs(current_user: User = Depends(get_current_user)):
 @router.get("/download/{job_id}")
 async def download_video(
     job_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """
-    Download a completed video file
+    Download a completed video file (supports Range and ETag revalidation)
     """
     try:
-        # Try to download from MCP service
-        file_data = await video_service.download_video(job_id, current_user.id)
+        file_info = None
+        
+        # First check the generation queue
+        queued_job = await generation_queue.get_job(job_id)
+        if queued_job:
+            if queued_job["user_id"] != current_user.id:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Not authorized to download this video"
+                )
+            video_url = (queued_job.get("result") or {}).get("video_url")
+            if queued_job["status"] == "completed" and video_url:
+                file_info = {
+                    "url": video_url,
+                    "filename": f"{job_id}.mp4",
+                    "content_type": "video/mp4"
+                }
+        else:
+            # Fallback to MCP service
+            file_info = await video_service.get_video_file(job_id, current_user.id)
         
-        if not file_data:
+        if not file_info:
             raise HTTPException(
                 status_code=404,
                 detail="Video file not found or not completed"
             )
         
-        # Create streaming response
-        return StreamingResponse(
-            io.BytesIO(file_data["content"]),
-            media_type=file_data["content_type"],
-            headers={
-                "Content-Disposition": f"attachment; filename={file_data['filename']}",
-                "Content-Length": str(file_data["size"])
-            }
+        return await media_delivery_service.serve(
+            request,
+            file_info["url"],
+            media_type=file_info["content_type"],
+            filename=file_info["filename"]
         )
         
     except HTTPException:
@@ -298,9 +272,22 @@ async def delete_job(
     Delete a video generation job
     """
     try:
+        queued_job = await generation_queue.get_job(job_id)
+        if queued_job:
+            if queued_job["user_id"] != current_user.id:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Not authorized to delete this job"
+                )
+            if not await generation_queue.delete_job(job_id):
+                raise HTTPException(
+                    status_code=409,
+                    detail="Job is currently running and cannot be deleted"
+                )
+        
         result = await video_service.delete_job(job_id, current_user.id)
         
-        if result["status"] == "not_found":
+        if result["status"] == "not_found" and not queued_job:
             raise HTTPException(
                 status_code=404,
                 detail="Job not found"
@@ -316,10 +303,6 @@ async def delete_job(
                 detail=f"Error deleting job: {result['error']}"
             )
         
-        # Also remove from memory tracker
-        if job_id in job_tracker:
-            del job_tracker[job_id]
-        
         return {"message": "Job deleted successfully"}
         
     except HTTPException:
@@ -2,8 +2,8 @@ import hashlib
 import secrets
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, select, delete, case
 
 from app.database import APIKey, User
 
@@ -19,9 +19,9 @@ class APIKeyService:
         # This is a placeholder - replace with proper encryption library
         return hashlib.sha256(api_key.encode()).hexdigest()
     
-    def store_api_key(
+    async def store_api_key(
         self, 
-        db: Session, 
+        db: AsyncSession, 
         user_id: str, 
         service_name: str, 
         key_name: str, 
@@ -29,13 +29,15 @@ class APIKeyService:
     ) -> APIKey:
         """Store a new API key for a user"""
         # Check if key name already exists for this user and service
-        existing_key = db.query(APIKey).filter(
-            and_(
-                APIKey.user_id == user_id,
-                APIKey.service_name == service_name,
-                APIKey.key_name == key_name
-            )
-        ).first()
+        existing_key = await db.scalar(
+            select(APIKey).where(
+                and_(
+                    APIKey.user_id == user_id,
+                    APIKey.service_name == service_name,
+                    APIKey.key_name == key_name
+                )
+            ).limit(1)
+        )
         
         if existing_key:
             raise ValueError(f"API key with name '{key_name}' already exists for service '{service_name}'")
@@ -56,36 +58,40 @@ class APIKeyService:
         )
         
         db.add(db_api_key)
-        db.commit()
-        db.refresh(db_api_key)
+        await db.commit()
+        await db.refresh(db_api_key)
         
         return db_api_key
     
-    def list_api_keys(self, db: Session, user_id: str) -> List[APIKey]:
+    async def list_api_keys(self, db: AsyncSession, user_id: str) -> List[APIKey]:
         """List all API keys for a user"""
-        return db.query(APIKey).filter(APIKey.user_id == user_id).all()
+        return (await db.scalars(select(APIKey).where(APIKey.user_id == user_id))).all()
     
-    def get_service_keys(self, db: Session, user_id: str, service_name: str) -> List[APIKey]:
+    async def get_service_keys(self, db: AsyncSession, user_id: str, service_name: str) -> List[APIKey]:
         """Get all API keys for a specific service and user"""
-        return db.query(APIKey).filter(
-            and_(
-                APIKey.user_id == user_id,
-                APIKey.service_name == service_name
+        return (await db.scalars(
+            select(APIKey).where(
+                and_(
+                    APIKey.user_id == user_id,
+                    APIKey.service_name == service_name
+                )
             )
-        ).all()
+        )).all()
     
-    def get_api_key_by_id(self, db: Session, user_id: str, key_id: int) -> Optional[APIKey]:
+    async def get_api_key_by_id(self, db: AsyncSession, user_id: str, key_id: int) -> Optional[APIKey]:
         """Get a specific API key by ID for a user"""
-        return db.query(APIKey).filter(
-            and_(
-                APIKey.id == key_id,
-                APIKey.user_id == user_id
-            )
-        ).first()
+        return await db.scalar(
+            select(APIKey).where(
+                and_(
+                    APIKey.id == key_id,
+                    APIKey.user_id == user_id
+                )
+            ).limit(1)
+        )
     
-    def update_api_key(
+    async def update_api_key(
         self, 
-        db: Session, 
+        db: AsyncSession, 
         user_id: str, 
         key_id: int, 
         service_name: str, 
@@ -93,19 +99,21 @@ class APIKeyService:
         api_key: str
     ) -> bool:
         """Update an existing API key"""
-        db_api_key = self.get_api_key_by_id(db, user_id, key_id)
+        db_api_key = await self.get_api_key_by_id(db, user_id, key_id)
         if not db_api_key:
             return False
         
         # Check if new key name conflicts with existing keys
-        existing_key = db.query(APIKey).filter(
-            and_(
-                APIKey.user_id == user_id,
-                APIKey.service_name == service_name,
-                APIKey.key_name == key_name,
-                APIKey.id != key_id
-            )
-        ).first()
+        existing_key = await db.scalar(
+            select(APIKey).where(
+                and_(
+                    APIKey.user_id == user_id,
+                    APIKey.service_name == service_name,
+                    APIKey.key_name == key_name,
+                    APIKey.id != key_id
+                )
+            ).limit(1)
+        )
         
         if existing_key:
             raise ValueError(f"API key with name '{key_name}' already exists for service '{service_name}'")
@@ -118,86 +126,83 @@ class APIKeyService:
         db_api_key.key_name = key_name
         db_api_key.encrypted_key = encrypted_key
         
-        db.commit()
+        await db.commit()
         return True
     
-    def delete_api_key(self, db: Session, user_id: str, key_id: int) -> bool:
+    async def delete_api_key(self, db: AsyncSession, user_id: str, key_id: int) -> bool:
         """Delete an API key"""
-        db_api_key = self.get_api_key_by_id(db, user_id, key_id)
-        if not db_api_key:
-            return False
-        
-        db.delete(db_api_key)
-        db.commit()
-        return True
+        result = await db.execute(
+            delete(APIKey).where(
+                and_(
+                    APIKey.id == key_id,
+                    APIKey.user_id == user_id
+                )
+            )
+        )
+        await db.commit()
+        return result.rowcount > 0
     
-    def deactivate_api_key(self, db: Session, user_id: str, key_id: int) -> bool:
+    async def deactivate_api_key(self, db: AsyncSession, user_id: str, key_id: int) -> bool:
         """Deactivate an API key"""
-        db_api_key = self.get_api_key_by_id(db, user_id, key_id)
+        db_api_key = await self.get_api_key_by_id(db, user_id, key_id)
         if not db_api_key:
             return False
         
         db_api_key.is_active = False
         db_api_key.updated_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
         return True
     
-    def activate_api_key(self, db: Session, user_id: str, key_id: int) -> bool:
+    async def activate_api_key(self, db: AsyncSession, user_id: str, key_id: int) -> bool:
         """Activate an API key"""
-        db_api_key = self.get_api_key_by_id(db, user_id, key_id)
+        db_api_key = await self.get_api_key_by_id(db, user_id, key_id)
         if not db_api_key:
             return False
         
         db_api_key.is_active = True
         db_api_key.updated_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
         return True
     
-    def validate_api_key(self, db: Session, user_id: str, service_name: str, api_key: str) -> Optional[APIKey]:
+    async def validate_api_key(self, db: AsyncSession, user_id: str, service_name: str, api_key: str) -> Optional[APIKey]:
         """Validate an API key for a user and service"""
-        api_keys = self.get_service_keys(db, user_id, service_name)
-        
-        for db_api_key in api_keys:
-            if not db_api_key.is_active:
-                continue
-            
-            # Encrypt the provided API key
-            encrypted_key = self._encrypt_api_key(api_key)
-            
-            # Compare with stored encrypted key
-            if encrypted_key == db_api_key.encrypted_key:
-                # Update usage statistics
-                db_api_key.last_used = datetime.utcnow()
-                db_api_key.usage_count += 1
-                db.commit()
-                return db_api_key
-        
-        return None
-    
-    def get_api_key_usage_stats(self, db: Session, user_id: str) -> Dict[str, Any]:
-        """Get usage statistics for API keys"""
-        # Get total API keys
-        total_keys = db.query(func.count(APIKey.id)).filter(APIKey.user_id == user_id).scalar()
-        
-        # Get active API keys
-        active_keys = db.query(func.count(APIKey.id)).filter(
-            and_(APIKey.user_id == user_id, APIKey.is_active == True)
-        ).scalar()
+        # Encrypt the provided API key and match it in the database
+        encrypted_key = self._encrypt_api_key(api_key)
+        db_api_key = await db.scalar(
+            select(APIKey).where(
+                and_(
+                    APIKey.user_id == user_id,
+                    APIKey.service_name == service_name,
+                    APIKey.is_active == True,
+                    APIKey.encrypted_key == encrypted_key
+                )
+            ).limit(1)
+        )
         
-        # Get total usage count
-        total_usage = db.query(func.sum(APIKey.usage_count)).filter(APIKey.user_id == user_id).scalar() or 0
+        if db_api_key:
+            # Update usage statistics
+            db_api_key.last_used = datetime.utcnow()
+            db_api_key.usage_count += 1
+            await db.commit()
         
-        # Get keys by service
-        service_stats = db.query(
-            APIKey.service_name,
-            func.count(APIKey.id).label('count'),
-            func.sum(APIKey.usage_count).label('usage')
-        ).filter(APIKey.user_id == user_id).group_by(APIKey.service_name).all()
+        return db_api_key
+    
+    async def get_api_key_usage_stats(self, db: AsyncSession, user_id: str) -> Dict[str, Any]:
+        """Get usage statistics for API keys"""
+        # Keys by service; totals are summed from the same rows
+        service_stats = (await db.execute(
+            select(
+                APIKey.service_name,
+                func.count(APIKey.id).label('count'),
+                func.sum(case((APIKey.is_active == True, 1), else_=0)).label('active'),
+                func.sum(APIKey.usage_count).label('usage')
+            ).where(APIKey.user_id == user_id).group_by(APIKey.service_name)
+        )).all()
         
         return {
-            "total_keys": total_keys,
-            "active_keys": active_keys,
-            "total_usage": total_usage,
+            "total_keys": sum(stat.count for stat in service_stats),
+            "active_keys": sum(stat.active or 0 for stat in service_stats),
+            "total_usage": sum(stat.usage or 0 for stat in service_stats),
             "service_breakdown": [
                 {
                     "service_name": stat.service_name,
@@ -208,23 +213,21 @@ class APIKeyService:
             ]
         }
     
-    def cleanup_expired_keys(self, db: Session, days_old: int = 90) -> int:
+    async def cleanup_expired_keys(self, db: AsyncSession, days_old: int = 90) -> int:
         """Clean up API keys that haven't been used for specified days"""
         cutoff_date = datetime.utcnow() - timedelta(days=days_old)
         
-        expired_keys = db.query(APIKey).filter(
-            and_(
-                APIKey.last_used < cutoff_date,
-                APIKey.is_active == False
+        result = await db.execute(
+            delete(APIKey).where(
+                and_(
+                    APIKey.last_used < cutoff_date,
+                    APIKey.is_active == False
+                )
             )
-        ).all()
-        
-        count = len(expired_keys)
-        for key in expired_keys:
-            db.delete(key)
+        )
         
-        db.commit()
-        return count
+        await db.commit()
+        return result.rowcount
 
 
 # Create singleton instance
@@ -4,15 +4,22 @@ Authentication and user management service
 
 import os
 import uuid
+import time
+import asyncio
+import logging
 import jwt
-import bcrypt
 from datetime import datetime, timedelta
+from collections import OrderedDict
 from typing import Optional, Dict, Any
-from sqlalchemy.orm import Session
-from app.database import User, UserSession, get_user_setting, set_user_setting, PasswordResetToken, UserSettings
+from sqlalchemy import select, update, delete, func, case, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal, User, UserSession, PasswordResetToken, UserSettings, encode_setting
 from app.config import settings
 import secrets
 from app.services.email_service import send_email
+from app.services.password_hasher import password_hasher, hash_password, verify_password
+
+logger = logging.getLogger(__name__)
 
 class AuthService:
     """Authentication service for user management"""
@@ -21,16 +28,20 @@ class AuthService:
         self.secret_key = settings.SECRET_KEY
         self.algorithm = "HS256"
         self.access_token_expire_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        # Request auth fast path: resolved principals by session id, revoked session ids,
+        # and last_activity timestamps waiting for the write-behind flush
+        self._principals: "OrderedDict[str, tuple]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self._activity: Dict[str, datetime] = {}
+        self._flush_task: Optional[asyncio.Task] = None
     
     def hash_password(self, password: str) -> str:
-        """Hash a password using bcrypt"""
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        """Hash a password using bcrypt (blocking; async code uses password_hasher)"""
+        return hash_password(password)
     
     def verify_password(self, password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        """Verify a password against its hash (blocking; async code uses password_hasher)"""
+        return verify_password(password, hashed_password)
     
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token"""
@@ -52,21 +63,21 @@ class AuthService:
         except jwt.PyJWTError:
             return None
     
-    def create_user(self, db: Session, email: str, password: str, username: Optional[str] = None) -> User:
+    async def create_user(self, db: AsyncSession, email: str, password: str, username: Optional[str] = None) -> User:
         """Create a new user"""
-        # Check if user already exists
-        existing_user = db.query(User).filter(User.email == email).first()
-        if existing_user:
-            raise ValueError("User with this email already exists")
-        
+        # Check email and username in one round trip
+        conditions = [User.email == email]
         if username:
-            existing_username = db.query(User).filter(User.username == username).first()
-            if existing_username:
-                raise ValueError("Username already taken")
+            conditions.append(User.username == username)
+        existing = (await db.scalars(select(User).where(or_(*conditions)))).all()
+        if any(user.email == email for user in existing):
+            raise ValueError("User with this email already exists")
+        if existing:
+            raise ValueError("Username already taken")
         
         # Create new user
         user_id = str(uuid.uuid4())
-        hashed_password = self.hash_password(password)
+        hashed_password = await password_hasher.hash(password)
         
         user = User(
             id=user_id,
@@ -77,35 +88,40 @@ class AuthService:
         )
         
         db.add(user)
-        db.commit()
-        db.refresh(user)
         
-        # Set default user settings
+        # Default settings are written in the same transaction as the user
         self.set_default_user_settings(db, user_id)
         
+        await db.commit()
+        await db.refresh(user)
+        
         return user
     
-    def authenticate_user(self, db: Session, email: str, password: str) -> Optional[User]:
+    async def authenticate_user(self, db: AsyncSession, email: str, password: str) -> Optional[User]:
         """Authenticate a user with email and password"""
-        user = db.query(User).filter(User.email == email).first()
+        user = await db.scalar(select(User).where(User.email == email).limit(1))
         if not user:
             return None
         
-        if not self.verify_password(password, user.hashed_password):
+        if not await password_hasher.verify(password, user.hashed_password):
             return None
         
         if not user.is_active:
             return None
         
+        # Upgrade the hash while the plaintext is at hand if the work factor changed
+        if password_hasher.needs_rehash(user.hashed_password):
+            user.hashed_password = await password_hasher.hash(password)
+        
         # Update last login
         user.last_login = datetime.utcnow()
-        db.commit()
+        await db.commit()
         
         return user
     
-    def create_user_session(self, db: Session, user_id: str, ip_address: Optional[str] = None, 
-                           user_agent: Optional[str] = None) -> str:
-        """Create a new user session"""
+    async def create_user_session(self, db: AsyncSession, user_id: str, ip_address: Optional[str] = None, 
+                                  user_agent: Optional[str] = None) -> UserSession:
+        """Create a new user session (its id goes into the access token's "sid" claim)"""
         session_id = str(uuid.uuid4())
         session_token = str(uuid.uuid4())
         expires_at = datetime.utcnow() + timedelta(days=30)  # 30 day session
@@ -120,39 +136,175 @@ class AuthService:
         )
         
         db.add(session)
-        db.commit()
+        await db.commit()
         
-        return session_token
+        return session
     
-    def validate_session(self, db: Session, session_token: str) -> Optional[User]:
+    async def validate_session(self, db: AsyncSession, session_token: str) -> Optional[User]:
         """Validate a session token and return the user"""
-        session = db.query(UserSession).filter(
-            UserSession.session_token == session_token,
-            UserSession.expires_at > datetime.utcnow()
-        ).first()
+        row = (await db.execute(
+            select(UserSession, User)
+            .join(User, User.id == UserSession.user_id)
+            .where(
+                UserSession.session_token == session_token,
+                UserSession.expires_at > datetime.utcnow()
+            )
+            .limit(1)
+        )).first()
         
-        if not session:
+        if not row:
             return None
+        session, user = row
         
-        # Update last activity
-        session.last_activity = datetime.utcnow()
-        db.commit()
+        # Last activity is written behind in batches
+        self._activity[session.id] = datetime.utcnow()
         
-        # Get user
-        user = db.query(User).filter(User.id == session.user_id).first()
-        return user if user and user.is_active else None
+        return user if user.is_active else None
     
-    def logout_user(self, db: Session, session_token: str) -> bool:
+    async def logout_user(self, db: AsyncSession, session_token: str) -> bool:
         """Logout a user by invalidating their session"""
-        session = db.query(UserSession).filter(UserSession.session_token == session_token).first()
-        if session:
-            db.delete(session)
-            db.commit()
-            return True
-        return False
+        session_id = await db.scalar(select(UserSession.id).where(UserSession.session_token == session_token))
+        if not session_id:
+            return False
+        return await self.revoke_session(db, session_id)
+    
+    async def revoke_session(self, db: AsyncSession, session_id: str, token_exp: Optional[float] = None) -> bool:
+        """Delete a session and deny its access tokens in this process right away"""
+        # Tokens carry at most ACCESS_TOKEN_EXPIRE_MINUTES of validity; deny until then
+        ttl = (token_exp - time.time()) if token_exp else self.access_token_expire_minutes * 60
+        self._revoked[session_id] = time.monotonic() + max(ttl, 0)
+        self._principals.pop(session_id, None)
+        self._activity.pop(session_id, None)
+        result = await db.execute(delete(UserSession).where(UserSession.id == session_id))
+        await db.commit()
+        return result.rowcount > 0
+    
+    async def _revoke_user_sessions(self, db: AsyncSession, user_id: str):
+        """Delete every session of a user (committed by the caller) and deny their tokens in this process"""
+        session_ids = (await db.scalars(select(UserSession.id).where(UserSession.user_id == user_id))).all()
+        denied_until = time.monotonic() + self.access_token_expire_minutes * 60
+        for session_id in session_ids:
+            self._revoked[session_id] = denied_until
+            self._principals.pop(session_id, None)
+            self._activity.pop(session_id, None)
+        await db.execute(delete(UserSession).where(UserSession.user_id == user_id))
+    
+    async def authenticate_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """Resolve a bearer token to a principal dict, touching the database only on cache misses
+        
+        The JWT signature and expiry are checked locally on every call. The session/user
+        lookup behind it is cached for AUTH_CACHE_TTL seconds, so a session revoked from
+        another worker process stops working here within that window.
+        """
+        payload = self.verify_token(token)
+        if not payload or not payload.get("sub"):
+            return None
+        
+        session_id = payload.get("sid")
+        cache_key = session_id or f"user:{payload['sub']}"
+        now = time.monotonic()
+        
+        if session_id:
+            revoked_until = self._revoked.get(session_id)
+            if revoked_until is not None:
+                if revoked_until > now:
+                    return None
+                del self._revoked[session_id]
+        
+        cached = self._principals.get(cache_key)
+        if cached and cached[0] > now:
+            self._principals.move_to_end(cache_key)
+            principal = cached[1]
+        else:
+            principal = await self._load_principal(payload["sub"], session_id)
+            if principal is None:
+                self._principals.pop(cache_key, None)
+                return None
+            self._principals[cache_key] = (now + settings.AUTH_CACHE_TTL, principal)
+            while len(self._principals) > settings.AUTH_CACHE_MAX_ENTRIES:
+                self._principals.popitem(last=False)
+        
+        if session_id:
+            self._activity[session_id] = datetime.utcnow()
+        return principal
     
-    def set_default_user_settings(self, db: Session, user_id: str):
-        """Set default settings for a new user"""
+    async def _load_principal(self, user_id: str, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Single query for the token's user (and session, when the token names one)"""
+        async with AsyncSessionLocal() as db:
+            if session_id:
+                user = await db.scalar(
+                    select(User)
+                    .join(UserSession, UserSession.user_id == User.id)
+                    .where(
+                        UserSession.id == session_id,
+                        UserSession.user_id == user_id,
+                        UserSession.expires_at > datetime.utcnow()
+                    )
+                    .limit(1)
+                )
+            else:
+                user = await db.get(User, user_id)
+        
+        if not user or not user.is_active:
+            return None
+        return {
+            "id": user.id,
+            "email": user.email,
+            "username": user.username,
+            "plan": user.plan,
+            "session_id": session_id
+        }
+    
+    def forget_user(self, user_id: str):
+        """Drop cached principals for a user after their account changes"""
+        for key in [key for key, (_, principal) in self._principals.items() if principal["id"] == user_id]:
+            del self._principals[key]
+    
+    async def flush_activity(self):
+        """Write pending last_activity timestamps in one batched UPDATE"""
+        now = time.monotonic()
+        for session_id in [sid for sid, until in self._revoked.items() if until <= now]:
+            del self._revoked[session_id]
+        
+        if not self._activity:
+            return
+        pending, self._activity = self._activity, {}
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(UserSession),
+                    [{"id": session_id, "last_activity": seen} for session_id, seen in pending.items()]
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to flush session activity for {len(pending)} sessions: {e}")
+            # Keep the newest timestamps for the next attempt
+            for session_id, seen in pending.items():
+                self._activity.setdefault(session_id, seen)
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.AUTH_ACTIVITY_FLUSH_INTERVAL)
+            await self.flush_activity()
+    
+    def start(self):
+        """Start the periodic last_activity flush"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Stop the flush loop and write any pending activity"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush_activity()
+    
+    def set_default_user_settings(self, db: AsyncSession, user_id: str):
+        """Add default settings for a new user (committed by the caller)"""
         default_settings = {
             "theme": "light",
             "language": "en",
@@ -167,18 +319,22 @@ class AuthService:
         
         for key, value in default_settings.items():
             value_type = "boolean" if isinstance(value, bool) else "number" if isinstance(value, (int, float)) else "string"
-            set_user_setting(db, user_id, key, value, value_type)
+            db.add(UserSettings(
+                user_id=user_id,
+                setting_key=key,
+                setting_value=encode_setting(value, value_type),
+                setting_type=value_type
+            ))
     
-    def get_user_profile(self, db: Session, user_id: str) -> Optional[Dict[str, Any]]:
+    async def get_user_profile(self, db: AsyncSession, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user profile with settings"""
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             return None
         
         # Get user settings
-        settings = {}
-        for setting in db.query(UserSettings).filter(UserSettings.user_id == user_id).all():
-            settings[setting.setting_key] = get_user_setting(db, user_id, setting.setting_key)
+        from app.services.settings_store import settings_store
+        settings = await settings_store.get_all(db, user_id)
         
         return {
             "id": user.id,
@@ -193,9 +349,9 @@ class AuthService:
             "settings": settings
         }
     
-    def update_user_profile(self, db: Session, user_id: str, **kwargs) -> Optional[User]:
+    async def update_user_profile(self, db: AsyncSession, user_id: str, **kwargs) -> Optional[User]:
         """Update user profile information"""
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             return None
         
@@ -206,119 +362,133 @@ class AuthService:
                 setattr(user, field, value)
         
         user.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
+        self.forget_user(user_id)
         
         return user
     
-    def change_password(self, db: Session, user_id: str, current_password: str, new_password: str) -> bool:
+    async def change_password(self, db: AsyncSession, user_id: str, current_password: str, new_password: str) -> bool:
         """Change user password"""
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             return False
         
         # Verify current password
-        if not self.verify_password(current_password, user.hashed_password):
+        if not await password_hasher.verify(current_password, user.hashed_password):
             return False
         
-        # Hash and set new password
-        user.hashed_password = self.hash_password(new_password)
+        # Hash and set new password; existing sessions (and any stolen token) stop working
+        user.hashed_password = await password_hasher.hash(new_password)
         user.updated_at = datetime.utcnow()
-        db.commit()
+        await self._revoke_user_sessions(db, user_id)
+        await db.commit()
+        self.forget_user(user_id)
         
         return True
     
-    def get_user_usage_stats(self, db: Session, user_id: str) -> Dict[str, Any]:
+    async def get_user_usage_stats(self, db: AsyncSession, user_id: str) -> Dict[str, Any]:
         """Get user usage statistics"""
         from app.database import GenerationHistory
         
-        # Get generation history
-        generations = db.query(GenerationHistory).filter(
-            GenerationHistory.user_id == user_id
-        ).all()
-        
-        # Calculate stats
-        total_generations = len(generations)
-        successful_generations = len([g for g in generations if g.status == "completed"])
-        failed_generations = len([g for g in generations if g.status == "failed"])
-        
-        # Get recent activity (last 30 days)
+        # Aggregate in the database instead of loading the whole history
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_generations = [g for g in generations if g.created_at >= thirty_days_ago]
+        row = (await db.execute(
+            select(
+                func.count(GenerationHistory.id),
+                func.sum(case((GenerationHistory.status == "completed", 1), else_=0)),
+                func.sum(case((GenerationHistory.status == "failed", 1), else_=0)),
+                func.sum(case((GenerationHistory.created_at >= thirty_days_ago, 1), else_=0)),
+                func.max(GenerationHistory.created_at)
+            ).where(GenerationHistory.user_id == user_id)
+        )).one()
+        
+        total_generations = row[0] or 0
+        successful_generations = row[1] or 0
+        failed_generations = row[2] or 0
         
         return {
             "total_generations": total_generations,
             "successful_generations": successful_generations,
             "failed_generations": failed_generations,
             "success_rate": (successful_generations / total_generations * 100) if total_generations > 0 else 0,
-            "recent_activity": len(recent_generations),
-            "last_generation": max([g.created_at for g in generations]) if generations else None
+            "recent_activity": row[3] or 0,
+            "last_generation": row[4]
         }
 
     def generate_token(self, length=32) -> str:
         return secrets.token_urlsafe(length)
 
-    def send_verification_email(self, db: Session, user: User):
+    async def send_verification_email(self, user_id: str):
+        """Store a verification token and mail it (opens its own session so it can run as a background task)"""
         token = self.generate_token(24)
-        user.email_verification_token = token
-        user.email_verification_sent_at = datetime.utcnow()
-        db.commit()
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, user_id)
+            if not user:
+                return
+            user.email_verification_token = token
+            user.email_verification_sent_at = datetime.utcnow()
+            await db.commit()
         verify_url = f"https://yourdomain.com/verify-email?token={token}&user={user.id}"
         subject = "Verify your VeoGen account"
         body = f"Hello {user.username or user.email},\n\nPlease verify your email by clicking the link below:\n{verify_url}\n\nIf you did not register, ignore this email."
-        send_email(user.email, subject, body)
+        await asyncio.to_thread(send_email, user.email, subject, body)
 
-    def verify_email(self, db: Session, user_id: str, token: str) -> bool:
-        user = db.query(User).filter(User.id == user_id).first()
+    async def verify_email(self, db: AsyncSession, user_id: str, token: str) -> bool:
+        user = await db.get(User, user_id)
         if not user or user.email_verification_token != token:
             return False
         user.is_verified = True
         user.email_verification_token = None
-        db.commit()
+        await db.commit()
         return True
 
-    def send_password_reset_email(self, db: Session, user: User):
+    async def send_password_reset_email(self, user_id: str):
+        """Store a reset token and mail it (opens its own session so it can run as a background task)"""
         token = self.generate_token(24)
         expires_at = datetime.utcnow() + timedelta(hours=2)
-        reset_token = PasswordResetToken(
-            user_id=user.id,
-            token=token,
-            created_at=datetime.utcnow(),
-            expires_at=expires_at,
-            used=False
-        )
-        db.add(reset_token)
-        db.commit()
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, user_id)
+            if not user:
+                return
+            db.add(PasswordResetToken(
+                user_id=user.id,
+                token=token,
+                created_at=datetime.utcnow(),
+                expires_at=expires_at,
+                used=False
+            ))
+            await db.commit()
         reset_url = f"https://yourdomain.com/reset-password?token={token}&user={user.id}"
         subject = "VeoGen Password Reset"
         body = f"Hello {user.username or user.email},\n\nTo reset your password, click the link below:\n{reset_url}\n\nIf you did not request a password reset, ignore this email."
-        send_email(user.email, subject, body)
+        await asyncio.to_thread(send_email, user.email, subject, body)
 
-    def verify_password_reset_token(self, db: Session, user_id: str, token: str) -> bool:
-        reset_token = db.query(PasswordResetToken).filter(
+    def _valid_reset_token(self, user_id: str, token: str):
+        return select(PasswordResetToken).where(
             PasswordResetToken.user_id == user_id,
             PasswordResetToken.token == token,
             PasswordResetToken.used == False,
             PasswordResetToken.expires_at > datetime.utcnow()
-        ).first()
+        ).limit(1)
+
+    async def verify_password_reset_token(self, db: AsyncSession, user_id: str, token: str) -> bool:
+        reset_token = await db.scalar(self._valid_reset_token(user_id, token))
         return bool(reset_token)
 
-    def reset_password(self, db: Session, user_id: str, token: str, new_password: str) -> bool:
-        reset_token = db.query(PasswordResetToken).filter(
-            PasswordResetToken.user_id == user_id,
-            PasswordResetToken.token == token,
-            PasswordResetToken.used == False,
-            PasswordResetToken.expires_at > datetime.utcnow()
-        ).first()
+    async def reset_password(self, db: AsyncSession, user_id: str, token: str, new_password: str) -> bool:
+        reset_token = await db.scalar(self._valid_reset_token(user_id, token))
         if not reset_token:
             return False
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             return False
-        user.hashed_password = self.hash_password(new_password)
+        user.hashed_password = await password_hasher.hash(new_password)
         user.updated_at = datetime.utcnow()
         reset_token.used = True
-        db.commit()
+        await self._revoke_user_sessions(db, user_id)
+        await db.commit()
+        self.forget_user(user_id)
         return True
 
 # Global auth service instance
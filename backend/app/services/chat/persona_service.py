@@ -7,9 +7,8 @@ import random
 from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 from enum import Enum
-import google.generativeai as genai
 from app.config import settings
-from app.database import get_user_setting
+from app.services.settings_store import settings_store
 from app.middleware.metrics import track_chat_interaction
 from app.utils.logging_config import log_user_action
 from app.services.gemini_cli import gemini_service
@@ -81,7 +80,7 @@ class PersonaService:
         try:
             if db_session and user_id:
                 # Try to get from user settings first
-                user_key = get_user_setting(db_session, user_id, key_name)
+                user_key = settings_store.get_sync(db_session, user_id, key_name)
                 if user_key:
                     return user_key
         except Exception as e:
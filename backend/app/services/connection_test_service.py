@@ -15,7 +15,7 @@ from datetime import datetime
 from dataclasses import dataclass, asdict
 
 from ..config import settings
-from ..database import get_user_setting
+from .settings_store import settings_store
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +53,7 @@ class ConnectionTestService:
         try:
             if db_session and user_id:
                 # Try to get from user settings first
-                user_key = get_user_setting(db_session, user_id, key_name)
+                user_key = settings_store.get_sync(db_session, user_id, key_name)
                 if user_key:
                     return user_key
         except Exception as e:
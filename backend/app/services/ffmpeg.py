@@ -1,38 +1,55 @@
 import asyncio
+import functools
 import logging
 import os
-import subprocess
+import shutil
 import tempfile
+import time
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import cv2
 import numpy as np
 from PIL import Image
 import json
+import uuid
+from app.config import settings
+from app.services.system_metrics import system_metrics
+from app.services.tracing import tracer
+from app.middleware.metrics import track_ffmpeg_operation
 
 logger = logging.getLogger(__name__)
 
+def ffmpeg_operation(operation_type: str):
+    """Run an FFmpegService coroutine in a trace span and count it in the FFmpeg metrics"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            with tracer.span(f"ffmpeg.{operation_type}", operation_type=operation_type):
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception:
+                    track_ffmpeg_operation(operation_type, "failed")
+                    raise
+            track_ffmpeg_operation(operation_type, "completed", time.monotonic() - started)
+            return result
+        return wrapper
+    return decorator
+
 class FFmpegService:
     """Service for video processing and movie assembly using FFmpeg"""
     
     def __init__(self):
         self.ffmpeg_path = self._find_ffmpeg()
+        self.ffprobe_path = self._find_ffprobe()
+        self._probe_cache: Dict[Tuple[str, int, int], Dict] = {}
         self.temp_dir = Path(tempfile.gettempdir()) / "veogen_ffmpeg"
         self.temp_dir.mkdir(exist_ok=True)
     
     def _find_ffmpeg(self) -> str:
-        """Find FFmpeg executable"""
-        try:
-            result = subprocess.run(
-                ["ffmpeg", "-version"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                return "ffmpeg"
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
+        """Find FFmpeg executable (PATH lookup only; see check_available)"""
+        if shutil.which("ffmpeg"):
+            return "ffmpeg"
         
         possible_paths = [
             "/usr/bin/ffmpeg",
@@ -47,46 +64,48 @@ class FFmpegService:
         
         return "ffmpeg"
     
+    async def check_available(self) -> bool:
+        """Run `ffmpeg -version` to confirm the executable works"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.ffmpeg_path, "-version",
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            return await asyncio.wait_for(process.wait(), timeout=10) == 0
+        except (asyncio.TimeoutError, FileNotFoundError, PermissionError):
+            return False
+    
+    def _find_ffprobe(self) -> str:
+        """Find the ffprobe executable that ships next to FFmpeg"""
+        directory, name = os.path.split(self.ffmpeg_path)
+        probe_name = name.replace("ffmpeg", "ffprobe")
+        return os.path.join(directory, probe_name) if directory else probe_name
+    
+    @ffmpeg_operation("extract_final_frame")
     async def extract_final_frame(self, video_path: str, output_path: Optional[str] = None) -> str:
         """Extract the final frame from a video file"""
         if output_path is None:
             output_path = str(self.temp_dir / f"frame_{os.path.basename(video_path)}.jpg")
         
         try:
-            duration_cmd = [
-                self.ffmpeg_path,
-                "-i", video_path,
-                "-f", "null",
-                "-"
-            ]
-            
-            process = await asyncio.create_subprocess_exec(
-                *duration_cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            stderr_text = stderr.decode()
-            
-            duration = self._parse_duration(stderr_text)
-            if duration is None:
-                raise Exception("Could not determine video duration")
-            
-            seek_time = max(0, duration - 0.1)
-            
+            # -sseof seeks from the container's end-of-file index, so only the
+            # last fraction of a second is decoded; -update keeps overwriting
+            # the image so the file ends up holding the very last frame.
             cmd = [
                 self.ffmpeg_path,
-                "-ss", str(seek_time),
+                "-sseof", "-0.5",
                 "-i", video_path,
-                "-vframes", "1",
+                "-an",
+                "-update", "1",
+                "-q:v", "2",
                 "-y",
                 output_path
             ]
             
             process = await asyncio.create_subprocess_exec(
                 *cmd,
-                stdout=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.PIPE
             )
             
@@ -104,56 +123,175 @@ class FFmpegService:
             logger.error(f"Error extracting frame from {video_path}: {e}")
             raise
     
-    def _parse_duration(self, ffmpeg_output: str) -> Optional[float]:
-        """Parse duration from FFmpeg output"""
-        import re
-        
-        pattern = r"Duration: (\d{2}):(\d{2}):(\d{2})\.(\d{2})"
-        match = re.search(pattern, ffmpeg_output)
-        
-        if match:
-            hours, minutes, seconds, centiseconds = match.groups()
-            total_seconds = (
-                int(hours) * 3600 +
-                int(minutes) * 60 +
-                int(seconds) +
-                int(centiseconds) / 100
-            )
-            return total_seconds
+    @ffmpeg_operation("extract_final_frames")
+    async def extract_final_frames(self, video_path: str, count: int = 1) -> List[np.ndarray]:
+        """Decode the last `count` frames into BGR numpy arrays in a single FFmpeg process"""
+        info = await self.probe(video_path)
+        video = info.get("video") or {}
+        width, height = video.get("width"), video.get("height")
+        if not width or not height:
+            raise Exception(f"No video stream in {video_path}")
+        if self._rotation(video) in (90, 270):
+            width, height = height, width
+        
+        fps = self._frame_rate(video)
+        # Seek a couple of frames further back than needed to absorb keyframe/timestamp rounding
+        window = min(info["duration"], (count + 2) / fps)
+        
+        cmd = [
+            self.ffmpeg_path,
+            "-sseof", f"-{window:.3f}",
+            "-i", video_path,
+            "-an",
+            "-f", "rawvideo",
+            "-pix_fmt", "bgr24",
+            "-"
+        ]
+        
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
         
-        return None
+        stdout, stderr = await process.communicate()
+        
+        frame_size = width * height * 3
+        if process.returncode != 0 or len(stdout) < frame_size:
+            error_msg = stderr.decode()
+            logger.error(f"Frame extraction failed: {error_msg}")
+            raise Exception(f"Frame extraction failed: {error_msg}")
+        
+        total = len(stdout) // frame_size
+        frames = np.frombuffer(stdout[:total * frame_size], dtype=np.uint8).reshape(total, height, width, 3)
+        return list(frames[-count:])
+    
+    async def extract_final_frame_array(self, video_path: str) -> np.ndarray:
+        """Extract the final frame as an in-memory BGR array"""
+        frames = await self.extract_final_frames(video_path, 1)
+        return frames[-1]
+    
+    @staticmethod
+    def _frame_rate(video: Dict) -> float:
+        rate = video.get("avg_frame_rate") or video.get("r_frame_rate") or "24/1"
+        try:
+            num, den = rate.split("/")
+            return float(num) / float(den) if float(den) else 24.0
+        except (ValueError, ZeroDivisionError):
+            return 24.0
+    
+    @staticmethod
+    def _rotation(video: Dict) -> int:
+        rotation = video.get("tags", {}).get("rotate")
+        for side_data in video.get("side_data_list", []):
+            if "rotation" in side_data:
+                rotation = side_data["rotation"]
+        try:
+            return abs(int(float(rotation or 0))) % 360
+        except ValueError:
+            return 0
     
+    @ffmpeg_operation("extract_first_frame")
+    async def extract_first_frame(self, video_path: str, output_path: Optional[str] = None) -> str:
+        """Extract the first frame from a video file"""
+        if output_path is None:
+            output_path = str(self.temp_dir / f"first_{os.path.basename(video_path)}.jpg")
+        
+        cmd = [
+            self.ffmpeg_path,
+            "-i", video_path,
+            "-vframes", "1",
+            "-y",
+            output_path
+        ]
+        
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        
+        stdout, stderr = await process.communicate()
+        
+        if process.returncode == 0 and os.path.exists(output_path):
+            return output_path
+        
+        error_msg = stderr.decode()
+        logger.error(f"First frame extraction failed: {error_msg}")
+        raise Exception(f"First frame extraction failed: {error_msg}")
+    
+    def frame_difference(self, frame_a: Union[str, np.ndarray], frame_b: Union[str, np.ndarray]) -> float:
+        """Return a 0-1 visual distance between two frames (mean abs difference on thumbnails)"""
+        size = (64, 36)
+        frame_a = self._load_gray(frame_a)
+        frame_b = self._load_gray(frame_b)
+        if frame_a is None or frame_b is None:
+            return 1.0
+        
+        frame_a = cv2.resize(frame_a, size, interpolation=cv2.INTER_AREA)
+        frame_b = cv2.resize(frame_b, size, interpolation=cv2.INTER_AREA)
+        return float(cv2.absdiff(frame_a, frame_b).mean()) / 255.0
+    
+    @staticmethod
+    def _load_gray(frame: Union[str, np.ndarray]) -> Optional[np.ndarray]:
+        if isinstance(frame, np.ndarray):
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.imread(frame, cv2.IMREAD_GRAYSCALE)
+    
+    @ffmpeg_operation("style_transfer")
     async def apply_style_transfer(
         self, 
-        frame_path: str, 
+        frame: Union[str, np.ndarray], 
         style: str, 
-        output_path: Optional[str] = None
-    ) -> str:
-        """Apply style transfer to maintain consistency"""
-        if output_path is None:
-            base_name = os.path.splitext(os.path.basename(frame_path))[0]
-            output_path = str(self.temp_dir / f"{base_name}_styled.jpg")
+        output_path: Optional[str] = None,
+        return_array: bool = False
+    ) -> Union[str, np.ndarray]:
+        """Apply style transfer to maintain consistency
+        
+        `frame` may be an image path or an in-memory BGR array. With
+        `return_array=True` the styled array is returned and nothing is
+        written to disk; otherwise the styled image is written to
+        `output_path` and its path returned.
+        """
+        if output_path is None and not return_array:
+            if isinstance(frame, np.ndarray):
+                output_path = str(self.temp_dir / f"frame_{uuid.uuid4().hex}_styled.jpg")
+            else:
+                base_name = os.path.splitext(os.path.basename(frame))[0]
+                output_path = str(self.temp_dir / f"{base_name}_styled.jpg")
+        
+        image = frame if isinstance(frame, np.ndarray) else cv2.imread(frame)
         
         try:
-            image = cv2.imread(frame_path)
             if image is None:
-                raise Exception(f"Could not load image: {frame_path}")
+                raise Exception(f"Could not load image: {frame}")
             
             if style == "anime":
-                image = self._enhance_anime_style(image)
+                styled = self._enhance_anime_style(image)
             elif style == "wes-anderson":
-                image = self._apply_wes_anderson_style(image)
+                styled = self._apply_wes_anderson_style(image)
             elif style == "claymation":
-                image = self._apply_claymation_style(image)
+                styled = self._apply_claymation_style(image)
+            else:
+                styled = image
+            
+            if return_array:
+                return styled
             
-            cv2.imwrite(output_path, image)
-            logger.info(f"Applied {style} style to {frame_path}")
+            cv2.imwrite(output_path, styled)
+            system_metrics.record_write(output_path)
+            logger.info(f"Applied {style} style to frame")
             return output_path
             
         except Exception as e:
             logger.error(f"Error applying style transfer: {e}")
-            import shutil
-            shutil.copy2(frame_path, output_path)
+            if return_array:
+                return image
+            if isinstance(frame, np.ndarray):
+                cv2.imwrite(output_path, frame)
+            else:
+                import shutil
+                shutil.copy2(frame, output_path)
             return output_path
     
     def _enhance_anime_style(self, image: np.ndarray) -> np.ndarray:
@@ -177,54 +315,39 @@ class FFmpegService:
         image = cv2.convertScaleAbs(image, alpha=0.9, beta=5)
         return image
     
+    @ffmpeg_operation("concatenate")
     async def concatenate_videos(
         self, 
         video_paths: List[str], 
         output_path: str,
-        with_transitions: bool = True
+        with_transitions: bool = True,
+        transition_duration: Optional[float] = None
     ) -> str:
         """Concatenate multiple videos into a single movie"""
         try:
             if len(video_paths) < 1:
                 raise Exception("At least one video is required")
             
-            file_list_path = str(self.temp_dir / "file_list.txt")
+            if transition_duration is None:
+                transition_duration = settings.FFMPEG_TRANSITION_DURATION
             
-            with open(file_list_path, 'w') as f:
-                for video_path in video_paths:
-                    f.write(f"file '{os.path.abspath(video_path)}'\n")
+            # Re-assembly overwrites the previous movie
+            previous_size = system_metrics.file_size(output_path)
             
-            if with_transitions and len(video_paths) > 1:
-                await self._concatenate_with_transitions(video_paths, output_path)
-            else:
-                cmd = [
-                    self.ffmpeg_path,
-                    "-f", "concat",
-                    "-safe", "0",
-                    "-i", file_list_path,
-                    "-c", "copy",
-                    "-y",
-                    output_path
-                ]
-                
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                
-                stdout, stderr = await process.communicate()
-                
-                if process.returncode != 0:
-                    error_msg = stderr.decode()
-                    logger.error(f"Video concatenation failed: {error_msg}")
-                    raise Exception(f"Video concatenation failed: {error_msg}")
+            # Probe every clip once; the results drive both the copy check and xfade offsets
+            infos = await asyncio.gather(*(self.probe(path) for path in video_paths))
             
-            try:
-                os.remove(file_list_path)
-            except:
-                pass
+            if len(video_paths) == 1:
+                import shutil
+                shutil.copy2(video_paths[0], output_path)
+            elif with_transitions and transition_duration > 0:
+                await self._concatenate_with_transitions(video_paths, infos, output_path, transition_duration)
+            elif self._streams_match(infos):
+                await self._concatenate_stream_copy(video_paths, output_path)
+            else:
+                await self._concatenate_reencode(video_paths, infos, output_path)
             
+            system_metrics.record_write(output_path, previous_size)
             logger.info(f"Successfully concatenated {len(video_paths)} videos to {output_path}")
             return output_path
             
@@ -232,53 +355,168 @@ class FFmpegService:
             logger.error(f"Error concatenating videos: {e}")
             raise
     
-    async def _concatenate_with_transitions(self, video_paths: List[str], output_path: str):
-        """Concatenate videos with smooth transitions"""
-        if len(video_paths) == 1:
-            import shutil
-            shutil.copy2(video_paths[0], output_path)
-            return
+    def _stream_signature(self, info: Dict) -> Tuple:
+        """Parameters that must be identical for lossless stream-copy concatenation"""
+        video = info.get("video") or {}
+        audio = info.get("audio") or {}
+        return (
+            video.get("codec_name"), video.get("width"), video.get("height"),
+            video.get("pix_fmt"), video.get("r_frame_rate"), video.get("time_base"),
+            audio.get("codec_name"), audio.get("sample_rate"), audio.get("channels")
+        )
+    
+    def _streams_match(self, infos: List[Dict]) -> bool:
+        return len({self._stream_signature(info) for info in infos}) == 1
+    
+    def _encode_args(self) -> List[str]:
+        return [
+            "-c:v", "libx264",
+            "-preset", settings.FFMPEG_PRESET,
+            "-crf", str(settings.FFMPEG_CRF),
+            "-pix_fmt", "yuv420p",
+            "-c:a", "aac",
+            "-movflags", "+faststart"
+        ]
+    
+    def _normalize_filters(self, infos: List[Dict]) -> Tuple[List[str], List[str]]:
+        """Scale every input to the first clip's geometry/fps (xfade and concat require it)"""
+        reference = infos[0].get("video") or {}
+        width = reference.get("width") or 1920
+        height = reference.get("height") or 1080
+        fps = reference.get("r_frame_rate") or "24/1"
         
+        filters = []
+        labels = []
+        for i in range(len(infos)):
+            filters.append(
+                f"[{i}:v]fps={fps},scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,format=yuv420p[v{i}]"
+            )
+            labels.append(f"[v{i}]")
+        return filters, labels
+    
+    async def _run_ffmpeg(self, cmd: List[str], operation: str):
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        
+        stdout, stderr = await process.communicate()
+        
+        if process.returncode != 0:
+            error_msg = stderr.decode(errors="replace")
+            logger.error(f"{operation} failed: {error_msg}")
+            raise Exception(f"{operation} failed: {error_msg}")
+    
+    async def _concatenate_stream_copy(self, video_paths: List[str], output_path: str):
+        """Concatenate without re-encoding (all clips share codec parameters)"""
+        file_list_path = str(self.temp_dir / f"file_list_{uuid.uuid4().hex}.txt")
+        
+        with open(file_list_path, 'w') as f:
+            for video_path in video_paths:
+                escaped = os.path.abspath(video_path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        
+        try:
+            await self._run_ffmpeg([
+                self.ffmpeg_path,
+                "-f", "concat",
+                "-safe", "0",
+                "-i", file_list_path,
+                "-c", "copy",
+                "-movflags", "+faststart",
+                "-y",
+                output_path
+            ], "Video concatenation")
+        finally:
+            try:
+                os.remove(file_list_path)
+            except OSError:
+                pass
+    
+    async def _concatenate_reencode(self, video_paths: List[str], infos: List[Dict], output_path: str):
+        """Concatenate mismatched clips with the concat filter in a single encode"""
         input_args = []
         for video_path in video_paths:
             input_args.extend(["-i", video_path])
         
-        # Simple concatenation with fade transitions
-        filter_parts = []
-        for i in range(len(video_paths) - 1):
-            if i == 0:
-                filter_parts.append(f"[0:v][1:v]xfade=transition=fade:duration=0.5:offset=7.5[v01]")
-            else:
-                filter_parts.append(f"[v0{i}][{i+1}:v]xfade=transition=fade:duration=0.5:offset=7.5[v0{i+1}]")
+        filter_parts, video_labels = self._normalize_filters(infos)
+        has_audio = all(info.get("audio") for info in infos)
+        n = len(video_paths)
         
-        # Audio concatenation
-        audio_inputs = "".join([f"[{i}:a]" for i in range(len(video_paths))])
-        filter_parts.append(f"{audio_inputs}concat=n={len(video_paths)}:v=0:a=1[outa]")
+        if has_audio:
+            streams = "".join(f"{video_labels[i]}[{i}:a]" for i in range(n))
+            filter_parts.append(f"{streams}concat=n={n}:v=1:a=1[outv][outa]")
+        else:
+            filter_parts.append(f"{''.join(video_labels)}concat=n={n}:v=1:a=0[outv]")
         
-        filter_complex = ";".join(filter_parts)
-        final_video = f"v0{len(video_paths)-1}" if len(video_paths) > 2 else "v01"
-        
-        cmd = input_args + [
-            "-filter_complex", filter_complex,
-            "-map", f"[{final_video}]",
-            "-map", "[outa]",
-            "-y",
-            output_path
+        cmd = [self.ffmpeg_path] + input_args + [
+            "-filter_complex", ";".join(filter_parts),
+            "-map", "[outv]"
         ]
+        cmd += ["-map", "[outa]"] if has_audio else ["-an"]
+        cmd += self._encode_args() + ["-y", output_path]
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        await self._run_ffmpeg(cmd, "Video re-encode concatenation")
+    
+    @staticmethod
+    def xfade_offsets(durations: List[float], transition_duration: float) -> List[float]:
+        """Cumulative xfade offsets: each transition starts T seconds before the running end"""
+        offsets = []
+        elapsed = 0.0
+        for i, duration in enumerate(durations[:-1]):
+            elapsed += duration
+            offsets.append(round(elapsed - (i + 1) * transition_duration, 3))
+        return offsets
+    
+    async def _concatenate_with_transitions(
+        self,
+        video_paths: List[str],
+        infos: List[Dict],
+        output_path: str,
+        transition_duration: float
+    ):
+        """Concatenate videos with crossfades in one filtergraph and one encode"""
+        durations = [info["duration"] for info in infos]
+        # A transition can't be longer than the shortest clip it joins
+        transition_duration = min([transition_duration] + [d / 2 for d in durations if d > 0])
+        offsets = self.xfade_offsets(durations, transition_duration)
         
-        stdout, stderr = await process.communicate()
+        input_args = []
+        for video_path in video_paths:
+            input_args.extend(["-i", video_path])
         
-        if process.returncode != 0:
-            error_msg = stderr.decode()
-            logger.error(f"Video transition concatenation failed: {error_msg}")
-            raise Exception(f"Video transition concatenation failed: {error_msg}")
+        filter_parts, video_labels = self._normalize_filters(infos)
+        
+        previous = video_labels[0]
+        for i, offset in enumerate(offsets, start=1):
+            label = f"[x{i}]"
+            filter_parts.append(
+                f"{previous}{video_labels[i]}xfade=transition=fade:"
+                f"duration={transition_duration}:offset={offset}{label}"
+            )
+            previous = label
+        
+        # Crossfade audio by the same amount so it stays in sync with the video
+        has_audio = all(info.get("audio") for info in infos)
+        if has_audio:
+            previous_audio = "[0:a]"
+            for i in range(1, len(video_paths)):
+                label = f"[a{i}]"
+                filter_parts.append(f"{previous_audio}[{i}:a]acrossfade=d={transition_duration}{label}")
+                previous_audio = label
+        
+        cmd = [self.ffmpeg_path] + input_args + [
+            "-filter_complex", ";".join(filter_parts),
+            "-map", previous
+        ]
+        cmd += ["-map", previous_audio] if has_audio else ["-an"]
+        cmd += self._encode_args() + ["-y", output_path]
+        
+        await self._run_ffmpeg(cmd, "Video transition concatenation")
     
+    @ffmpeg_operation("thumbnail")
     async def create_thumbnail(self, video_path: str, output_path: Optional[str] = None) -> str:
         """Create a thumbnail from the middle of the video"""
         if output_path is None:
@@ -286,6 +524,7 @@ class FFmpegService:
             output_path = str(self.temp_dir / f"{base_name}_thumb.jpg")
         
         try:
+            previous_size = system_metrics.file_size(output_path)
             cmd = [
                 self.ffmpeg_path,
                 "-i", video_path,
@@ -305,6 +544,7 @@ class FFmpegService:
             stdout, stderr = await process.communicate()
             
             if process.returncode == 0 and os.path.exists(output_path):
+                system_metrics.record_write(output_path, previous_size)
                 logger.info(f"Created thumbnail: {output_path}")
                 return output_path
             else:
@@ -316,11 +556,12 @@ class FFmpegService:
             logger.error(f"Error creating thumbnail: {e}")
             raise
     
+    @ffmpeg_operation("probe")
     async def get_video_info(self, video_path: str) -> Dict:
         """Get video information using ffprobe"""
         try:
             cmd = [
-                "ffprobe",
+                self.ffprobe_path,
                 "-v", "quiet",
                 "-print_format", "json",
                 "-show_format",
@@ -348,6 +589,34 @@ class FFmpegService:
             logger.error(f"Error getting video info: {e}")
             raise
     
+    async def probe(self, video_path: str) -> Dict:
+        """Get duration and primary stream parameters, cached per file version"""
+        stat = os.stat(video_path)
+        cache_key = (os.path.abspath(video_path), stat.st_mtime_ns, stat.st_size)
+        cached = self._probe_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        info = await self.get_video_info(video_path)
+        streams = info.get("streams", [])
+        video = next((s for s in streams if s.get("codec_type") == "video"), None)
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+        
+        duration = info.get("format", {}).get("duration") or (video or {}).get("duration")
+        if duration is None:
+            raise Exception(f"Could not determine duration of {video_path}")
+        
+        probed = {
+            "duration": float(duration),
+            "video": video,
+            "audio": audio
+        }
+        
+        if len(self._probe_cache) >= 512:
+            self._probe_cache.pop(next(iter(self._probe_cache)))
+        self._probe_cache[cache_key] = probed
+        return probed
+    
     def cleanup_temp_files(self, keep_recent: int = 10):
         """Clean up temporary files, keeping only the most recent ones"""
         try:
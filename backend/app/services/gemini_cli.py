@@ -5,13 +5,15 @@ import os
 import subprocess
 import tempfile
 from pathlib import Path
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, AsyncIterator
 from tenacity import retry, stop_after_attempt, wait_exponential
-import httpx
 from app.config import settings
-import google.generativeai as genai
-from google.cloud import aiplatform
-from app.database import get_user_setting
+from app.services import google_sdk
+from app.services.settings_store import settings_store
+from app.services.media_cache import media_cache
+from app.services.mcp_pool import credential_fingerprint
+from app.services.http_clients import http_clients
+from app.services.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +25,15 @@ class GeminiCLIService:
         self.location = settings.GOOGLE_CLOUD_LOCATION
         self.initialized = False
         self.mcp_server_url = "http://localhost:3000"  # Default MCP media server
-        self._initialize_apis()
+        # Google SDKs are initialized on first use (or by the startup warm-up)
+        self._apis_ready = False
     
     def _get_api_key_from_user_settings(self, db_session=None, user_id=None, key_name="gemini_api_key"):
         """Get API key from user settings first, then environment variables"""
         try:
             if db_session and user_id:
                 # Try to get from user settings first
-                user_key = get_user_setting(db_session, user_id, key_name)
+                user_key = settings_store.get_sync(db_session, user_id, key_name)
                 if user_key:
                     return user_key
         except Exception as e:
@@ -82,28 +85,33 @@ class GeminiCLIService:
             project_id = self._get_api_key_from_user_settings(db_session, user_id, "google_cloud_project") or self.project_id
             
             # Initialize Google Cloud AI Platform
-            if settings.GOOGLE_APPLICATION_CREDENTIALS:
-                aiplatform.init(
-                    project=project_id,
-                    location=self.location,
-                    credentials=settings.GOOGLE_APPLICATION_CREDENTIALS
-                )
-            else:
-                aiplatform.init(
-                    project=project_id,
-                    location=self.location
-                )
+            google_sdk.init_aiplatform(project_id, self.location, settings.GOOGLE_APPLICATION_CREDENTIALS)
             
             # Configure Gemini API
             if gemini_key:
-                genai.configure(api_key=gemini_key)
+                google_sdk.configure_genai(gemini_key)
             
+            self._apis_ready = True
             logger.info("APIs initialized with Google Cloud AI Platform")
             
         except Exception as e:
             logger.error(f"Failed to initialize APIs: {e}")
             # Continue with fallback to Gemini for text generation
     
+    def _credential_fingerprint(self, db_session=None, user_id=None) -> str:
+        """Fingerprint of the Google project and keys a generation for this user runs with"""
+        return credential_fingerprint({
+            "PROJECT_ID": self._get_api_key_from_user_settings(db_session, user_id, "google_cloud_project") or self.project_id,
+            "LOCATION": self.location,
+            "GOOGLE_APPLICATION_CREDENTIALS": settings.GOOGLE_APPLICATION_CREDENTIALS,
+            "GOOGLE_API_KEY": self._get_api_key_from_user_settings(db_session, user_id, "gemini_api_key")
+        })
+    
+    async def _ensure_apis(self):
+        """Initialize the default Google SDK configuration off the event loop if not done yet"""
+        if not self._apis_ready:
+            await asyncio.to_thread(self._initialize_apis)
+    
     async def install_gemini_cli(self) -> bool:
         """Install Gemini CLI if not present"""
         try:
@@ -139,24 +147,27 @@ class GeminiCLIService:
             logger.error(f"Error checking Gemini CLI: {e}")
             return False
 
+    @tracer.traced("mcp.media_server", kind="client")
     async def _call_mcp_media_server(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Call the MCP media server for generation"""
+        tracer.set_attributes(endpoint=endpoint)
         try:
             url = f"{self.mcp_server_url}/{endpoint}"
-            headers = {
+            headers = tracer.inject({
                 "Content-Type": "application/json",
                 "X-API-Key": settings.GOOGLE_API_KEY or ""
-            }
+            })
+            
+            client = http_clients.client("gemini")
+            response = await client.post(url, json=params, headers=headers, timeout=300.0)
+            response.raise_for_status()
+            return response.json()
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=params, headers=headers, timeout=300.0)
-                response.raise_for_status()
-                return response.json()
-                
         except Exception as e:
             logger.error(f"Error calling MCP media server: {e}")
             raise
 
+    @tracer.traced("gemini_cli.tool", kind="client")
     async def _call_gemini_cli_with_mcp(self, prompt: str, tool_name: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """Call Gemini CLI with MCP tools for media generation"""
         try:
@@ -196,6 +207,7 @@ class GeminiCLIService:
             raise
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @tracer.traced("gemini.generate_video")
     async def generate_video(
         self,
         prompt: str,
@@ -228,6 +240,28 @@ class GeminiCLIService:
         try:
             logger.info(f"Generating Veo 3 video with prompt: {prompt}")
             
+            # Identical (normalized) requests are served from the media cache
+            cache_params = {
+                "prompt": prompt,
+                "duration": duration,
+                "aspect_ratio": aspect_ratio,
+                "style": style,
+                "seed": seed,
+                "temperature": temperature,
+                "output_format": output_format,
+                # Never serve one tenant's video to a caller running with other credentials
+                "credentials": self._credential_fingerprint(db_session, user_id)
+            }
+            cached = await media_cache.get("video", cache_params)
+            if cached:
+                video_data = await media_cache.read(cached)
+                return {
+                    **cached["metadata"],
+                    "video_data": video_data,
+                    "video_size": len(video_data),
+                    "cached": True
+                }
+            
             # Re-initialize with user settings if provided
             if db_session and user_id and not self.initialized:
                 self._initialize_apis(db_session, user_id)
@@ -277,10 +311,10 @@ class GeminiCLIService:
             if "video_data" not in result and "videoUrl" in result:
                 # Download video from URL
                 video_url = result["videoUrl"]
-                async with httpx.AsyncClient() as client:
-                    video_response = await client.get(video_url)
-                    video_response.raise_for_status()
-                    result["video_data"] = video_response.content
+                client = http_clients.client("downloads")
+                video_response = await client.get(video_url)
+                video_response.raise_for_status()
+                result["video_data"] = video_response.content
             
             final_result = {
                 "status": "success",
@@ -295,12 +329,22 @@ class GeminiCLIService:
             }
             
             logger.info(f"Veo 3 video generation completed: {len(final_result['video_data'])} bytes")
+            
+            if final_result["video_data"]:
+                await media_cache.put(
+                    "video",
+                    cache_params,
+                    {k: v for k, v in final_result.items() if k not in ("video_data", "video_size")},
+                    data=final_result["video_data"],
+                    extension=f".{output_format}"
+                )
             return final_result
                     
         except Exception as e:
             logger.error(f"Error in generate_video: {e}")
             raise
     
+    @tracer.traced("veo.generate", kind="client")
     async def _call_veo_api_real(
         self, 
         prompt: str, 
@@ -348,7 +392,8 @@ class GeminiCLIService:
                 veo_request["temperature"] = max(0.0, min(1.0, temperature))
             
             # Call Veo API via Google Cloud AI Platform
-            endpoint = aiplatform.Endpoint(
+            await self._ensure_apis()
+            endpoint = google_sdk.aiplatform().Endpoint(
                 endpoint_name=f"projects/{project_id}/locations/{self.location}/endpoints/veo"
             )
             
@@ -490,6 +535,7 @@ class GeminiCLIService:
                 "error": str(e)
             }
     
+    @tracer.traced("gemini_cli.text", kind="client")
     async def _call_gemini_cli_text(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1000) -> str:
         """
         Call Gemini CLI for text generation
@@ -521,6 +567,7 @@ class GeminiCLIService:
             logger.error(f"Error calling Gemini CLI for text: {e}")
             raise
 
+    @tracer.traced("gemini.generate_text")
     async def generate_text(
         self,
         prompt: str,
@@ -542,7 +589,8 @@ class GeminiCLIService:
             except Exception as e:
                 logger.warning(f"Gemini CLI with MCP failed, falling back to API: {e}")
                 # Fallback to API
-                model = genai.GenerativeModel('gemini-pro')
+                await self._ensure_apis()
+                model = google_sdk.genai().GenerativeModel('gemini-pro')
                 response = await asyncio.to_thread(
                     model.generate_content,
                     prompt
@@ -554,6 +602,56 @@ class GeminiCLIService:
             # Fallback to basic response
             return f"I apologize, but I encountered an error while processing your request: {str(e)}"
     
+    async def stream_text(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        response_mime_type: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield generated text as the Gemini API streams it (one chunk from generate_text if streaming is unavailable)"""
+        try:
+            await self._ensure_apis()
+            genai = google_sdk.genai()
+            model = genai.GenerativeModel('gemini-pro')
+            config = genai.types.GenerationConfig(temperature=temperature, max_output_tokens=max_tokens)
+            if response_mime_type:
+                try:
+                    config = genai.types.GenerationConfig(
+                        temperature=temperature, max_output_tokens=max_tokens, response_mime_type=response_mime_type
+                    )
+                except TypeError:
+                    # Older SDKs have no structured output; the prompt still asks for the format
+                    pass
+        except Exception as e:
+            logger.warning(f"Gemini streaming unavailable, generating the full response: {e}")
+            yield await self.generate_text(prompt, temperature, max_tokens)
+            return
+        
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        
+        def produce():
+            # The SDK stream is a blocking iterator; hand each chunk to the event loop as it arrives
+            try:
+                for chunk in model.generate_content(prompt, generation_config=config, stream=True):
+                    if chunk.text:
+                        loop.call_soon_threadsafe(chunks.put_nowait, chunk.text)
+                loop.call_soon_threadsafe(chunks.put_nowait, finished)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+        
+        # Not awaited: if the consumer stops early the thread finishes the stream on its own
+        loop.run_in_executor(None, produce)
+        while True:
+            item = await chunks.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    
     async def check_gemini_cli_available(self) -> bool:
         """Check if Gemini CLI is available and working"""
         try:
@@ -580,14 +678,14 @@ class GeminiCLIService:
     async def check_mcp_server_available(self) -> bool:
         """Check if MCP media server is available"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.mcp_server_url}/health", timeout=5.0)
-                if response.status_code == 200:
-                    logger.info("MCP media server is available")
-                    return True
-                else:
-                    logger.warning(f"MCP media server returned status: {response.status_code}")
-                    return False
+            client = http_clients.client("gemini")
+            response = await client.get(f"{self.mcp_server_url}/health", timeout=5.0)
+            if response.status_code == 200:
+                logger.info("MCP media server is available")
+                return True
+            else:
+                logger.warning(f"MCP media server returned status: {response.status_code}")
+                return False
         except Exception as e:
             logger.warning(f"MCP media server not available: {e}")
             return False
@@ -625,7 +723,8 @@ class GeminiCLIService:
             except Exception as e:
                 logger.warning(f"Gemini CLI models failed, falling back to API: {e}")
                 # Fallback to API
-                models = genai.list_models()
+                await self._ensure_apis()
+                models = google_sdk.genai().list_models()
                 model_names = [model.name for model in models]
                 
                 # Add media generation models
@@ -662,7 +761,8 @@ class GeminiCLIService:
                 }
             else:
                 # Get info for other models
-                models = genai.list_models()
+                await self._ensure_apis()
+                models = google_sdk.genai().list_models()
                 for model in models:
                     if model.name == model_name:
                         return {
@@ -691,6 +791,7 @@ class GeminiCLIService:
                 "supported_aspect_ratios": ["16:9", "9:16", "1:1"]
             }
 
+    @tracer.traced("gemini.generate_image")
     async def generate_image(
         self,
         prompt: str,
@@ -741,10 +842,10 @@ class GeminiCLIService:
             if "image_data" not in result and "imageUrl" in result:
                 # Download image from URL
                 image_url = result["imageUrl"]
-                async with httpx.AsyncClient() as client:
-                    image_response = await client.get(image_url)
-                    image_response.raise_for_status()
-                    result["image_data"] = image_response.content
+                client = http_clients.client("downloads")
+                image_response = await client.get(image_url)
+                image_response.raise_for_status()
+                result["image_data"] = image_response.content
             
             return {
                 "status": "success",
@@ -760,6 +861,7 @@ class GeminiCLIService:
             logger.error(f"Error in generate_image: {e}")
             raise
 
+    @tracer.traced("gemini.generate_music")
     async def generate_music(
         self,
         prompt: str,
@@ -810,10 +912,10 @@ class GeminiCLIService:
             if "music_data" not in result and "musicUrl" in result:
                 # Download music from URL
                 music_url = result["musicUrl"]
-                async with httpx.AsyncClient() as client:
-                    music_response = await client.get(music_url)
-                    music_response.raise_for_status()
-                    result["music_data"] = music_response.content
+                client = http_clients.client("downloads")
+                music_response = await client.get(music_url)
+                music_response.raise_for_status()
+                result["music_data"] = music_response.content
             
             return {
                 "status": "success",
@@ -1,12 +1,9 @@
-import google.generativeai as genai
-from google.cloud import aiplatform
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
 import asyncio
 import json
 import logging
 from typing import Dict, List, Optional, Any
 from app.config import settings
+from app.services import google_sdk
 from app.models.video_request import VideoGenerationRequest, VideoGenerationResponse
 import tempfile
 import os
@@ -16,15 +13,23 @@ logger = logging.getLogger(__name__)
 
 class GeminiService:
     def __init__(self):
-        self.setup_gemini()
-        self.setup_vertex_ai()
+        # SDK clients are created on first use so importing the app stays cheap
+        self._gemini_model = None
+        self._vertex_ready = False
+    
+    @property
+    def gemini_model(self):
+        """Gemini model, initialized on first use"""
+        if self._gemini_model is None:
+            self.setup_gemini()
+        return self._gemini_model
     
     def setup_gemini(self):
         """Initialize Gemini AI"""
         try:
             if settings.GEMINI_API_KEY:
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.gemini_model = genai.GenerativeModel(settings.GEMINI_MODEL)
+                google_sdk.configure_genai(settings.GEMINI_API_KEY)
+                self._gemini_model = google_sdk.genai().GenerativeModel(settings.GEMINI_MODEL)
                 logger.info("Gemini AI initialized successfully")
             else:
                 logger.warning("GEMINI_API_KEY not found in environment")
@@ -36,10 +41,8 @@ class GeminiService:
         """Initialize Vertex AI for Veo"""
         try:
             if settings.GOOGLE_CLOUD_PROJECT:
-                aiplatform.init(
-                    project=settings.GOOGLE_CLOUD_PROJECT,
-                    location="us-central1"
-                )
+                google_sdk.init_aiplatform(settings.GOOGLE_CLOUD_PROJECT, "us-central1")
+                self._vertex_ready = True
                 logger.info("Vertex AI initialized successfully")
             else:
                 logger.warning("GOOGLE_CLOUD_PROJECT not found in environment")
@@ -110,6 +113,8 @@ class GeminiService:
                 veo_params["reference_image"] = request.reference_image
             
             # Generate video using Vertex AI
+            if not self._vertex_ready:
+                await asyncio.to_thread(self.setup_vertex_ai)
             video_response = await self._call_veo_api(veo_params)
             
             return VideoGenerationResponse(
@@ -0,0 +1,63 @@
+"""
+Google SDK loader for VeoGen
+Deferred imports and idempotent initialization of google-generativeai and Vertex AI
+"""
+
+import logging
+import threading
+from typing import Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_genai_key: Optional[str] = None
+_aiplatform_config: Optional[Tuple] = None
+
+def genai():
+    """The google.generativeai module, imported on first use"""
+    import google.generativeai as genai
+    return genai
+
+def aiplatform():
+    """The google.cloud.aiplatform module, imported on first use"""
+    from google.cloud import aiplatform
+    return aiplatform
+
+def configure_genai(api_key: Optional[str]):
+    """Configure the Gemini SDK (skipped when already configured with this key)"""
+    global _genai_key
+    if not api_key:
+        return
+    with _lock:
+        if _genai_key == api_key:
+            return
+        genai().configure(api_key=api_key)
+        _genai_key = api_key
+
+def init_aiplatform(project: Optional[str], location: str, credentials=None):
+    """Initialize Vertex AI (skipped when already initialized with this configuration)"""
+    global _aiplatform_config
+    config = (project, location, credentials)
+    with _lock:
+        if _aiplatform_config == config:
+            return
+        if credentials:
+            aiplatform().init(project=project, location=location, credentials=credentials)
+        else:
+            aiplatform().init(project=project, location=location)
+        _aiplatform_config = config
+
+def warm_up():
+    """Import both SDKs and apply the deployment defaults (run off the event loop at startup)"""
+    try:
+        configure_genai(settings.GEMINI_API_KEY)
+        init_aiplatform(
+            settings.GOOGLE_CLOUD_PROJECT,
+            settings.GOOGLE_CLOUD_LOCATION,
+            settings.GOOGLE_APPLICATION_CREDENTIALS
+        )
+        logger.info("Google SDKs initialized")
+    except Exception as e:
+        logger.error(f"Failed to initialize Google SDKs: {e}")
@@ -0,0 +1,120 @@
+"""
+HTTP Client Registry for VeoGen
+Application-scoped, keep-alive connection pools for outbound HTTP
+"""
+
+import importlib.util
+import logging
+from typing import Dict
+
+import aiohttp
+import httpx
+
+from app.config import settings
+from app.middleware.metrics import HTTP_CLIENT_POOL_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+class HTTPClientRegistry:
+    """Named, lazily created client pools shared by all services
+
+    aiohttp pools are used for the MCP servers (JSON-RPC calls and
+    notification streams); httpx pools are used for Gemini/MCP media
+    server calls and media downloads, with HTTP/2 when `h2` is installed.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.http2 = settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+    def start(self):
+        """Create the standard pools up front (called from the application lifespan)"""
+        self.session("mcp")
+        self.client("gemini")
+        self.client("downloads")
+
+    def session(self, name: str) -> aiohttp.ClientSession:
+        """Get (or create) the aiohttp session for an upstream"""
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.HTTP_POOL_MAX_CONNECTIONS,
+                limit_per_host=settings.HTTP_POOL_MAX_PER_HOST,
+                keepalive_timeout=settings.HTTP_POOL_KEEPALIVE_EXPIRY
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=None,
+                    connect=settings.HTTP_CONNECT_TIMEOUT,
+                    sock_read=settings.HTTP_READ_TIMEOUT
+                )
+            )
+            self._sessions[name] = session
+            self._register_pool_metrics(name)
+            logger.info(f"Created HTTP pool '{name}' (aiohttp)")
+        return session
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        """Get (or create) the httpx client for an upstream"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.HTTP_POOL_KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(
+                    settings.HTTP_READ_TIMEOUT,
+                    connect=settings.HTTP_CONNECT_TIMEOUT
+                ),
+                follow_redirects=True
+            )
+            self._clients[name] = client
+            self._register_pool_metrics(name)
+            logger.info(f"Created HTTP pool '{name}' (httpx, http2={self.http2})")
+        return client
+
+    def pool_stats(self, name: str) -> Dict[str, int]:
+        """Connections in use / idle for a pool (best effort, uses client internals)"""
+        try:
+            if name in self._sessions:
+                connector = self._sessions[name].connector
+                if connector is None or connector.closed:
+                    return {"in_use": 0, "idle": 0}
+                return {
+                    "in_use": len(connector._acquired),
+                    "idle": sum(len(conns) for conns in connector._conns.values())
+                }
+            if name in self._clients:
+                connections = self._clients[name]._transport._pool.connections
+                idle = sum(1 for conn in connections if conn.is_idle())
+                return {"in_use": len(connections) - idle, "idle": idle}
+        except Exception as e:
+            logger.debug(f"Could not read stats for HTTP pool '{name}': {e}")
+        return {"in_use": 0, "idle": 0}
+
+    def _register_pool_metrics(self, name: str):
+        for state in ("in_use", "idle"):
+            HTTP_CLIENT_POOL_CONNECTIONS.labels(pool=name, state=state).set_function(
+                lambda state=state: self.pool_stats(name)[state]
+            )
+        HTTP_CLIENT_POOL_CONNECTIONS.labels(pool=name, state="limit").set(settings.HTTP_POOL_MAX_CONNECTIONS)
+
+    async def close(self):
+        """Close every pool (called from the application lifespan)"""
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        for client in self._clients.values():
+            if not client.is_closed:
+                await client.aclose()
+        self._sessions.clear()
+        self._clients.clear()
+        logger.info("Closed HTTP client pools")
+
+# Global instance
+http_clients = HTTPClientRegistry()
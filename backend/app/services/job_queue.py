@@ -0,0 +1,576 @@
+"""
+Generation Job Queue for VeoGen
+Durable, bounded job queue with a fixed-size async worker pool
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Set, Callable, Awaitable
+
+from sqlalchemy import or_
+
+from app.config import settings
+from app.database import SessionLocal, GenerationJob
+from app.middleware.metrics import set_queue_size, set_active_generations
+from app.services.progress_hub import progress_hub
+
+logger = logging.getLogger(__name__)
+
+# Jobs that were interrupted this many times are failed instead of re-queued
+MAX_ATTEMPTS = 3
+
+UNFINISHED_STATUSES = ("queued", "processing")
+
+JobHandler = Callable[[str, Dict[str, Any], str], Awaitable[Dict[str, Any]]]
+
+class QueueFullError(Exception):
+    """Raised when the generation queue cannot accept more jobs"""
+
+class SQLJobStore:
+    """Job store backed by the application database (SQLite/Postgres)"""
+
+    def _to_dict(self, row: GenerationJob) -> Dict[str, Any]:
+        return {
+            "job_id": row.id,
+            "user_id": row.user_id,
+            "job_type": row.job_type,
+            "status": row.status,
+            "progress": row.progress or 0,
+            "message": row.message,
+            "request": row.payload or {},
+            "result": row.result,
+            "error": row.error,
+            "attempts": row.attempts or 0,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "started_at": row.started_at.isoformat() if row.started_at else None,
+            "completed_at": row.completed_at.isoformat() if row.completed_at else None
+        }
+
+    def _save_sync(self, job: Dict[str, Any]):
+        db = SessionLocal()
+        try:
+            row = db.query(GenerationJob).filter(GenerationJob.id == job["job_id"]).first()
+            if not row:
+                row = GenerationJob(id=job["job_id"])
+                db.add(row)
+            row.user_id = str(job["user_id"])
+            row.job_type = job["job_type"]
+            row.status = job["status"]
+            row.progress = job.get("progress", 0)
+            row.message = job.get("message")
+            row.payload = job.get("request", {})
+            row.result = job.get("result")
+            row.error = job.get("error")
+            row.attempts = job.get("attempts", 0)
+            for field in ("created_at", "started_at", "completed_at"):
+                value = job.get(field)
+                setattr(row, field, datetime.fromisoformat(value) if value else None)
+            db.commit()
+        finally:
+            db.close()
+
+    def _get_sync(self, job_id: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            row = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+            return self._to_dict(row) if row else None
+        finally:
+            db.close()
+
+    def _list_user_sync(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            rows = db.query(GenerationJob).filter(
+                GenerationJob.user_id == str(user_id)
+            ).order_by(GenerationJob.created_at.desc()).limit(limit).all()
+            return [self._to_dict(row) for row in rows]
+        finally:
+            db.close()
+
+    def _list_unclaimed_sync(self) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            rows = db.query(GenerationJob).filter(
+                GenerationJob.status.in_(UNFINISHED_STATUSES),
+                or_(GenerationJob.lease_expires_at.is_(None), GenerationJob.lease_expires_at < datetime.utcnow())
+            ).order_by(GenerationJob.created_at.asc()).all()
+            return [self._to_dict(row) for row in rows]
+        finally:
+            db.close()
+
+    def _claim_sync(self, job_ids: List[str], owner: str) -> Set[str]:
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.query(GenerationJob).filter(
+                GenerationJob.id.in_(job_ids),
+                GenerationJob.status.in_(UNFINISHED_STATUSES),
+                or_(
+                    GenerationJob.owner.is_(None),
+                    GenerationJob.owner == owner,
+                    GenerationJob.lease_expires_at < now
+                )
+            ).update(
+                {"owner": owner, "lease_expires_at": now + timedelta(seconds=settings.GENERATION_JOB_LEASE)},
+                synchronize_session=False
+            )
+            db.commit()
+            rows = db.query(GenerationJob.id).filter(
+                GenerationJob.id.in_(job_ids), GenerationJob.owner == owner
+            ).all()
+            return {row.id for row in rows}
+        finally:
+            db.close()
+
+    def _release_sync(self, job_id: str, owner: str):
+        db = SessionLocal()
+        try:
+            db.query(GenerationJob).filter(
+                GenerationJob.id == job_id, GenerationJob.owner == owner
+            ).update({"owner": None, "lease_expires_at": None}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _delete_sync(self, job_id: str) -> bool:
+        db = SessionLocal()
+        try:
+            deleted = db.query(GenerationJob).filter(GenerationJob.id == job_id).delete()
+            db.commit()
+            return deleted > 0
+        finally:
+            db.close()
+
+    async def save(self, job: Dict[str, Any]):
+        await asyncio.to_thread(self._save_sync, job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get_sync, job_id)
+
+    async def list_for_user(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._list_user_sync, user_id, limit)
+
+    async def list_unclaimed(self) -> List[Dict[str, Any]]:
+        """Unfinished jobs without a live lease holder"""
+        return await asyncio.to_thread(self._list_unclaimed_sync)
+
+    async def claim(self, job_ids: List[str], owner: str) -> Set[str]:
+        """Take (or renew) the lease on unfinished jobs; returns the ids this owner now holds"""
+        if not job_ids:
+            return set()
+        return await asyncio.to_thread(self._claim_sync, job_ids, owner)
+
+    async def release(self, job_id: str, owner: str):
+        """Drop a job's lease if this owner still holds it"""
+        await asyncio.to_thread(self._release_sync, job_id, owner)
+
+    async def delete(self, job_id: str) -> bool:
+        return await asyncio.to_thread(self._delete_sync, job_id)
+
+    async def close(self):
+        pass
+
+class RedisJobStore:
+    """Job store backed by Redis (used when REDIS_ENABLED is set)"""
+
+    KEY_PREFIX = "veogen:jobs"
+
+    # KEYS: lease key, unfinished set; ARGV: owner, lease seconds, job id
+    CLAIM_SCRIPT = """
+    if not redis.call('ZSCORE', KEYS[2], ARGV[3]) then return 0 end
+    local holder = redis.call('GET', KEYS[1])
+    if holder and holder ~= ARGV[1] then return 0 end
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return 1
+    """
+    # KEYS: lease key; ARGV: owner
+    RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+    return 0
+    """
+
+    def __init__(self, redis_url: str):
+        import redis.asyncio as aioredis
+        self.redis = aioredis.from_url(redis_url, decode_responses=True)
+        self._claim_script = self.redis.register_script(self.CLAIM_SCRIPT)
+        self._release_script = self.redis.register_script(self.RELEASE_SCRIPT)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{job_id}"
+
+    def _lease_key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}:lease:{job_id}"
+
+    def _user_key(self, user_id: str) -> str:
+        return f"{self.KEY_PREFIX}:user:{user_id}"
+
+    @property
+    def _unfinished_key(self) -> str:
+        return f"{self.KEY_PREFIX}:unfinished"
+
+    async def save(self, job: Dict[str, Any]):
+        created = datetime.fromisoformat(job["created_at"]).timestamp()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._job_key(job["job_id"]), json.dumps(job))
+            pipe.zadd(self._user_key(job["user_id"]), {job["job_id"]: created})
+            if job["status"] in UNFINISHED_STATUSES:
+                pipe.zadd(self._unfinished_key, {job["job_id"]: created})
+            else:
+                pipe.zrem(self._unfinished_key, job["job_id"])
+            await pipe.execute()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(self._job_key(job_id))
+        return json.loads(raw) if raw else None
+
+    async def _get_many(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        if not job_ids:
+            return []
+        raw_jobs = await self.redis.mget([self._job_key(job_id) for job_id in job_ids])
+        return [json.loads(raw) for raw in raw_jobs if raw]
+
+    async def list_for_user(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        job_ids = await self.redis.zrevrange(self._user_key(user_id), 0, limit - 1)
+        return await self._get_many(job_ids)
+
+    async def list_unclaimed(self) -> List[Dict[str, Any]]:
+        """Unfinished jobs without a live lease holder (leases expire with their key)"""
+        job_ids = await self.redis.zrange(self._unfinished_key, 0, -1)
+        if not job_ids:
+            return []
+        holders = await self.redis.mget([self._lease_key(job_id) for job_id in job_ids])
+        return await self._get_many([job_id for job_id, holder in zip(job_ids, holders) if holder is None])
+
+    async def claim(self, job_ids: List[str], owner: str) -> Set[str]:
+        """Take (or renew) the lease on unfinished jobs; returns the ids this owner now holds"""
+        claimed = await asyncio.gather(*(
+            self._claim_script(
+                keys=[self._lease_key(job_id), self._unfinished_key],
+                args=[owner, settings.GENERATION_JOB_LEASE, job_id]
+            )
+            for job_id in job_ids
+        ))
+        return {job_id for job_id, held in zip(job_ids, claimed) if held}
+
+    async def release(self, job_id: str, owner: str):
+        """Drop a job's lease if this owner still holds it"""
+        await self._release_script(keys=[self._lease_key(job_id)], args=[owner])
+
+    async def delete(self, job_id: str) -> bool:
+        job = await self.get(job_id)
+        if not job:
+            return False
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._job_key(job_id), self._lease_key(job_id))
+            pipe.zrem(self._user_key(job["user_id"]), job_id)
+            pipe.zrem(self._unfinished_key, job_id)
+            await pipe.execute()
+        return True
+
+    async def close(self):
+        await self.redis.close()
+
+class GenerationJobQueue:
+    """Bounded generation queue processed by a fixed-size worker pool
+
+    Every queued or running job is leased to the process that holds it and the
+    lease is renewed in the background. Other processes (uvicorn workers, the
+    new side of a rolling restart) only recover jobs whose lease has expired.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue_size: int = None, store=None):
+        self.max_workers = max_workers or settings.MAX_CONCURRENT_GENERATIONS
+        self.max_queue_size = max_queue_size or settings.MAX_QUEUE_SIZE
+        self.timeout = settings.GENERATION_TIMEOUT
+        self.store = store
+        self.handlers: Dict[str, JobHandler] = {}
+
+        # Queued and running jobs are kept in memory; finished jobs live only in the store
+        self.active_jobs: Dict[str, Dict[str, Any]] = {}
+        self.running: set = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._lease_task: Optional[asyncio.Task] = None
+
+        # Identifies this process as the lease holder of its jobs
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handler_tasks: Dict[str, asyncio.Task] = {}
+        self._lost: Set[str] = set()
+
+    def register_handler(self, job_type: str, handler: JobHandler):
+        """Register the coroutine that executes jobs of the given type"""
+        self.handlers[job_type] = handler
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    def queued_count(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _update_gauges(self):
+        set_queue_size(self.queued_count())
+        set_active_generations(len(self.running))
+
+    async def start(self):
+        """Create the store, recover unfinished jobs and spawn the workers"""
+        if self.started:
+            return
+
+        if self.store is None:
+            if settings.REDIS_ENABLED:
+                self.store = RedisJobStore(settings.REDIS_URL)
+            else:
+                self.store = SQLJobStore()
+
+        self._queue = asyncio.Queue()
+        await self._recover_jobs()
+
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.max_workers)
+        ]
+        self._lease_task = asyncio.create_task(self._lease_loop())
+        self._update_gauges()
+        logger.info(
+            f"Generation queue started with {self.max_workers} workers "
+            f"(max queue size {self.max_queue_size}, store {type(self.store).__name__})"
+        )
+
+    async def stop(self):
+        """Stop the workers; interrupted jobs stay unfinished and their leases are released for recovery"""
+        if self._lease_task:
+            self._lease_task.cancel()
+            await asyncio.gather(self._lease_task, return_exceptions=True)
+            self._lease_task = None
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self.store:
+            for job_id in list(self.active_jobs):
+                try:
+                    await self.store.release(job_id, self.owner_id)
+                except Exception as e:
+                    logger.warning(f"Could not release lease of generation job {job_id}: {e}")
+            self.active_jobs.clear()
+            await self.store.close()
+        logger.info("Generation queue stopped")
+
+    async def _recover_jobs(self):
+        """Re-enqueue unfinished jobs whose lease expired (their process stopped or died)"""
+        try:
+            unclaimed = [job for job in await self.store.list_unclaimed() if job["job_id"] not in self.active_jobs]
+            claimed = await self.store.claim([job["job_id"] for job in unclaimed], self.owner_id)
+        except Exception as e:
+            logger.error(f"Could not recover generation jobs: {e}")
+            return
+
+        recovered = 0
+        for job in unclaimed:
+            if job["job_id"] not in claimed:
+                # Another process recovered it first
+                continue
+            if job["attempts"] >= MAX_ATTEMPTS:
+                job.update({
+                    "status": "failed",
+                    "error": f"Job interrupted {job['attempts']} times, giving up",
+                    "completed_at": datetime.utcnow().isoformat()
+                })
+                await self.store.save(job)
+                await self.store.release(job["job_id"], self.owner_id)
+                continue
+
+            job["status"] = "queued"
+            job["message"] = "Job re-queued after its worker stopped"
+            self.active_jobs[job["job_id"]] = job
+            self._queue.put_nowait(job["job_id"])
+            recovered += 1
+
+        if recovered:
+            logger.info(f"Recovered {recovered} unfinished generation jobs")
+            self._update_gauges()
+
+    async def _renew_leases(self):
+        """Renew the leases of this process's jobs; jobs whose lease was lost are dropped here"""
+        job_ids = list(self.active_jobs)
+        held = await self.store.claim(job_ids, self.owner_id)
+        for job_id in job_ids:
+            job = self.active_jobs.get(job_id)
+            if job_id in held or not job or job["status"] not in UNFINISHED_STATUSES:
+                continue
+            # Another process recovered it after the lease expired; it runs the job now
+            logger.error(f"Lost lease of generation job {job_id}, dropping it here")
+            self.active_jobs.pop(job_id, None)
+            task = self._handler_tasks.get(job_id)
+            if task:
+                self._lost.add(job_id)
+                task.cancel()
+        self._update_gauges()
+
+    async def _lease_loop(self):
+        """Keep this process's leases alive and pick up jobs whose process went away"""
+        while True:
+            await asyncio.sleep(settings.GENERATION_JOB_LEASE / 3)
+            try:
+                await self._renew_leases()
+                await self._recover_jobs()
+            except Exception as e:
+                logger.warning(f"Could not renew generation job leases: {e}")
+
+    async def submit(self, job_type: str, user_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Admit a new job; raises QueueFullError when the queue is at capacity"""
+        if job_type not in self.handlers:
+            raise ValueError(f"No handler registered for job type: {job_type}")
+        if not self.started:
+            await self.start()
+        if self.queued_count() >= self.max_queue_size:
+            raise QueueFullError(
+                f"Generation queue is full ({self.max_queue_size} jobs waiting)"
+            )
+
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "user_id": user_id,
+            "job_type": job_type,
+            "status": "queued",
+            "progress": 0,
+            "message": "Job queued for processing",
+            "request": payload,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "completed_at": None
+        }
+
+        await self.store.save(job)
+        if await self.store.claim([job_id], self.owner_id):
+            self.active_jobs[job_id] = job
+            self._queue.put_nowait(job_id)
+        self._update_gauges()
+        return job
+
+    def update_progress(self, job_id: str, progress: int, status: str = None, message: str = None):
+        """Record progress for a running job (in memory; persisted on state changes)"""
+        job = self.active_jobs.get(job_id)
+        if not job:
+            return
+        job["progress"] = progress
+        if status:
+            job["status"] = status
+        if message:
+            job["message"] = message
+        self._publish(job)
+
+    def _publish(self, job: Dict[str, Any]):
+        progress_hub.publish(
+            f"user:{job['user_id']}", job["job_id"], job.get("progress"), job.get("status"),
+            job.get("message") or job.get("error"), job_type=job.get("job_type")
+        )
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.active_jobs.get(job_id)
+                if job:
+                    await self._run_job(job)
+            except Exception as e:
+                logger.error(f"Generation worker {worker_id} failed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+        handler = self.handlers.get(job["job_type"])
+
+        job.update({
+            "status": "processing",
+            "progress": max(job.get("progress", 0), 5),
+            "attempts": job.get("attempts", 0) + 1,
+            "started_at": datetime.utcnow().isoformat()
+        })
+        self.running.add(job_id)
+        self._update_gauges()
+        self._publish(job)
+        await self.store.save(job)
+
+        try:
+            if handler is None:
+                raise Exception(f"No handler registered for job type: {job['job_type']}")
+            self._handler_tasks[job_id] = asyncio.create_task(handler(job_id, job["request"], job["user_id"]))
+            result = await asyncio.wait_for(self._handler_tasks[job_id], timeout=self.timeout)
+            job.update({
+                "status": "completed",
+                "progress": 100,
+                "result": result,
+                "completed_at": result.get("completed_at") or datetime.utcnow().isoformat()
+            })
+            logger.info(f"Generation job {job_id} completed")
+        except asyncio.CancelledError:
+            if job_id in self._lost:
+                # Lost lease: the process that recovered the job records its outcome
+                return
+            # Shutdown: leave the job unfinished so it is resumed on restart
+            raise
+        except asyncio.TimeoutError:
+            job.update({
+                "status": "failed",
+                "error": f"Generation timed out after {self.timeout}s",
+                "completed_at": datetime.utcnow().isoformat()
+            })
+            logger.error(f"Generation job {job_id} timed out")
+        except Exception as e:
+            job.update({
+                "status": "failed",
+                "error": str(e),
+                "completed_at": datetime.utcnow().isoformat()
+            })
+            logger.error(f"Generation job {job_id} failed: {e}")
+        finally:
+            self.running.discard(job_id)
+            self._handler_tasks.pop(job_id, None)
+            self._lost.discard(job_id)
+            self._update_gauges()
+
+        self._publish(job)
+        await self.store.save(job)
+        self.active_jobs.pop(job_id, None)
+        try:
+            await self.store.release(job_id, self.owner_id)
+        except Exception as e:
+            logger.warning(f"Could not release lease of generation job {job_id}: {e}")
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job from memory (if active) or the durable store"""
+        if job_id in self.active_jobs:
+            return self.active_jobs[job_id]
+        if not self.started:
+            await self.start()
+        return await self.store.get(job_id)
+
+    async def list_user_jobs(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """List a user's jobs, overlaying live progress for active ones"""
+        if not self.started:
+            await self.start()
+        jobs = await self.store.list_for_user(user_id, limit)
+        return [self.active_jobs.get(job["job_id"], job) for job in jobs]
+
+    async def delete_job(self, job_id: str) -> bool:
+        """Delete a finished or queued job (running jobs are not interrupted)"""
+        if job_id in self.running:
+            return False
+        self.active_jobs.pop(job_id, None)
+        if not self.started:
+            await self.start()
+        return await self.store.delete(job_id)
+
+# Global instance
+generation_queue = GenerationJobQueue()
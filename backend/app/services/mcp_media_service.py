@@ -4,7 +4,6 @@ Integrates with official Google Gemini CLI MCP servers for media generation
 """
 
 import asyncio
-import json
 import logging
 import subprocess
 import tempfile
@@ -12,12 +11,19 @@ import os
 import aiohttp
 import base64
 import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Callable
 from datetime import datetime
+from urllib.parse import urlparse
 
-from ..database import get_db
-from ..models.user_settings import UserSettings
+from .settings_store import settings_store
+from .media_cache import media_cache
+from .http_clients import http_clients
+from .mcp_pool import mcp_worker_pool, credential_fingerprint
+from .mcp_notifications import mcp_notifications
+from .progress_hub import progress_hub
+from .tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +31,6 @@ class MCPMediaService:
     """Service for generating media using Google's MCP servers"""
     
     def __init__(self):
-        self.db = get_db()
         self.project_id = os.getenv("GOOGLE_CLOUD_PROJECT_ID")
         self.location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
         self.genmedia_bucket = os.getenv("GENMEDIA_BUCKET")
@@ -63,119 +68,79 @@ class MCPMediaService:
             }
         }
         
-        self.active_servers = {}
-        
-    def _get_user_api_keys(self, user_id: int) -> Dict[str, str]:
+    async def _get_user_api_keys(self, user_id: int) -> Dict[str, str]:
         """Get API keys from user settings with fallback to environment variables"""
-        try:
-            # Try to get from user settings first
-            user_settings = self.db.query(UserSettings).filter(
-                UserSettings.user_id == user_id
-            ).first()
-            
-            if user_settings:
-                api_keys = {}
-                
-                # Get Google Cloud Project ID
-                if user_settings.google_cloud_project:
-                    api_keys["PROJECT_ID"] = user_settings.google_cloud_project
-                elif self.project_id:
-                    api_keys["PROJECT_ID"] = self.project_id
-                    
-                # Get Google Cloud Location
-                if user_settings.google_cloud_location:
-                    api_keys["LOCATION"] = user_settings.google_cloud_location
-                else:
-                    api_keys["LOCATION"] = self.location
-                    
-                # Get Google Cloud Storage Bucket
-                if user_settings.google_cloud_bucket:
-                    api_keys["GENMEDIA_BUCKET"] = user_settings.google_cloud_bucket
-                elif self.genmedia_bucket:
-                    api_keys["GENMEDIA_BUCKET"] = self.genmedia_bucket
-                    
-                # Get service account key path if available
-                if user_settings.google_service_account_key:
-                    api_keys["GOOGLE_APPLICATION_CREDENTIALS"] = user_settings.google_service_account_key
-                    
-                return api_keys
-                
-        except Exception as e:
-            logger.warning(f"Could not get user API keys for user {user_id}: {e}")
-            
-        # Fallback to environment variables
-        return {
+        api_keys = {
             "PROJECT_ID": self.project_id,
             "LOCATION": self.location,
             "GENMEDIA_BUCKET": self.genmedia_bucket
         }
         
+        try:
+            # User settings override the deployment defaults
+            user_settings = await settings_store.get_all(None, user_id)
+            overrides = {
+                "PROJECT_ID": user_settings.get("google_cloud_project"),
+                "LOCATION": user_settings.get("google_cloud_location"),
+                "GENMEDIA_BUCKET": user_settings.get("google_cloud_bucket"),
+                "GOOGLE_APPLICATION_CREDENTIALS": user_settings.get("google_service_account_key")
+            }
+            api_keys.update({k: v for k, v in overrides.items() if v})
+        except Exception as e:
+            logger.warning(f"Could not get user API keys for user {user_id}: {e}")
+            
+        return api_keys
+        
+    async def _server_env(self, user_id: Optional[int] = None) -> Dict[str, str]:
+        """Process environment for an MCP server, with user-specific API keys when available"""
+        env = os.environ.copy()
+        
+        if user_id:
+            # Get user-specific API keys
+            user_api_keys = await self._get_user_api_keys(user_id)
+            env.update({k: v for k, v in user_api_keys.items() if v})
+        else:
+            # Use global environment variables
+            if self.project_id:
+                env["PROJECT_ID"] = self.project_id
+            env["LOCATION"] = self.location
+            if self.genmedia_bucket:
+                env["GENMEDIA_BUCKET"] = self.genmedia_bucket
+        return env
+        
+    @asynccontextmanager
+    async def _worker(self, server_type: str, user_id: Optional[int] = None):
+        """Hold the pooled worker for this server type and the user's credentials; yields its port"""
+        if server_type not in self.mcp_servers:
+            raise Exception(f"Unknown MCP server type: {server_type}")
+        server_config = self.mcp_servers[server_type]
+        async with mcp_worker_pool.worker(
+            server_type,
+            server_config["binary"],
+            server_config["port"],
+            await self._server_env(user_id)
+        ) as port:
+            yield port
+        
     async def start_mcp_server(self, server_type: str, user_id: Optional[int] = None) -> bool:
-        """Start an MCP server for the specified media type"""
+        """Start the MCP server for this media type and user's credentials (waits for readiness)"""
         if server_type not in self.mcp_servers:
             logger.error(f"Unknown MCP server type: {server_type}")
             return False
             
         server_config = self.mcp_servers[server_type]
-        port = server_config["port"]
-        
-        try:
-            # Check if server is already running
-            if server_type in self.active_servers:
-                return True
-                
-            # Start the MCP server
-            cmd = [
-                server_config["binary"],
-                "--transport", "http",
-                "--port", str(port)
-            ]
-            
-            # Set environment variables with user-specific API keys
-            env = os.environ.copy()
-            
-            if user_id:
-                # Get user-specific API keys
-                user_api_keys = self._get_user_api_keys(user_id)
-                env.update(user_api_keys)
-            else:
-                # Use global environment variables
-                env["PROJECT_ID"] = self.project_id
-                env["LOCATION"] = self.location
-                if self.genmedia_bucket:
-                    env["GENMEDIA_BUCKET"] = self.genmedia_bucket
-                
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                env=env,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            # Wait a moment for server to start
-            await asyncio.sleep(2)
-            
-            # Check if server is responding
-            if await self._check_server_health(port):
-                self.active_servers[server_type] = process
-                logger.info(f"MCP server {server_type} started on port {port}")
-                return True
-            else:
-                logger.error(f"Failed to start MCP server {server_type}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error starting MCP server {server_type}: {e}")
-            return False
-            
-    async def _check_server_health(self, port: int) -> bool:
-        """Check if MCP server is responding"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"http://localhost:{port}/health", timeout=5) as response:
-                    return response.status == 200
-        except:
-            return False
+        return await mcp_worker_pool.ensure(
+            server_type,
+            server_config["binary"],
+            server_config["port"],
+            await self._server_env(user_id),
+            pinned=user_id is None
+        )
+            
+    async def start_all_servers(self) -> Dict[str, bool]:
+        """Start every MCP server concurrently"""
+        results = await asyncio.gather(*(self.start_mcp_server(server_type) for server_type in self.mcp_servers))
+        return dict(zip(self.mcp_servers, results))
             
     def _create_job_tracker(self, job_id: str, media_type: str, user_id: int) -> Dict[str, Any]:
         """Create a job tracker for monitoring progress"""
@@ -209,16 +174,19 @@ class MCPMediaService:
                     callback(progress, status, message)
                 except Exception as e:
                     logger.error(f"Error in progress callback for job {job_id}: {e}")
+            else:
+                # Jobs not owned by the generation queue are pushed to watchers directly
+                job = self.active_jobs[job_id]
+                progress_hub.publish(
+                    f"user:{job['user_id']}", job_id, progress, job["status"], message,
+                    media_type=job["media_type"]
+                )
                     
+    @tracer.traced("mcp.tools_call", kind="client")
     async def _call_mcp_tool_with_progress(self, server_type: str, tool_name: str, params: Dict[str, Any], 
                                          job_id: str, user_id: Optional[int] = None) -> Dict[str, Any]:
         """Call an MCP tool with progress tracking"""
-        if server_type not in self.active_servers:
-            if not await self.start_mcp_server(server_type, user_id):
-                raise Exception(f"Failed to start MCP server {server_type}")
-                
-        port = self.mcp_servers[server_type]["port"]
-        
+        tracer.set_attributes(server=server_type, tool=tool_name, job_id=job_id)
         # Add progress token to params
         progress_token = str(uuid.uuid4())
         params["progressToken"] = progress_token
@@ -235,68 +203,47 @@ class MCPMediaService:
         }
         
         try:
-            # Start progress monitoring task
-            progress_task = asyncio.create_task(
-                self._monitor_mcp_progress(port, progress_token, job_id)
-            )
-            
-            # Make the MCP call
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"http://localhost:{port}/jsonrpc",
-                    json=request,
-                    timeout=600  # 10 minutes for media generation
-                ) as response:
-                    result = await response.json()
-                    
-                    # Cancel progress monitoring
-                    progress_task.cancel()
-                    
-                    if "error" in result:
-                        self._update_job_progress(job_id, 0, "failed", f"MCP tool error: {result['error']}")
-                        raise Exception(f"MCP tool error: {result['error']}")
-                        
-                    return result.get("result", {})
+            async with self._worker(server_type, user_id) as port:
+                # Progress arrives on the server's shared notification stream
+                await mcp_notifications.register(
+                    port,
+                    progress_token,
+                    lambda update: self._update_job_progress(
+                        job_id,
+                        update.get("progress", 0),
+                        update.get("status", "processing"),
+                        update.get("message", "")
+                    )
+                )
+                
+                try:
+                    # Make the MCP call
+                    session = http_clients.session("mcp")
+                    async with session.post(
+                        f"http://localhost:{port}/jsonrpc",
+                        json=request,
+                        headers=tracer.inject(),
+                        timeout=aiohttp.ClientTimeout(total=600)  # 10 minutes for media generation
+                    ) as response:
+                        result = await response.json()
+                finally:
+                    mcp_notifications.unregister(port, progress_token)
                     
+            if "error" in result:
+                self._update_job_progress(job_id, 0, "failed", f"MCP tool error: {result['error']}")
+                raise Exception(f"MCP tool error: {result['error']}")
+                
+            return result.get("result", {})
+                
         except Exception as e:
             logger.error(f"Error calling MCP tool {tool_name}: {e}")
             self._update_job_progress(job_id, 0, "failed", str(e))
             raise
             
-    async def _monitor_mcp_progress(self, port: int, progress_token: str, job_id: str):
-        """Monitor MCP progress notifications"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                # Subscribe to progress notifications
-                async with session.get(f"http://localhost:{port}/notifications") as response:
-                    async for line in response.content:
-                        if line:
-                            try:
-                                notification = json.loads(line.decode())
-                                if (notification.get("method") == "notifications/progress" and 
-                                    notification.get("params", {}).get("progressToken") == progress_token):
-                                    
-                                    params = notification["params"]
-                                    progress = params.get("progress", 0)
-                                    status = params.get("status", "processing")
-                                    message = params.get("message", "")
-                                    
-                                    self._update_job_progress(job_id, progress, status, message)
-                                    
-                            except json.JSONDecodeError:
-                                continue
-                                
-        except Exception as e:
-            logger.error(f"Error monitoring MCP progress for job {job_id}: {e}")
-            
+    @tracer.traced("mcp.tools_call", kind="client")
     async def _call_mcp_tool(self, server_type: str, tool_name: str, params: Dict[str, Any], user_id: Optional[int] = None) -> Dict[str, Any]:
         """Call an MCP tool on the specified server (without progress tracking)"""
-        if server_type not in self.active_servers:
-            if not await self.start_mcp_server(server_type, user_id):
-                raise Exception(f"Failed to start MCP server {server_type}")
-                
-        port = self.mcp_servers[server_type]["port"]
-        
+        tracer.set_attributes(server=server_type, tool=tool_name)
         # Prepare MCP request
         request = {
             "jsonrpc": "2.0",
@@ -309,23 +256,26 @@ class MCPMediaService:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._worker(server_type, user_id) as port:
+                session = http_clients.session("mcp")
                 async with session.post(
                     f"http://localhost:{port}/jsonrpc",
                     json=request,
-                    timeout=300  # 5 minutes for non-media operations
+                    headers=tracer.inject(),
+                    timeout=aiohttp.ClientTimeout(total=300)  # 5 minutes for non-media operations
                 ) as response:
                     result = await response.json()
                     
-                    if "error" in result:
-                        raise Exception(f"MCP tool error: {result['error']}")
-                        
-                    return result.get("result", {})
-                    
+            if "error" in result:
+                raise Exception(f"MCP tool error: {result['error']}")
+                
+            return result.get("result", {})
+                
         except Exception as e:
             logger.error(f"Error calling MCP tool {tool_name}: {e}")
             raise
             
+    @tracer.traced("mcp.generate_video")
     async def generate_video(self, prompt: str, duration: int = 10, aspect_ratio: str = "16:9", 
                            user_id: Optional[int] = None, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
         """Generate video using Veo via MCP with progress tracking"""
@@ -386,6 +336,32 @@ class MCPMediaService:
                 "error": str(e)
             }
             
+    async def _cache_image_files(self, cache_params: Dict[str, Any], image_urls: List[str]) -> List[str]:
+        """Download generated images into the media cache; returns their local paths ([] if not cacheable)"""
+        if not media_cache.enabled or not all(urlparse(url).scheme in ("http", "https") for url in image_urls):
+            return []
+        client = http_clients.client("downloads")
+        paths = []
+        try:
+            for index, url in enumerate(image_urls):
+                response = await client.get(url)
+                response.raise_for_status()
+                path = await media_cache.put(
+                    "image_file",
+                    {**cache_params, "index": index},
+                    {"url": url, "content_type": response.headers.get("content-type")},
+                    data=response.content,
+                    extension=Path(urlparse(url).path).suffix or ".png"
+                )
+                if not path:
+                    return []
+                paths.append(path)
+        except Exception as e:
+            logger.warning(f"Could not cache generated images: {e}")
+            return []
+        return paths
+        
+    @tracer.traced("mcp.generate_image")
     async def generate_image(self, prompt: str, aspect_ratio: str = "1:1", num_images: int = 1, 
                            user_id: Optional[int] = None, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
         """Generate image using Imagen via MCP with progress tracking"""
@@ -399,21 +375,34 @@ class MCPMediaService:
             if progress_callback:
                 self.progress_callbacks[job_id] = progress_callback
                 
-            # Update initial progress
-            self._update_job_progress(job_id, 5, "processing", "Starting image generation...")
-            
             params = {
                 "prompt": prompt,
                 "aspect_ratio": aspect_ratio,
                 "num_images": num_images
             }
+            # Cached images are only shared between callers using the same Google project and keys
+            cache_params = {**params, "credentials": credential_fingerprint(await self._server_env(user_id))}
             
-            result = await self._call_mcp_tool_with_progress("imagen", "imagen_t2i", params, job_id, user_id)
-            
-            # Extract image URLs from result
-            image_urls = result.get("image_urls", [])
-            if not image_urls:
-                raise Exception("No image URLs returned from Imagen")
+            cached = await media_cache.get("image", cache_params)
+            image_paths = cached["metadata"].get("image_paths", []) if cached else []
+            if cached and image_paths and all(os.path.exists(path) for path in image_paths):
+                image_urls = cached["metadata"]["image_urls"]
+            else:
+                cached = None
+                # Update initial progress
+                self._update_job_progress(job_id, 5, "processing", "Starting image generation...")
+                
+                # Pass a copy: the MCP call adds its progress token to the params
+                result = await self._call_mcp_tool_with_progress("imagen", "imagen_t2i", dict(params), job_id, user_id)
+                
+                # Extract image URLs from result
+                image_urls = result.get("image_urls", [])
+                if not image_urls:
+                    raise Exception("No image URLs returned from Imagen")
+                
+                image_paths = await self._cache_image_files(cache_params, image_urls)
+                if image_paths:
+                    await media_cache.put("image", cache_params, {"image_urls": image_urls, "image_paths": image_paths})
                 
             # Update job as completed
             job_info.update({
@@ -422,6 +411,7 @@ class MCPMediaService:
                 "completed_at": datetime.utcnow(),
                 "result": {
                     "image_urls": image_urls,
+                    "image_paths": image_paths,
                     "prompt": prompt,
                     "aspect_ratio": aspect_ratio
                 }
@@ -433,8 +423,10 @@ class MCPMediaService:
                 "status": "success",
                 "job_id": job_id,
                 "image_urls": image_urls,
+                "image_paths": image_paths,
                 "prompt": prompt,
-                "aspect_ratio": aspect_ratio
+                "aspect_ratio": aspect_ratio,
+                "cached": bool(cached)
             }
             
         except Exception as e:
@@ -446,6 +438,7 @@ class MCPMediaService:
                 "error": str(e)
             }
             
+    @tracer.traced("mcp.generate_music")
     async def generate_music(self, prompt: str, duration: int = 30, 
                            user_id: Optional[int] = None, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
         """Generate music using Lyria via MCP with progress tracking"""
@@ -548,8 +541,8 @@ class MCPMediaService:
             for job in user_jobs[:limit]
         ]
         
-    async def download_media_file(self, job_id: str, user_id: int) -> Optional[Dict[str, Any]]:
-        """Download a completed media file"""
+    async def get_media_file(self, job_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+        """Locate a completed media file (URL, filename, content type) without downloading it"""
         job = self.active_jobs.get(job_id)
         if not job or job["user_id"] != user_id:
             return None
@@ -562,46 +555,26 @@ class MCPMediaService:
         # Extract file URL based on media type
         if job["media_type"] == "video":
             file_url = result.get("video_url")
+            ext, content_type = ".mp4", "video/mp4"
         elif job["media_type"] == "image":
             file_url = result.get("image_urls", [None])[0]
+            ext, content_type = ".png", "image/png"
         elif job["media_type"] == "music":
             file_url = result.get("music_url")
+            ext, content_type = ".mp3", "audio/mpeg"
         else:
             return None
             
         if not file_url:
             return None
             
-        try:
-            # Download the file
-            async with aiohttp.ClientSession() as session:
-                async with session.get(file_url) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        
-                        # Determine file extension
-                        if job["media_type"] == "video":
-                            ext = ".mp4"
-                        elif job["media_type"] == "image":
-                            ext = ".png"
-                        elif job["media_type"] == "music":
-                            ext = ".mp3"
-                        else:
-                            ext = ".bin"
-                            
-                        filename = f"{job_id}{ext}"
-                        
-                        return {
-                            "filename": filename,
-                            "content": content,
-                            "content_type": response.headers.get("content-type", "application/octet-stream"),
-                            "size": len(content)
-                        }
-                        
-        except Exception as e:
-            logger.error(f"Error downloading media file for job {job_id}: {e}")
-            return None
+        return {
+            "url": file_url,
+            "filename": f"{job_id}{ext}",
+            "content_type": content_type
+        }
             
+    @tracer.traced("mcp.generate_speech")
     async def generate_speech(self, text: str, voice: str = "en-US-Neural2-F", 
                             user_id: Optional[int] = None) -> Dict[str, Any]:
         """Generate speech using Chirp 3 HD via MCP"""
@@ -643,15 +616,7 @@ class MCPMediaService:
             
     async def stop_all_servers(self):
         """Stop all active MCP servers"""
-        for server_type, process in self.active_servers.items():
-            try:
-                process.terminate()
-                await process.wait()
-                logger.info(f"Stopped MCP server {server_type}")
-            except Exception as e:
-                logger.error(f"Error stopping MCP server {server_type}: {e}")
-                
-        self.active_servers.clear()
+        await mcp_worker_pool.stop_all()
 
 # Global instance
 mcp_media_service = MCPMediaService() 
\ No newline at end of file
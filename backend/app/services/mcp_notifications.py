@@ -0,0 +1,98 @@
+"""
+MCP Notification Router for VeoGen
+One multiplexed notification stream per MCP server, dispatched by progress token
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Any, Callable
+
+import aiohttp
+
+from app.config import settings
+from app.services.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+ProgressHandler = Callable[[Dict[str, Any]], None]
+
+class MCPNotificationRouter:
+    """Keeps a single /notifications subscription per MCP server port
+
+    Callers register a progress token with a handler; notifications for that
+    token are dispatched to it. The stream is opened on first registration,
+    reconnected with backoff while tokens are registered, and closed once
+    the last token is released.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[int, Dict[str, ProgressHandler]] = {}
+        self.streams: Dict[int, asyncio.Task] = {}
+        self.connected: Dict[int, asyncio.Event] = {}
+
+    async def register(self, port: int, progress_token: str, handler: ProgressHandler, wait: float = 2.0):
+        """Route notifications for a token to `handler`, waiting briefly for the stream to connect"""
+        self.handlers.setdefault(port, {})[progress_token] = handler
+        connected = self.connected.setdefault(port, asyncio.Event())
+        task = self.streams.get(port)
+        if task is None or task.done():
+            self.streams[port] = asyncio.create_task(self._stream(port))
+        try:
+            await asyncio.wait_for(connected.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            logger.warning(f"MCP notification stream on port {port} not connected yet")
+
+    def unregister(self, port: int, progress_token: str):
+        handlers = self.handlers.get(port)
+        if handlers:
+            handlers.pop(progress_token, None)
+            if not handlers:
+                del self.handlers[port]
+                task = self.streams.pop(port, None)
+                if task:
+                    task.cancel()
+                self.connected.pop(port, None)
+
+    def _dispatch(self, port: int, notification: Dict[str, Any]):
+        if notification.get("method") != "notifications/progress":
+            return
+        params = notification.get("params", {})
+        handler = self.handlers.get(port, {}).get(params.get("progressToken"))
+        if handler:
+            try:
+                handler(params)
+            except Exception as e:
+                logger.error(f"Error in MCP progress handler on port {port}: {e}")
+
+    async def _stream(self, port: int):
+        delay = 0.5
+        while self.handlers.get(port):
+            connected = self.connected.setdefault(port, asyncio.Event())
+            try:
+                session = http_clients.session("mcp")
+                async with session.get(
+                    f"http://localhost:{port}/notifications",
+                    # Replaces the session timeouts: connecting is bounded, but the stream may
+                    # sit idle between notifications for as long as a generation runs
+                    timeout=aiohttp.ClientTimeout(total=None, connect=settings.HTTP_CONNECT_TIMEOUT, sock_read=None)
+                ) as response:
+                    connected.set()
+                    delay = 0.5
+                    async for line in response.content:
+                        if not line.strip():
+                            continue
+                        try:
+                            self._dispatch(port, json.loads(line.decode()))
+                        except json.JSONDecodeError:
+                            continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP notification stream on port {port} dropped: {e}")
+            connected.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
+# Global instance
+mcp_notifications = MCPNotificationRouter()
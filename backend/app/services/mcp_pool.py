@@ -0,0 +1,197 @@
+"""
+MCP Worker Pool for VeoGen
+MCP server processes keyed by (server type, credential fingerprint) with LRU eviction
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator, List
+
+from app.config import settings
+from app.middleware.metrics import MCP_WORKERS
+from app.services.mcp_supervisor import mcp_supervisor
+
+logger = logging.getLogger(__name__)
+
+# Environment variables that determine which Google project/identity a worker acts as
+CREDENTIAL_ENV_KEYS = ("PROJECT_ID", "LOCATION", "GENMEDIA_BUCKET", "GOOGLE_APPLICATION_CREDENTIALS", "GOOGLE_API_KEY")
+
+def credential_fingerprint(env: Dict[str, str]) -> str:
+    """Stable, non-reversible fingerprint of the credentials in a worker environment"""
+    digest = hashlib.sha256()
+    for key in CREDENTIAL_ENV_KEYS:
+        digest.update(f"{key}={env.get(key) or ''}\0".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+class MCPWorkerPool:
+    """Routes MCP calls to a worker process running with the caller's credentials
+
+    Workers are shared only between callers whose credentials fingerprint
+    identically, so one tenant's project/keys are never used for another.
+    The total number of processes is capped at MCP_MAX_WORKERS; when the
+    budget is exhausted the least recently used idle, unpinned worker is stopped, and
+    workers idle longer than MCP_WORKER_IDLE_TTL are reaped.
+    """
+
+    def __init__(self):
+        self.workers: Dict[str, Dict[str, Any]] = {}
+        # Workers taken out of the pool whose processes are still stopping (their ports stay reserved)
+        self._retiring: Dict[str, Dict[str, Any]] = {}
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _allocate_port(self, preferred: int) -> int:
+        used = {worker["port"] for worker in list(self.workers.values()) + list(self._retiring.values())}
+        if preferred not in used:
+            return preferred
+        for port in range(settings.MCP_WORKER_PORT_START, settings.MCP_WORKER_PORT_END + 1):
+            if port not in used:
+                return port
+        raise RuntimeError("No free ports left for MCP workers")
+
+    def _update_metrics(self, server_type: str):
+        MCP_WORKERS.labels(server_type=server_type).set(
+            sum(1 for worker in self.workers.values() if worker["server_type"] == server_type)
+        )
+
+    def _take(self, name: str) -> str:
+        """Move a worker out of the pool (called with the condition held)"""
+        worker = self.workers.pop(name)
+        self._retiring[name] = worker
+        self._update_metrics(worker["server_type"])
+        return name
+
+    def _take_expired(self) -> List[str]:
+        cutoff = time.monotonic() - settings.MCP_WORKER_IDLE_TTL
+        expired = [
+            name for name, worker in self.workers.items()
+            if worker["in_flight"] == 0 and worker["last_used"] < cutoff and not worker["pinned"]
+        ]
+        for name in expired:
+            logger.info(f"Reaping idle MCP worker {name}")
+        return [self._take(name) for name in expired]
+
+    def _take_lru(self) -> List[str]:
+        idle = [
+            (worker["last_used"], name) for name, worker in self.workers.items()
+            if worker["in_flight"] == 0 and not worker["pinned"]
+        ]
+        if not idle:
+            return []
+        _, name = min(idle)
+        logger.info(f"Evicting least recently used MCP worker {name} (budget {settings.MCP_MAX_WORKERS})")
+        return [self._take(name)]
+
+    async def _retire(self, names: List[str]):
+        """Stop the processes of workers taken out of the pool, without holding the condition"""
+        async def stop(name: str):
+            try:
+                await mcp_supervisor.stop_server(name, forget=True)
+            finally:
+                async with self.condition:
+                    self._retiring.pop(name, None)
+                    self.condition.notify_all()
+
+        if names:
+            await asyncio.gather(*(stop(name) for name in names), return_exceptions=True)
+
+    @asynccontextmanager
+    async def worker(self, server_type: str, binary: str, default_port: int, env: Dict[str, str],
+                     pinned: bool = False) -> AsyncIterator[int]:
+        """Hold a ready worker for the given credentials; yields its port
+
+        Workers to reap or evict are chosen under the condition, but their
+        processes are stopped after releasing it, so a slow shutdown never
+        blocks MCP calls of other tenants.
+        """
+        fingerprint = credential_fingerprint(env)
+        name = f"{server_type}-{fingerprint}"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.MCP_WORKER_ACQUIRE_TIMEOUT
+
+        worker = None
+        while worker is None:
+            async with self.condition:
+                victims = self._take_expired()
+                # A worker for these credentials that is still stopping must finish before it is recreated
+                if name not in self.workers and name not in self._retiring:
+                    if len(self.workers) >= settings.MCP_MAX_WORKERS:
+                        victims += self._take_lru()
+                    if len(self.workers) < settings.MCP_MAX_WORKERS:
+                        self.workers[name] = {
+                            "server_type": server_type,
+                            "fingerprint": fingerprint,
+                            "port": self._allocate_port(default_port),
+                            "in_flight": 0,
+                            "last_used": time.monotonic(),
+                            "pinned": pinned
+                        }
+                        self._update_metrics(server_type)
+                if name in self.workers:
+                    worker = self.workers[name]
+                    worker["in_flight"] += 1
+                    worker["pinned"] = worker["pinned"] or pinned
+                elif not victims:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise RuntimeError(f"MCP worker budget exhausted ({settings.MCP_MAX_WORKERS} busy processes)")
+                    try:
+                        await asyncio.wait_for(self.condition.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            await self._retire(victims)
+
+        try:
+            if not await mcp_supervisor.start_server(name, server_type, binary, worker["port"], env):
+                raise RuntimeError(f"Failed to start MCP server {server_type}")
+            yield worker["port"]
+        finally:
+            async with self.condition:
+                worker["in_flight"] -= 1
+                worker["last_used"] = time.monotonic()
+                self.condition.notify_all()
+
+    async def ensure(self, server_type: str, binary: str, default_port: int, env: Dict[str, str],
+                     pinned: bool = False) -> bool:
+        """Start (or confirm) the worker for these credentials without holding it"""
+        try:
+            async with self.worker(server_type, binary, default_port, env, pinned):
+                return True
+        except Exception as e:
+            logger.error(f"Error starting MCP server {server_type}: {e}")
+            return False
+
+    async def stop_all(self):
+        """Stop every worker process"""
+        await mcp_supervisor.stop_all()
+        server_types = {worker["server_type"] for worker in self.workers.values()}
+        self.workers.clear()
+        self._retiring.clear()
+        for server_type in server_types:
+            self._update_metrics(server_type)
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Worker routing table (fingerprints only, never credentials)"""
+        now = time.monotonic()
+        return {
+            name: {
+                "server_type": worker["server_type"],
+                "fingerprint": worker["fingerprint"],
+                "port": worker["port"],
+                "in_flight": worker["in_flight"],
+                "idle_seconds": round(now - worker["last_used"], 1) if worker["in_flight"] == 0 else 0,
+                "ready": mcp_supervisor.is_ready(name)
+            }
+            for name, worker in self.workers.items()
+        }
+
+# Global instance
+mcp_worker_pool = MCPWorkerPool()
@@ -0,0 +1,276 @@
+"""
+MCP Server Supervisor for VeoGen
+Starts the MCP server processes, probes readiness, drains their logs and restarts them on crash
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+import aiohttp
+
+from app.config import settings
+from app.middleware.metrics import MCP_SERVER_UP, MCP_SERVER_HEALTH_LATENCY, MCP_SERVER_RESTARTS
+from app.services.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+# Offline stand-in for the Go MCP binaries (see MCP_STUB_SERVERS)
+STUB_SERVER_SCRIPT = Path(__file__).resolve().parents[2] / "mcp_stub_server.py"
+
+class MCPServerSupervisor:
+    """Process supervisor for MCP servers
+
+    Each managed server is a dict keyed by name holding its process, port,
+    status (starting, ready, restarting, failed, stopped), restart count and
+    background tasks. A crashed process is restarted with exponential
+    backoff; a server that fails its health check repeatedly is killed and
+    restarted the same way.
+    """
+
+    def __init__(self):
+        self.servers: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def _command(self, server_type: str, binary: str, port: int) -> List[str]:
+        if settings.MCP_STUB_SERVERS:
+            return [sys.executable, str(STUB_SERVER_SCRIPT), "--server", server_type, "--port", str(port)]
+        return [binary, "--transport", "http", "--port", str(port)]
+
+    def is_ready(self, name: str) -> bool:
+        """Whether a server is running and passed its readiness probe"""
+        server = self.servers.get(name)
+        return bool(server) and server["status"] == "ready" and server["process"].returncode is None
+
+    async def start_server(self, name: str, server_type: str, binary: str, port: int,
+                           env: Dict[str, str]) -> bool:
+        """Start a server (no-op if already ready) and wait until it answers /health"""
+        if self.is_ready(name):
+            return True
+
+        self._stopping = False
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if self.is_ready(name):
+                return True
+            server = self.servers.setdefault(name, {
+                "name": name,
+                "server_type": server_type,
+                "binary": binary,
+                "port": port,
+                "env": env,
+                "process": None,
+                "status": "starting",
+                "restarts": 0,
+                "consecutive_failures": 0,
+                "health_failures": 0,
+                "last_latency": None,
+                "started_at": None,
+                "tasks": []
+            })
+            server["env"] = env
+            ready = await self._spawn(server)
+
+        self._ensure_monitor()
+        return ready
+
+    async def _spawn(self, server: Dict[str, Any]) -> bool:
+        name = server["name"]
+        cmd = self._command(server["server_type"], server["binary"], server["port"])
+        server["status"] = "starting"
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                env=server["env"],
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            logger.error(f"MCP server binary not found for {name}: {cmd[0]}")
+            server["status"] = "failed"
+            MCP_SERVER_UP.labels(server=name).set(0)
+            return False
+
+        server["process"] = process
+        server["started_at"] = datetime.utcnow()
+        server["health_failures"] = 0
+        server_logger = logging.getLogger(f"mcp.{name}")
+        server["tasks"] = [
+            asyncio.create_task(self._drain(process.stdout, server_logger, logging.INFO)),
+            asyncio.create_task(self._drain(process.stderr, server_logger, logging.WARNING))
+        ]
+
+        if not await self._wait_ready(server):
+            logger.error(f"MCP server {name} did not become ready within {settings.MCP_STARTUP_TIMEOUT}s")
+            await self._terminate(server)
+            server["status"] = "failed"
+            MCP_SERVER_UP.labels(server=name).set(0)
+            return False
+
+        server["status"] = "ready"
+        server["tasks"].append(asyncio.create_task(self._watch(server, process)))
+        MCP_SERVER_UP.labels(server=name).set(1)
+        logger.info(f"MCP server {name} ready on port {server['port']} (pid {process.pid})")
+        return True
+
+    async def _wait_ready(self, server: Dict[str, Any]) -> bool:
+        """Poll /health with exponential backoff until it answers or the process exits"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.MCP_STARTUP_TIMEOUT
+        delay = 0.05
+        while loop.time() < deadline:
+            if server["process"].returncode is not None:
+                return False
+            if await self.check_health(server):
+                return True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+        return False
+
+    async def check_health(self, server: Dict[str, Any]) -> bool:
+        """Probe a server's /health endpoint, recording latency"""
+        start = time.perf_counter()
+        try:
+            session = http_clients.session("mcp")
+            async with session.get(
+                f"http://localhost:{server['port']}/health",
+                timeout=aiohttp.ClientTimeout(total=5)
+            ) as response:
+                healthy = response.status == 200
+        except Exception:
+            return False
+        latency = time.perf_counter() - start
+        server["last_latency"] = latency
+        MCP_SERVER_HEALTH_LATENCY.labels(server=server["name"]).set(latency)
+        return healthy
+
+    @staticmethod
+    async def _drain(stream: Optional[asyncio.StreamReader], server_logger: logging.Logger, level: int):
+        """Forward a process pipe into logging so it never fills up and blocks the server"""
+        if stream is None:
+            return
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+            server_logger.log(level, line.decode(errors="replace").rstrip())
+
+    async def _watch(self, server: Dict[str, Any], process: asyncio.subprocess.Process):
+        """Restart a server when its process exits unexpectedly, retrying failed restarts with backoff"""
+        returncode = await process.wait()
+        if self._stopping or server["status"] == "stopped" or server["process"] is not process:
+            return
+
+        name = server["name"]
+        MCP_SERVER_UP.labels(server=name).set(0)
+        logger.error(f"MCP server {name} exited with code {returncode}")
+        server["status"] = "restarting"
+
+        while True:
+            server["consecutive_failures"] += 1
+            if server["consecutive_failures"] > settings.MCP_MAX_RESTARTS:
+                server["status"] = "failed"
+                logger.error(f"MCP server {name} failed {server['consecutive_failures'] - 1} restarts in a row, giving up")
+                return
+
+            await asyncio.sleep(min(2 ** (server["consecutive_failures"] - 1), 30))
+            if self._stopping or server["status"] != "restarting":
+                return
+            async with self._locks.setdefault(name, asyncio.Lock()):
+                if self.is_ready(name):
+                    return
+                MCP_SERVER_RESTARTS.labels(server=name).inc()
+                server["restarts"] += 1
+                logger.info(f"Restarting MCP server {name} (restart {server['restarts']})")
+                if await self._spawn(server):
+                    server["consecutive_failures"] = 0
+                    return
+                if self._stopping:
+                    return
+                # _spawn marked it failed; keep retrying until the restart budget is used up
+                server["status"] = "restarting"
+
+    def _ensure_monitor(self):
+        if self._monitor_task is None or self._monitor_task.done():
+            self._monitor_task = asyncio.create_task(self._monitor())
+
+    async def _monitor(self):
+        """Periodic health checks; hung servers are killed so the watcher restarts them"""
+        while not self._stopping:
+            await asyncio.sleep(settings.MCP_HEALTH_INTERVAL)
+            for server in list(self.servers.values()):
+                if not self.is_ready(server["name"]):
+                    continue
+                if await self.check_health(server):
+                    server["health_failures"] = 0
+                    server["consecutive_failures"] = 0
+                    continue
+                server["health_failures"] += 1
+                logger.warning(f"MCP server {server['name']} failed health check ({server['health_failures']})")
+                if server["health_failures"] >= 3:
+                    logger.error(f"MCP server {server['name']} is unresponsive, killing it")
+                    server["process"].kill()
+
+    async def _terminate(self, server: Dict[str, Any]):
+        process = server.get("process")
+        if process and process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=10)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        for task in server.get("tasks", []):
+            if not task.done() and task is not asyncio.current_task():
+                task.cancel()
+        server["tasks"] = []
+
+    async def stop_server(self, name: str, forget: bool = False):
+        """Stop a server without restarting it (`forget` also drops its state and metrics)"""
+        server = self.servers.get(name)
+        if not server:
+            return
+        server["status"] = "stopped"
+        await self._terminate(server)
+        MCP_SERVER_UP.labels(server=name).set(0)
+        if forget:
+            self.servers.pop(name, None)
+            self._locks.pop(name, None)
+            for metric in (MCP_SERVER_UP, MCP_SERVER_HEALTH_LATENCY):
+                try:
+                    metric.remove(name)
+                except KeyError:
+                    pass
+        logger.info(f"Stopped MCP server {name}")
+
+    async def stop_all(self):
+        """Stop every managed server and the health monitor"""
+        self._stopping = True
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+        await asyncio.gather(*(self.stop_server(name) for name in list(self.servers)), return_exceptions=True)
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of every managed server for health endpoints"""
+        return {
+            name: {
+                "server_type": server["server_type"],
+                "port": server["port"],
+                "status": server["status"] if server["status"] != "ready" or self.is_ready(name) else "down",
+                "pid": server["process"].pid if server["process"] else None,
+                "restarts": server["restarts"],
+                "last_health_latency": server["last_latency"],
+                "started_at": server["started_at"].isoformat() if server["started_at"] else None
+            }
+            for name, server in self.servers.items()
+        }
+
+# Global instance
+mcp_supervisor = MCPServerSupervisor()
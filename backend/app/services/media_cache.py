@@ -0,0 +1,218 @@
+"""
+Media Cache for VeoGen
+Content-addressed, size-bounded cache of generated clips, images and audio
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.config import settings
+from app.database import SessionLocal, MediaCacheEntry
+
+logger = logging.getLogger(__name__)
+
+def _normalize(value: Any) -> Any:
+    """Normalize generation parameters so equivalent requests hash identically"""
+    if isinstance(value, Enum):
+        return _normalize(value.value)
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in sorted(value.items()) if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+def cache_key(kind: str, params: Dict[str, Any]) -> str:
+    """Canonical sha256 key for a generation request"""
+    canonical = json.dumps({"kind": kind, "params": _normalize(params)}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's contents (for keying on reference images)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class MediaCache:
+    """Content-addressed cache with LRU eviction bounded by total artifact size"""
+
+    def __init__(self):
+        self.enabled = settings.MEDIA_CACHE_ENABLED
+        self.cache_dir = Path(settings.MEDIA_CACHE_DIR)
+        self.max_bytes = settings.MEDIA_CACHE_MAX_BYTES
+        self.retry_window = timedelta(seconds=settings.MEDIA_CACHE_RETRY_WINDOW)
+        self._total_bytes: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    def _artifact_path(self, key: str, extension: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{extension}"
+
+    def _total_size_sync(self) -> int:
+        from sqlalchemy import func
+        db = SessionLocal()
+        try:
+            return db.query(func.coalesce(func.sum(MediaCacheEntry.size_bytes), 0)).scalar() or 0
+        finally:
+            db.close()
+
+    def _lookup_sync(self, key: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            entry = db.query(MediaCacheEntry).filter(MediaCacheEntry.key == key).first()
+            if not entry:
+                return None
+
+            expired = not entry.deterministic and entry.created_at < datetime.utcnow() - self.retry_window
+            missing = entry.file_path and not os.path.exists(entry.file_path)
+            if expired or missing:
+                if entry.file_path:
+                    Path(entry.file_path).unlink(missing_ok=True)
+                if self._total_bytes is not None:
+                    self._total_bytes -= entry.size_bytes or 0
+                db.delete(entry)
+                db.commit()
+                return None
+
+            entry.last_accessed = datetime.utcnow()
+            entry.hit_count = (entry.hit_count or 0) + 1
+            db.commit()
+            return {
+                "key": entry.key,
+                "file_path": entry.file_path,
+                "metadata": entry.entry_metadata or {}
+            }
+        finally:
+            db.close()
+
+    def temp_path(self, extension: str = ".part") -> Path:
+        """Scratch path inside the cache directory, so finished files can be adopted atomically"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.cache_dir / f".{uuid.uuid4().hex}{extension}"
+
+    def _store_sync(self, key: str, kind: str, data: Optional[bytes], extension: str,
+                    metadata: Dict[str, Any], deterministic: bool,
+                    source_path: Optional[str] = None) -> Optional[str]:
+        file_path = None
+        size = 0
+        if data or source_path:
+            path = self._artifact_path(key, extension)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if source_path:
+                os.replace(source_path, path)
+                size = path.stat().st_size
+            else:
+                tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+                size = len(data)
+            file_path = str(path)
+
+        db = SessionLocal()
+        try:
+            entry = db.query(MediaCacheEntry).filter(MediaCacheEntry.key == key).first()
+            previous_size = entry.size_bytes if entry else 0
+            if not entry:
+                entry = MediaCacheEntry(key=key, kind=kind)
+                db.add(entry)
+            entry.file_path = file_path
+            entry.size_bytes = size
+            entry.deterministic = deterministic
+            entry.entry_metadata = metadata
+            entry.created_at = datetime.utcnow()
+            entry.last_accessed = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+        if self._total_bytes is None:
+            self._total_bytes = self._total_size_sync()
+        else:
+            self._total_bytes += size - (previous_size or 0)
+        self._evict_sync()
+        return file_path
+
+    def _evict_sync(self):
+        """Remove least recently used artifacts until the cache fits its size budget"""
+        if self._total_bytes is None or self._total_bytes <= self.max_bytes:
+            return
+
+        db = SessionLocal()
+        try:
+            entries = db.query(MediaCacheEntry).filter(
+                MediaCacheEntry.size_bytes > 0
+            ).order_by(MediaCacheEntry.last_accessed.asc()).all()
+            evicted = 0
+            for entry in entries:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                if entry.file_path:
+                    Path(entry.file_path).unlink(missing_ok=True)
+                self._total_bytes -= entry.size_bytes or 0
+                db.delete(entry)
+                evicted += 1
+            db.commit()
+            if evicted:
+                logger.info(f"Evicted {evicted} media cache entries ({self._total_bytes} bytes cached)")
+        finally:
+            db.close()
+
+    async def get(self, kind: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Look up a cached result; returns {"key", "file_path", "metadata"} or None"""
+        if not self.enabled:
+            return None
+        key = cache_key(kind, params)
+        try:
+            hit = await asyncio.to_thread(self._lookup_sync, key)
+        except Exception as e:
+            logger.warning(f"Media cache lookup failed for {kind}: {e}")
+            return None
+        if hit:
+            logger.info(f"Media cache hit for {kind} ({key[:12]})")
+        return hit
+
+    async def read(self, hit: Dict[str, Any]) -> bytes:
+        """Read a cached artifact's bytes"""
+        if not hit.get("file_path"):
+            return b""
+        return await asyncio.to_thread(Path(hit["file_path"]).read_bytes)
+
+    async def put(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        metadata: Dict[str, Any],
+        data: Optional[bytes] = None,
+        extension: str = ".bin",
+        source_path: Optional[str] = None,
+        deterministic: Optional[bool] = None
+    ) -> Optional[str]:
+        """Store a result from bytes or by moving in `source_path`; returns the artifact path"""
+        if not self.enabled:
+            return None
+        key = cache_key(kind, params)
+        if deterministic is None:
+            deterministic = params.get("seed") is not None
+        try:
+            async with self._lock:
+                return await asyncio.to_thread(
+                    self._store_sync, key, kind, data, extension, metadata, deterministic, source_path
+                )
+        except Exception as e:
+            logger.warning(f"Media cache store failed for {kind}: {e}")
+            return None
+
+# Global instance
+media_cache = MediaCache()
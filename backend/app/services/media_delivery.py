@@ -0,0 +1,255 @@
+"""
+Media Delivery for VeoGen
+Range/ETag-aware file responses and streaming proxy for remote media
+"""
+
+import asyncio
+import logging
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlparse
+
+import httpx
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.config import settings
+from app.services.http_clients import http_clients
+from app.services.media_cache import media_cache
+
+logger = logging.getLogger(__name__)
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Upstream headers passed through to the client when proxying
+_PROXY_HEADERS = ("content-type", "content-length", "content-range", "accept-ranges", "etag", "last-modified")
+
+class FileRangeResponse(Response):
+    """Send a byte range of a file, zero-copy when the server supports it
+
+    Uses the ASGI `http.response.zerocopy` extension (sendfile) when the
+    server advertises it, otherwise reads large chunks off the event loop.
+    """
+
+    def __init__(self, path: str, start: int, length: int, status_code: int,
+                 headers: Dict[str, str], media_type: str):
+        super().__init__(content=None, status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.raw_headers = [(k, v) for k, v in self.raw_headers if k != b"content-length"]
+        self.raw_headers.append((b"content-length", str(length).encode("latin-1")))
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        f = await asyncio.to_thread(open, self.path, "rb")
+        try:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False
+                })
+                return
+
+            await asyncio.to_thread(f.seek, self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(settings.MEDIA_DOWNLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; close the body rather than hang the client
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await asyncio.to_thread(f.close)
+
+class MediaDeliveryService:
+    """Serve generated media without buffering whole files in memory"""
+
+    @staticmethod
+    def etag_for(stat: os.stat_result) -> str:
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    @staticmethod
+    def _etag_matches(header: Optional[str], etag: str) -> bool:
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in header.split(",")]
+        return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    @staticmethod
+    def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+        """Parse a single `bytes=` range into (start, end) inclusive
+
+        Returns None when the header is absent or not a single byte range
+        (the full file is served), raises ValueError when unsatisfiable.
+        """
+        if not header:
+            return None
+        match = _RANGE_PATTERN.match(header.strip())
+        if not match:
+            return None
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:
+            suffix = int(last)
+            if suffix == 0:
+                raise ValueError("Empty suffix range")
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or end < start:
+            raise ValueError("Range not satisfiable")
+        return start, end
+
+    @staticmethod
+    def _disposition(filename: Optional[str]) -> Dict[str, str]:
+        """Content-Disposition with an ASCII fallback name and the exact name as RFC 5987 filename*"""
+        if not filename:
+            return {}
+        fallback = "".join(
+            char if 32 <= ord(char) < 127 and char not in '"\\' else "_" for char in filename
+        )
+        return {"Content-Disposition": f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"}
+
+    def file_response(self, request: Request, path: str, media_type: Optional[str] = None,
+                      filename: Optional[str] = None) -> Response:
+        """Serve a local file honouring If-None-Match, Range and If-Range"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Media file not found")
+
+        media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        etag = self.etag_for(stat)
+        headers = {"ETag": etag, "Accept-Ranges": "bytes", **self._disposition(filename)}
+
+        if self._etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and if_range and if_range.strip() != etag:
+            range_header = None
+
+        try:
+            byte_range = self.parse_range(range_header, stat.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{stat.st_size}", "ETag": etag})
+
+        if byte_range is None:
+            return FileRangeResponse(path, 0, stat.st_size, 200, headers, media_type)
+
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        return FileRangeResponse(path, start, end - start + 1, 206, headers, media_type)
+
+    @staticmethod
+    def _is_complete(response: httpx.Response) -> bool:
+        """Whether an upstream response carries the whole artifact"""
+        if response.status_code == 200:
+            return True
+        match = re.match(r"bytes 0-(\d+)/(\d+)", response.headers.get("content-range", ""))
+        return bool(match) and int(match.group(1)) == int(match.group(2)) - 1
+
+    async def proxy_response(self, request: Request, url: str, media_type: Optional[str] = None,
+                             filename: Optional[str] = None) -> Response:
+        """Stream a remote file through, forwarding Range/conditional headers
+
+        Complete downloads are written to the media cache as they stream so
+        repeat downloads are served from local disk.
+        """
+        cache_params = {"url": url}
+        if settings.MEDIA_DOWNLOAD_CACHE_REMOTE:
+            hit = await media_cache.get("download", cache_params)
+            if hit and hit.get("file_path"):
+                return self.file_response(
+                    request, hit["file_path"], media_type or hit["metadata"].get("content_type"), filename
+                )
+
+        client = http_clients.client("downloads")
+        upstream_headers = {
+            name: request.headers[name]
+            for name in ("range", "if-range", "if-none-match")
+            if name in request.headers
+        }
+        try:
+            upstream = await client.send(client.build_request("GET", url, headers=upstream_headers), stream=True)
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to reach media URL {url}: {e}")
+            raise HTTPException(status_code=502, detail="Media source unavailable")
+
+        if upstream.status_code in (304, 416):
+            await upstream.aclose()
+            return Response(status_code=upstream.status_code, headers={
+                k: v for k, v in upstream.headers.items() if k.lower() in ("etag", "content-range")
+            })
+        if upstream.status_code >= 400:
+            await upstream.aclose()
+            raise HTTPException(
+                status_code=404 if upstream.status_code == 404 else 502,
+                detail=f"Media source returned {upstream.status_code}"
+            )
+
+        headers = {k: v for k, v in upstream.headers.items() if k.lower() in _PROXY_HEADERS}
+        headers.update(self._disposition(filename))
+        content_type = media_type or upstream.headers.get("content-type", "application/octet-stream")
+        headers.pop("content-type", None)
+        if "content-encoding" in upstream.headers:
+            # Bodies are streamed decoded, so the upstream length no longer applies
+            headers.pop("content-length", None)
+
+        cache_file = None
+        if settings.MEDIA_DOWNLOAD_CACHE_REMOTE and media_cache.enabled and self._is_complete(upstream):
+            cache_file = media_cache.temp_path()
+
+        async def stream():
+            sink = await asyncio.to_thread(open, cache_file, "wb") if cache_file else None
+            completed = False
+            try:
+                async for chunk in upstream.aiter_bytes(settings.MEDIA_DOWNLOAD_CHUNK_SIZE):
+                    if sink:
+                        await asyncio.to_thread(sink.write, chunk)
+                    yield chunk
+                completed = True
+            finally:
+                await upstream.aclose()
+                if sink:
+                    await asyncio.to_thread(sink.close)
+                    if completed:
+                        suffix = Path(urlparse(url).path).suffix or ".bin"
+                        await media_cache.put(
+                            "download", cache_params, {"content_type": content_type},
+                            extension=suffix, source_path=str(cache_file), deterministic=True
+                        )
+                    # Left behind if the client went away or the cache store failed
+                    cache_file.unlink(missing_ok=True)
+
+        return StreamingResponse(stream(), status_code=upstream.status_code, headers=headers, media_type=content_type)
+
+    async def serve(self, request: Request, location: str, media_type: Optional[str] = None,
+                    filename: Optional[str] = None) -> Response:
+        """Serve media from a local path or a remote http(s) URL"""
+        parsed = urlparse(location)
+        if parsed.scheme in ("http", "https"):
+            return await self.proxy_response(request, location, media_type, filename)
+        path = parsed.path if parsed.scheme == "file" else location
+        return self.file_response(request, path, media_type, filename)
+
+# Global instance
+media_delivery_service = MediaDeliveryService()
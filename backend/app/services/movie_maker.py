@@ -1,23 +1,41 @@
 import asyncio
+import difflib
 import json
 import logging
+import os
+import random
+import socket
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, AsyncIterator
 from enum import Enum
 from dataclasses import dataclass
-import google.generativeai as genai
-from google.cloud import aiplatform
 from app.services.gemini_cli import gemini_service
 from app.services.ffmpeg import ffmpeg_service
+from app.services.scene_scheduler import scene_scheduler
+from app.services.script_parser import StructuredScript, scene_parser, parse_scenes
+from app.services.progress_hub import progress_hub
+from app.services.system_metrics import system_metrics
+from app.services.tracing import tracer
+from app.services.media_cache import media_cache, file_digest
+from app.services.mcp_pool import credential_fingerprint
+from app.services.movie_project_store import movie_project_store, PRODUCTION_STATUSES
 from app.config import settings
+from app.services import google_sdk
 from app.database import get_user_setting
-from app.middleware.metrics import track_video_generation
+from app.middleware.metrics import track_video_generation, track_movie_scene
 from app.utils.logging_config import log_video_generation_event
 
 logger = logging.getLogger(__name__)
 
+# Estimated API cost of one 8-second clip (adjust based on actual API costs)
+COST_PER_SCENE = 0.25
+
+# Scene render state carried over when an edited script keeps a scene unchanged
+SCENE_RENDER_STATE = ("status", "clip_path", "continuity_frame", "reference_frame", "attempts", "generation_time")
+
 class VideoStyle(str, Enum):
     CINEMATIC = "cinematic"
     DOCUMENTARY = "documentary"
@@ -62,48 +80,64 @@ class VideoGenerationResult:
     audio_track_url: Optional[str] = None
     subtitle_url: Optional[str] = None
 
+class ProductionConflictError(Exception):
+    """Raised when a movie is already being produced by this or another worker"""
+
+class InvalidScriptError(Exception):
+    """Raised when an edited script contains no parseable scenes"""
+
 class MovieMakerService:
     """Service for creating complete movies with multiple scenes and continuity"""
     
     def __init__(self):
-        self.active_projects = {}
+        self.store = movie_project_store
+        # Projects this process is currently scripting or producing (live progress overlays the store)
+        self.live_projects: Dict[str, Dict[str, Any]] = {}
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._resume_task: Optional[asyncio.Task] = None
         self.output_dir = Path(settings.OUTPUT_DIR)
         self.temp_dir = Path(settings.TEMP_DIR)
         self.project_id = settings.GOOGLE_CLOUD_PROJECT
         self.location = settings.GOOGLE_CLOUD_LOCATION
         
+        # Scene clips and continuity frames outlive restarts (temp_dir is pruned on shutdown)
+        self.scene_dir = self.output_dir / "movie_scenes"
+        
         # Ensure directories exist
         self.output_dir.mkdir(exist_ok=True)
         self.temp_dir.mkdir(exist_ok=True)
+        self.scene_dir.mkdir(exist_ok=True)
         
-        # Initialize Google Cloud AI Platform
-        self._initialize_ai_platform()
+        # Google Cloud AI Platform is initialized on first use
+        self._ai_platform_ready = False
     
     def _initialize_ai_platform(self):
         """Initialize Google Cloud AI Platform for Veo API"""
+        if self._ai_platform_ready:
+            return
         try:
-            if settings.GOOGLE_APPLICATION_CREDENTIALS:
-                aiplatform.init(
-                    project=self.project_id,
-                    location=self.location,
-                    credentials=settings.GOOGLE_APPLICATION_CREDENTIALS
-                )
-            else:
-                aiplatform.init(
-                    project=self.project_id,
-                    location=self.location
-                )
+            google_sdk.init_aiplatform(self.project_id, self.location, settings.GOOGLE_APPLICATION_CREDENTIALS)
             
             # Configure Gemini API for script generation
             if settings.GEMINI_API_KEY:
-                genai.configure(api_key=settings.GEMINI_API_KEY)
+                google_sdk.configure_genai(settings.GEMINI_API_KEY)
             
+            self._ai_platform_ready = True
             logger.info("Movie maker service initialized with Google Cloud AI Platform")
             
         except Exception as e:
             logger.error(f"Failed to initialize AI platform: {e}")
             # Continue with fallback to Gemini for script generation
     
+    def _credential_fingerprint(self) -> str:
+        """Fingerprint of the Google project and keys scenes are rendered with"""
+        return credential_fingerprint({
+            "PROJECT_ID": self.project_id,
+            "LOCATION": self.location,
+            "GOOGLE_APPLICATION_CREDENTIALS": settings.GOOGLE_APPLICATION_CREDENTIALS,
+            "GOOGLE_API_KEY": settings.GEMINI_API_KEY
+        })
+    
     async def create_movie_project(self, project_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new movie project"""
         try:
@@ -111,14 +145,16 @@ class MovieMakerService:
             
             project = {
                 "id": project_id,
+                "user_id": project_data.get("user_id"),
                 "title": project_data["title"],
                 "concept": project_data["concept"],
                 "style": project_data["style"],
                 "preset": project_data["preset"],
                 "max_clips": project_data["max_clips"],
                 "budget": project_data["budget"],
+                "render_mode": project_data.get("render_mode"),
                 "status": "created",
-                "created_at": datetime.now().isoformat(),
+                "created_at": datetime.utcnow().isoformat(),
                 "script": None,
                 "scenes": [],
                 "generated_clips": [],
@@ -126,7 +162,7 @@ class MovieMakerService:
                 "progress": 0
             }
             
-            self.active_projects[project_id] = project
+            await self.store.create(project)
             
             logger.info(f"Created movie project: {project_id}")
             return project
@@ -135,40 +171,134 @@ class MovieMakerService:
             logger.error(f"Error creating movie project: {e}")
             raise
     
-    async def generate_script(self, project_id: str) -> Dict[str, Any]:
-        """Generate a detailed script for the movie"""
+    async def _load_project(self, project_id: str) -> Dict[str, Any]:
+        """Get a project from this process's live set or the store"""
+        project = self.live_projects.get(project_id) or await self.store.get(project_id)
+        if not project:
+            raise Exception(f"Project not found: {project_id}")
+        return project
+    
+    @tracer.traced("movie.script")
+    async def generate_script(self, project_id: str, early_render: bool = False) -> Dict[str, Any]:
+        """Generate a detailed script for the movie, publishing each scene as soon as it is written
+
+        With early_render, scenes are rendered while the rest of the script is still streaming;
+        a following production run reuses those clips.
+        """
+        tracer.set_attributes(project_id=project_id, early_render=early_render)
+        project = await self._load_project(project_id)
+        if project_id in self.live_projects:
+            raise ProductionConflictError("Movie is already being scripted or produced")
+        # Another worker may be producing it; its scene rows and files must stay
+        if project.get("status") in PRODUCTION_STATUSES:
+            raise ProductionConflictError("Movie is being produced; wait for it to finish before re-scripting")
+        if early_render:
+            # Scenes rendered while the script streams are production work: hold the lease so no
+            # other worker produces (and bills) the same scenes meanwhile
+            if not await self.store.claim(project_id, self.owner_id):
+                raise ProductionConflictError("Movie is being produced; wait for it to finish before re-scripting")
+        elif await self.store.lease_holder(project_id):
+            raise ProductionConflictError("Movie is being produced; wait for it to finish before re-scripting")
+        self.live_projects[project_id] = project
+        old_files = self._project_files(project)
+        
+        scene_queue: Optional[asyncio.Queue] = asyncio.Queue() if early_render else None
+        render_task = None
+        heartbeat = asyncio.create_task(self._renew_lease(project_id, asyncio.current_task())) if early_render else None
         try:
-            project = self.active_projects.get(project_id)
-            if not project:
-                raise Exception(f"Project not found: {project_id}")
-            
-            project["status"] = "script_generation"
-            project["progress"] = 10
+            project.update(
+                status="script_generation", progress=10, scenes=[], final_movie_path=None, thumbnail_path=None
+            )
+            await self.store.replace_scenes(
+                project_id, [], status="script_generation", progress=10, final_movie_path=None, thumbnail_path=None
+            )
+            self._delete_files(old_files)
+            self._publish_progress(project, "Generating script")
             
             # Create prompt for script generation
-            script_prompt = self._create_script_prompt(project)
-            
-            # Generate script using Gemini
-            script_response = await self._generate_script_with_gemini(script_prompt)
-            
-            # Parse the response to extract script and scenes
-            script_data = self._parse_script_response(script_response, project)
-            
-            project["script"] = script_data["script"]
-            project["scenes"] = script_data["scenes"]
+            script_format = settings.MOVIE_SCRIPT_FORMAT
+            script_prompt = self._create_script_prompt(project, script_format)
+            
+            if early_render:
+                project["script_streaming"] = True
+                render_task = asyncio.create_task(self._render_streamed_scenes(project, scene_queue))
+            
+            async def accept(scenes: List[Dict[str, Any]]):
+                for scene in scenes:
+                    project["scenes"].append(scene)
+                    await self.store.add_scene(project_id, scene)
+                    self._publish_scene(project, scene)
+                    if scene_queue:
+                        scene_queue.put_nowait(scene)
+            
+            # Parse scenes out of the Gemini stream as each block completes
+            parser = scene_parser(script_format)
+            chunks = []
+            with tracer.span("gemini.stream_script", kind="client", script_format=script_format) as span:
+                async for chunk in self._stream_script_with_gemini(script_prompt, script_format, project["concept"]):
+                    chunks.append(chunk)
+                    await accept(parser.feed(chunk))
+                await accept(parser.finish())
+                span.set_attributes(chunks=len(chunks), scenes=len(project["scenes"]))
+            if not project["scenes"]:
+                raise Exception("Script response contained no scenes")
+            
+            if render_task:
+                scene_queue.put_nowait(None)
+                await render_task
+                render_task = None
+            
+            project["script"] = "".join(chunks)
             project["status"] = "script_ready"
             project["progress"] = 30
+            await self.store.update_project(project_id, script=project["script"], status="script_ready", progress=30)
+            self._publish_progress(project, f"Script ready with {len(project['scenes'])} scenes")
             
-            logger.info(f"Generated script for project {project_id} with {len(script_data['scenes'])} scenes")
+            logger.info(f"Generated script for project {project_id} with {len(project['scenes'])} scenes")
             return project
             
         except Exception as e:
             logger.error(f"Error generating script for project {project_id}: {e}")
             project["status"] = "script_failed"
             project["error"] = str(e)
+            await self.store.update_project(project_id, status="script_failed", error=str(e))
+            self._publish_progress(project, str(e))
             raise
+        finally:
+            if render_task:
+                # Let scenes already rendering finish and checkpoint
+                scene_queue.put_nowait(None)
+                await asyncio.gather(render_task, return_exceptions=True)
+            project.pop("script_streaming", None)
+            self.live_projects.pop(project_id, None)
+            if heartbeat:
+                heartbeat.cancel()
+                try:
+                    await self.store.release(project_id, self.owner_id)
+                except Exception as e:
+                    logger.warning(f"Could not release production lease for project {project_id}: {e}")
     
-    def _create_script_prompt(self, project: Dict[str, Any]) -> str:
+    async def _render_streamed_scenes(self, project: Dict[str, Any], scene_queue: asyncio.Queue):
+        """Render scenes handed over by the script stream until it ends (None)"""
+        async def scene_source():
+            while (scene := await scene_queue.get()) is not None:
+                yield scene
+        
+        async def render(scene: Dict[str, Any], continuity_frame: Optional[str]) -> Optional[Dict[str, Any]]:
+            return await self._render_scene(project, scene, continuity_frame)
+        
+        mode = project.get("render_mode") or settings.MOVIE_RENDER_MODE
+        await scene_scheduler.run_incremental(scene_source(), render, mode=mode)
+    
+    def _publish_scene(self, project: Dict[str, Any], scene: Dict[str, Any]):
+        """Push a newly parsed scene to progress watchers (keyed per scene so updates don't coalesce away)"""
+        progress_hub.publish(
+            f"movie:{project['id']}", f"{project['id']}:scene:{scene['id']}", project.get("progress"),
+            "scene_parsed", f"Scene {scene['id']}: {scene.get('title', '')}",
+            project_id=project["id"], scene=dict(scene)
+        )
+    
+    def _create_script_prompt(self, project: Dict[str, Any], script_format: str = "text") -> str:
         """Create a detailed prompt for script generation"""
         style_descriptions = {
             "anime": "Japanese animation style with dynamic action and emotional storytelling",
@@ -193,23 +323,14 @@ class MovieMakerService:
         style_desc = style_descriptions.get(project["style"], "cinematic storytelling")
         preset_guide = preset_guidelines.get(project["preset"], "narrative storytelling")
         
-        return f"""Create a detailed movie script for a {project["preset"]} in {project["style"]} style.
-
-Title: {project["title"]}
-Concept: {project["concept"]}
-Style: {style_desc}
-Guidelines: {preset_guide}
-Maximum scenes: {project["max_clips"]}
-
-Requirements:
-1. Create a compelling narrative that flows logically
-2. Each scene should be exactly 8 seconds long
-3. Include detailed visual descriptions for each scene
-4. Ensure continuity between scenes for smooth transitions
-5. Match the {project["style"]} aesthetic throughout
-6. Stay within the {project["preset"]} format guidelines
+        if script_format == "json":
+            output_format = f"""Output format:
+Respond with a single JSON object (no markdown, no commentary) that conforms to this JSON schema:
+{json.dumps(StructuredScript.model_json_schema())}
 
-Output format:
+Give every scene a detailed "visual_prompt" for AI video generation, and set "continuity" to "None" if the scene does not continue from the previous scene's final frame."""
+        else:
+            output_format = """Output format:
 TITLE: [Movie Title]
 
 SYNOPSIS:
@@ -223,31 +344,56 @@ Scene 1: [Title]
 Duration: 8 seconds
 Description: [Detailed scene description]
 Visual Prompt: [Specific prompt for AI video generation]
-Continuity: [How this connects to previous/next scene]
+Continuity: [How this connects to previous/next scene, or "None" if it does not continue from the previous scene's final frame]
 
 [Continue for all scenes...]
 
 PRODUCTION NOTES:
-[Any additional notes for production]
+[Any additional notes for production]"""
+        
+        return f"""Create a detailed movie script for a {project["preset"]} in {project["style"]} style.
+
+Title: {project["title"]}
+Concept: {project["concept"]}
+Style: {style_desc}
+Guidelines: {preset_guide}
+Maximum scenes: {project["max_clips"]}
+
+Requirements:
+1. Create a compelling narrative that flows logically
+2. Each scene should be exactly 8 seconds long
+3. Include detailed visual descriptions for each scene
+4. Ensure continuity between scenes for smooth transitions
+5. Match the {project["style"]} aesthetic throughout
+6. Stay within the {project["preset"]} format guidelines
+
+{output_format}
 
 Please ensure each scene builds upon the previous one and creates a cohesive story."""
 
-    async def _generate_script_with_gemini(self, prompt: str) -> str:
-        """Generate script using Gemini API"""
+    async def _stream_script_with_gemini(
+        self, prompt: str, script_format: str = "text", concept: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream the script from Gemini"""
+        streamed = False
         try:
-            # Use Gemini CLI to generate the script
-            response = await gemini_service.generate_text(
+            async for chunk in gemini_service.stream_text(
                 prompt=prompt,
                 temperature=0.8,
-                max_tokens=2000
-            )
-            
-            return response
-            
+                max_tokens=2000,
+                response_mime_type="application/json" if script_format == "json" else None
+            ):
+                streamed = True
+                yield chunk
         except Exception as e:
+            if streamed:
+                # Scenes already emitted can't be taken back; keep the script received so far
+                logger.error(f"Script stream from Gemini interrupted: {e}")
+                return
             logger.error(f"Error generating script with Gemini: {e}")
             # Fallback to basic script structure
-            return self._generate_basic_script(prompt)
+            # (built from the one-line concept: the full prompt contains format examples the parser would pick up)
+            yield self._generate_basic_script(" ".join((concept or prompt).split()))
     
     def _generate_basic_script(self, prompt: str) -> str:
         """Generate a basic script structure when AI generation fails"""
@@ -290,70 +436,11 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
     def _parse_script_response(self, script_response: str, project: Dict[str, Any]) -> Dict[str, Any]:
         """Parse the script response to extract scenes and metadata"""
         try:
-            lines = script_response.split('\n')
-            script_data = {
+            return {
                 "script": script_response,
-                "scenes": []
+                "scenes": parse_scenes(script_response)
             }
             
-            current_scene = None
-            in_scenes_section = False
-            
-            for line in lines:
-                line = line.strip()
-                
-                if line.startswith("SCENES:"):
-                    in_scenes_section = True
-                    continue
-                
-                if in_scenes_section and line.startswith("Scene"):
-                    if current_scene:
-                        script_data["scenes"].append(current_scene)
-                    
-                    # Extract scene number and title
-                    parts = line.split(":", 1)
-                    if len(parts) == 2:
-                        scene_info = parts[0].strip()
-                        scene_title = parts[1].strip()
-                        
-                        current_scene = {
-                            "id": len(script_data["scenes"]) + 1,
-                            "title": scene_title,
-                            "duration": 8,
-                            "description": "",
-                            "visual_prompt": "",
-                            "continuity": "",
-                            "status": "pending"
-                        }
-                
-                elif current_scene and line.startswith("Duration:"):
-                    duration_text = line.split(":", 1)[1].strip()
-                    try:
-                        current_scene["duration"] = int(duration_text.split()[0])
-                    except:
-                        pass
-                
-                elif current_scene and line.startswith("Description:"):
-                    current_scene["description"] = line.split(":", 1)[1].strip()
-                
-                elif current_scene and line.startswith("Visual Prompt:"):
-                    current_scene["visual_prompt"] = line.split(":", 1)[1].strip()
-                
-                elif current_scene and line.startswith("Continuity:"):
-                    current_scene["continuity"] = line.split(":", 1)[1].strip()
-                
-                elif line.startswith("PRODUCTION NOTES:"):
-                    in_scenes_section = False
-                    if current_scene:
-                        script_data["scenes"].append(current_scene)
-                    break
-            
-            # Add the last scene if exists
-            if current_scene:
-                script_data["scenes"].append(current_scene)
-            
-            return script_data
-            
         except Exception as e:
             logger.error(f"Error parsing script response: {e}")
             # Return basic structure if parsing fails
@@ -365,15 +452,19 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
     async def start_movie_production(self, project_id: str) -> Dict[str, Any]:
         """Start the movie production process"""
         try:
-            project = self.active_projects.get(project_id)
-            if not project:
-                raise Exception(f"Project not found: {project_id}")
+            project = await self._load_project(project_id)
             
             if not project.get("scenes"):
                 raise Exception("No scenes available. Generate script first.")
             
+            # The lease keeps other workers (and repeated requests) from producing the same movie
+            running_here = project_id in self.live_projects
+            if running_here or not await self.store.claim(project_id, self.owner_id, status="production_started"):
+                raise ProductionConflictError("Movie production is already running for this project")
+            
             project["status"] = "production_started"
-            project["progress"] = 40
+            project["progress"] = max(project.get("progress", 0), 40)
+            self._publish_progress(project, "Production started")
             
             # Start background production task
             asyncio.create_task(self._produce_movie_background(project_id))
@@ -385,88 +476,367 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
             logger.error(f"Error starting movie production: {e}")
             raise
     
+    async def resume_interrupted_productions(self) -> int:
+        """Restart productions whose worker went away; finished scenes are not rendered again"""
+        resumed = 0
+        for project_id in await self.store.list_interrupted():
+            if project_id in self.live_projects:
+                continue
+            if await self.store.claim(project_id, self.owner_id):
+                asyncio.create_task(self._produce_movie_background(project_id))
+                resumed += 1
+        if resumed:
+            logger.info(f"Resuming {resumed} interrupted movie productions")
+        return resumed
+    
+    async def _resume_loop(self):
+        """Pick up productions whose lease expired, including those of a worker that crashed after startup"""
+        while True:
+            try:
+                await self.resume_interrupted_productions()
+            except Exception as e:
+                logger.warning(f"Could not scan for interrupted movie productions: {e}")
+            await asyncio.sleep(settings.MOVIE_PRODUCTION_LEASE / 2)
+    
+    def start(self):
+        """Start the periodic scan for interrupted productions"""
+        if self._resume_task is None or self._resume_task.done():
+            self._resume_task = asyncio.create_task(self._resume_loop())
+    
+    async def stop(self):
+        """Stop the interrupted production scan"""
+        if self._resume_task:
+            self._resume_task.cancel()
+            try:
+                await self._resume_task
+            except asyncio.CancelledError:
+                pass
+            self._resume_task = None
+    
+    async def resume_production(self, project_id: str) -> Dict[str, Any]:
+        """Re-run only the stages of a failed or interrupted production that have no checkpoint"""
+        project = await self._load_project(project_id)
+        if project_id in self.live_projects:
+            raise ProductionConflictError("Movie is already being scripted or produced")
+        
+        if not project.get("scenes"):
+            # The script checkpoint is missing, so the script comes first
+            asyncio.create_task(self._script_then_produce(project_id))
+            project["status"] = "script_generation"
+            return project
+        
+        if project["status"] == "completed" and self._stage_done(project, "final_movie_path") \
+                and self._stage_done(project, "thumbnail_path"):
+            return project
+        
+        # Scenes that are not completed (or have lost their files) are rendered again by the production run
+        return await self.start_movie_production(project_id)
+    
+    async def _script_then_produce(self, project_id: str):
+        try:
+            await self.generate_script(project_id)
+            await self.start_movie_production(project_id)
+        except Exception as e:
+            logger.error(f"Resuming project {project_id} from the script stage failed: {e}")
+    
+    def _stage_done(self, project: Dict[str, Any], key: str) -> bool:
+        """Whether a project-level checkpoint (final movie, thumbnail) exists on disk"""
+        return bool(project.get(key)) and Path(project[key]).exists()
+    
+    async def _renew_lease(self, project_id: str, production: asyncio.Task):
+        """Keep the production lease alive while this worker renders; stop rendering if it was lost"""
+        while True:
+            await asyncio.sleep(settings.MOVIE_PRODUCTION_LEASE / 3)
+            try:
+                renewed = await self.store.claim(project_id, self.owner_id)
+            except Exception as e:
+                logger.warning(f"Could not renew production lease for project {project_id}: {e}")
+                continue
+            if not renewed:
+                # Another worker took over after the lease expired; it owns the project now
+                logger.error(f"Lost production lease for project {project_id}, stopping production here")
+                production.cancel()
+                return
+    
+    @tracer.traced("movie.production")
     async def _produce_movie_background(self, project_id: str):
         """Background task for movie production"""
+        tracer.set_attributes(project_id=project_id)
+        logger.info(f"Producing movie {project_id} (trace {tracer.current_trace_id()})")
+        project = None
+        heartbeat = asyncio.create_task(self._renew_lease(project_id, asyncio.current_task()))
         try:
-            project = self.active_projects.get(project_id)
+            project = await self.store.get(project_id)
             if not project:
                 return
+            self.live_projects[project_id] = project
             
             project["status"] = "generating_clips"
+            await self.store.update_project(project_id, status="generating_clips")
             scenes = project["scenes"]
-            generated_clips = []
+            mode = project.get("render_mode") or settings.MOVIE_RENDER_MODE
+            project["scenes_rendered"] = project["scenes_reused"] = sum(
+                1 for scene in scenes if self._reusable_clip(scene)
+            )
+            if project["scenes_rendered"]:
+                self._publish_progress(
+                    project, f"Resuming production, {project['scenes_rendered']}/{len(scenes)} scenes already rendered"
+                )
+            else:
+                self._publish_progress(project, "Generating scene clips")
             
-            # Generate video for each scene
-            for i, scene in enumerate(scenes):
-                scene["status"] = "generating"
-                project["progress"] = 40 + (i * 50 // len(scenes))
-                
-                # Generate video for this scene
-                clip_path = await self._generate_scene_video(project, scene, i)
-                
-                if clip_path:
-                    generated_clips.append({
-                        "scene_id": scene["id"],
-                        "clip_path": clip_path,
-                        "continuity_frame": None
-                    })
-                    
-                    # Extract continuity frame for next scene
-                    if i < len(scenes) - 1:
-                        frame_path = await ffmpeg_service.extract_final_frame(clip_path)
-                        styled_frame = await ffmpeg_service.apply_style_transfer(
-                            frame_path, project["style"]
-                        )
-                        generated_clips[-1]["continuity_frame"] = styled_frame
-                
-                scene["status"] = "completed"
+            async def render(scene: Dict[str, Any], continuity_frame: Optional[str]) -> Optional[Dict[str, Any]]:
+                return await self._render_scene(project, scene, continuity_frame)
+            
+            # Render scenes concurrently, respecting continuity dependencies
+            clips = await scene_scheduler.run(
+                scenes,
+                render,
+                mode=mode,
+                continuity_differs=self._continuity_differs
+            )
+            
+            # A missing scene fails the movie instead of silently dropping out of it; its
+            # finished neighbours stay checkpointed for /resume
+            missing = [scene for scene in scenes if not clips.get(scene["id"])]
+            if missing:
+                details = ", ".join(
+                    f"scene {scene['id']} ({scene.get('error') or 'continuity source not rendered'})"
+                    for scene in missing
+                )
+                raise Exception(f"{len(missing)} of {len(scenes)} scenes failed: {details}")
+            
+            project["generated_clips"] = [clips[scene["id"]] for scene in scenes]
+            # Checkpoints that did not match their reference were rendered again
+            project["scenes_reused"] = sum(1 for clip in project["generated_clips"] if clip.get("reused"))
             
-            project["generated_clips"] = generated_clips
+            # Assemble final movie (skipped when resuming after a thumbnail failure)
+            project["status"] = "assembling"
+            await self.store.update_project(project_id, status="assembling")
+            tracer.set_attributes(scenes=len(scenes), scenes_reused=project["scenes_reused"])
+            if not (project.get("scenes_reused") == len(scenes) and self._stage_done(project, "final_movie_path")):
+                await self._assemble_final_movie(project)
+                await self.store.update_project(project_id, final_movie_path=project["final_movie_path"])
             
-            # Assemble final movie
-            await self._assemble_final_movie(project)
+            if not self._stage_done(project, "thumbnail_path"):
+                await self._create_movie_thumbnail(project)
+                await self.store.update_project(project_id, thumbnail_path=project["thumbnail_path"])
             
             project["status"] = "completed"
             project["progress"] = 100
+            await self.store.update_project(project_id, status="completed", progress=100, error=None)
+            self._publish_progress(project, "Movie completed")
             
             logger.info(f"Completed movie production for project {project_id}")
             
+        except asyncio.CancelledError:
+            # Shutdown or lost lease: keep the production status for whoever resumes or owns it
+            raise
         except Exception as e:
             logger.error(f"Error in movie production background task: {e}")
-            project["status"] = "failed"
-            project["error"] = str(e)
+            if project:
+                project["status"] = "failed"
+                project["error"] = str(e)
+                self._publish_progress(project, str(e))
+            try:
+                await self.store.update_project(project_id, status="failed", error=str(e))
+            except Exception as store_error:
+                logger.error(f"Could not record failure of project {project_id}: {store_error}")
+        finally:
+            heartbeat.cancel()
+            self.live_projects.pop(project_id, None)
+            try:
+                await self.store.release(project_id, self.owner_id)
+            except Exception as e:
+                logger.warning(f"Could not release production lease for project {project_id}: {e}")
+    
+    def _reusable_clip(self, scene: Dict[str, Any], continuity_frame: Optional[str] = None) -> bool:
+        """Whether a scene already has a finished clip (and continuity frame) on disk from an earlier run
+
+        With a continuity frame, the clip must also have been rendered from that frame; a render
+        without a reference (independent scenes, the speculative first pass) accepts any clip.
+        """
+        if scene.get("status") != "completed" or not scene.get("clip_path"):
+            return False
+        if continuity_frame is not None and scene.get("reference_frame") != continuity_frame:
+            return False
+        paths = [scene["clip_path"]] + ([scene["continuity_frame"]] if scene.get("continuity_frame") else [])
+        return all(Path(path).exists() for path in paths)
+    
+    @tracer.traced("movie.scene")
+    async def _render_scene(
+        self,
+        project: Dict[str, Any],
+        scene: Dict[str, Any],
+        continuity_frame: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Render a scene, retrying failed attempts with backoff up to the scene retry budget"""
+        tracer.set_attributes(project_id=project["id"], scene_id=scene["id"], continuity=bool(continuity_frame))
+        if self._reusable_clip(scene, continuity_frame):
+            tracer.set_attributes(reused=True)
+            return {
+                "scene_id": scene["id"],
+                "clip_path": scene["clip_path"],
+                "continuity_frame": scene.get("continuity_frame"),
+                "reference_frame": scene.get("reference_frame"),
+                "reused": True
+            }
+        
+        max_attempts = settings.MOVIE_SCENE_MAX_ATTEMPTS
+        for attempt in range(1, max_attempts + 1):
+            scene["attempts"] = scene.get("attempts", 0) + 1
+            try:
+                with tracer.span("movie.scene.attempt", attempt=attempt):
+                    clip = await self._render_scene_stages(project, scene, continuity_frame)
+                track_movie_scene(project["style"], "continuity" if continuity_frame else "independent")
+                return clip
+            except Exception as e:
+                logger.warning(f"Scene {scene['id']} attempt {attempt}/{max_attempts} failed: {e}")
+                scene["error"] = str(e)
+                if attempt == max_attempts:
+                    break
+                scene["status"] = "retrying"
+                await self.store.update_scene(project["id"], scene)
+                delay = min(
+                    settings.MOVIE_SCENE_RETRY_BACKOFF * 2 ** (attempt - 1),
+                    settings.MOVIE_SCENE_RETRY_MAX_DELAY
+                )
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+        
+        scene["status"] = "failed"
+        await self.store.update_scene(project["id"], scene)
+        tracer.set_attributes(failed=True, error=scene.get("error"))
+        return None
+    
+    async def _render_scene_stages(
+        self,
+        project: Dict[str, Any],
+        scene: Dict[str, Any],
+        continuity_frame: Optional[str]
+    ) -> Dict[str, Any]:
+        """Generate the clip, then the styled continuity frame, checkpointing after each stage"""
+        started = time.monotonic()
+        
+        # A clip checkpointed by an earlier attempt is kept if it was rendered from the same reference
+        clip_checkpointed = (
+            scene.get("status") == "clip_ready"
+            and scene.get("reference_frame") == continuity_frame
+            and bool(scene.get("clip_path")) and Path(scene["clip_path"]).exists()
+        )
+        if not clip_checkpointed:
+            # A finished clip rendered from another reference (e.g. a continuity re-render) is replaced
+            replaced = [scene.get(key) for key in ("clip_path", "continuity_frame") if scene.get(key)]
+            scene["status"] = "generating"
+            await self.store.update_scene(project["id"], scene)
+            
+            clip_path = await self._generate_scene_video(project, scene, continuity_frame)
+            if not clip_path:
+                raise Exception("Video generation returned no clip")
+            
+            scene.update({
+                "status": "clip_ready", "clip_path": clip_path, "continuity_frame": None,
+                "reference_frame": continuity_frame
+            })
+            await self.store.update_scene(project["id"], scene)
+            self._delete_files(replaced)
+        
+        clip = {
+            "scene_id": scene["id"],
+            "clip_path": scene["clip_path"],
+            "continuity_frame": None,
+            "reference_frame": continuity_frame
+        }
+        
+        # Extract continuity frame for next scene (while the script streams, any scene may have a next one)
+        if project.get("script_streaming") or scene is not project["scenes"][-1]:
+            # Decode the last frame straight into memory and write only the styled result
+            frame = await ffmpeg_service.extract_final_frame_array(scene["clip_path"])
+            clip["continuity_frame"] = await ffmpeg_service.apply_style_transfer(
+                frame,
+                project["style"],
+                output_path=str(self.scene_dir / f"{project['id']}_scene_{scene['id']}_{uuid.uuid4().hex[:8]}_continuity.jpg")
+            )
+        
+        scene.update({
+            "status": "completed",
+            "continuity_frame": clip["continuity_frame"],
+            "error": None,
+            "generation_time": int(time.monotonic() - started)
+        })
+        project["scenes_rendered"] = project.get("scenes_rendered", 0) + 1
+        # While the script streams the scene count is not final and the project is still in the script stage
+        streaming = project.get("script_streaming")
+        if not streaming:
+            rendered = min(project["scenes_rendered"], len(project["scenes"]))
+            project["progress"] = 40 + (rendered * 50 // len(project["scenes"]))
+        await self.store.update_scene(project["id"], scene, progress=None if streaming else project["progress"])
+        self._publish_progress(project, f"Rendered {project['scenes_rendered']}/{len(project['scenes'])} scenes")
+        return clip
+    
+    def _publish_progress(self, project: Dict[str, Any], message: Optional[str] = None):
+        """Push the project's status to progress watchers"""
+        progress_hub.publish(
+            f"movie:{project['id']}", project["id"], project.get("progress"), project.get("status"), message
+        )
+    
+    @tracer.traced("movie.continuity_check")
+    async def _continuity_differs(self, continuity_frame: str, clip: Dict[str, Any]) -> bool:
+        """Check whether a speculatively rendered clip drifts from its reference frame"""
+        if clip.get("reused"):
+            # Already accepted by the run that rendered it
+            return False
+        first_frame = await ffmpeg_service.extract_first_frame(clip["clip_path"])
+        difference = await asyncio.to_thread(
+            ffmpeg_service.frame_difference, continuity_frame, first_frame
+        )
+        return difference > settings.MOVIE_CONTINUITY_DIFF_THRESHOLD
     
+    @tracer.traced("movie.scene.video")
     async def _generate_scene_video(
         self, 
         project: Dict[str, Any], 
         scene: Dict[str, Any], 
-        scene_index: int
+        continuity_frame: Optional[str] = None
     ) -> Optional[str]:
         """Generate video for a single scene using real Veo API"""
         try:
             # Prepare the prompt for video generation
             video_prompt = f"{project['style']} style: {scene['visual_prompt']}"
             
-            # Add continuity reference if available
-            continuity_frame = None
-            if scene_index > 0 and project["generated_clips"]:
-                prev_clip = project["generated_clips"][-1]
-                continuity_frame = prev_clip.get("continuity_frame")
+            # Retries of a project reuse clips already generated for the same scene input
+            cache_params = {
+                "prompt": video_prompt,
+                "duration": scene["duration"],
+                "reference": await asyncio.to_thread(file_digest, continuity_frame) if continuity_frame else None,
+                "credentials": self._credential_fingerprint()
+            }
+            cached = await media_cache.get("scene", cache_params)
+            tracer.set_attributes(cached=bool(cached))
             
-            # Try real Veo API first, fallback to Gemini if needed
-            try:
-                video_data = await self._generate_video_veo(video_prompt, scene, continuity_frame)
-            except Exception as e:
-                logger.warning(f"Veo API failed, falling back to Gemini: {e}")
-                video_data = await self._generate_video_gemini(video_prompt, scene, continuity_frame)
+            if cached:
+                video_data = await media_cache.read(cached)
+            else:
+                # Try real Veo API first, fallback to Gemini if needed
+                try:
+                    video_data = await self._generate_video_veo(video_prompt, scene, continuity_frame)
+                except Exception as e:
+                    logger.warning(f"Veo API failed, falling back to Gemini: {e}")
+                    video_data = await self._generate_video_gemini(video_prompt, scene, continuity_frame)
+                
+                if video_data:
+                    await media_cache.put(
+                        "scene", cache_params, {"scene_id": scene["id"]}, data=video_data, extension=".mp4"
+                    )
             
             if video_data:
                 # Save the video to a file
-                clip_filename = f"{project['id']}_scene_{scene['id']}.mp4"
-                clip_path = self.temp_dir / clip_filename
+                # Unique per render: after a script edit a reused clip may belong to a renumbered scene
+                clip_filename = f"{project['id']}_scene_{scene['id']}_{uuid.uuid4().hex[:8]}.mp4"
+                clip_path = self.scene_dir / clip_filename
                 
                 with open(clip_path, 'wb') as f:
                     f.write(video_data)
+                system_metrics.record_write(clip_path)
                 
                 logger.info(f"Generated video for scene {scene['id']}: {clip_path}")
                 return str(clip_path)
@@ -475,8 +845,9 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
             
         except Exception as e:
             logger.error(f"Error generating video for scene {scene['id']}: {e}")
-            return None
+            raise
     
+    @tracer.traced("veo.predict", kind="client")
     async def _generate_video_veo(self, prompt: str, scene: Dict[str, Any], reference_image: Optional[str] = None) -> Optional[bytes]:
         """Generate video using real Google Veo API"""
         try:
@@ -492,7 +863,8 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
             
             # Call Veo API via Google Cloud AI Platform
             # Note: This is a simplified version - actual implementation would use the specific Veo endpoint
-            endpoint = aiplatform.Endpoint(
+            await asyncio.to_thread(self._initialize_ai_platform)
+            endpoint = google_sdk.aiplatform().Endpoint(
                 endpoint_name=f"projects/{self.project_id}/locations/{self.location}/endpoints/veo"
             )
             
@@ -516,11 +888,13 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
             logger.error(f"Real Veo API call failed: {e}")
             raise
     
+    @tracer.traced("gemini.video", kind="client")
     async def _generate_video_gemini(self, prompt: str, scene: Dict[str, Any], reference_image: Optional[str] = None) -> Optional[bytes]:
         """Generate video using Gemini API as fallback"""
         try:
             # Use Gemini for video generation (this would be more complex in reality)
-            model = genai.GenerativeModel("gemini-1.5-pro")
+            await asyncio.to_thread(self._initialize_ai_platform)
+            model = google_sdk.genai().GenerativeModel("gemini-1.5-pro")
             
             # Create video generation prompt
             video_prompt = f"""
@@ -549,6 +923,7 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
             logger.error(f"Gemini video generation failed: {e}")
             raise
     
+    @tracer.traced("movie.assemble")
     async def _assemble_final_movie(self, project: Dict[str, Any]):
         """Assemble all clips into the final movie"""
         try:
@@ -570,57 +945,68 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
             
             project["final_movie_path"] = final_path
             
-            # Create thumbnail
-            thumbnail_path = await ffmpeg_service.create_thumbnail(final_path)
-            project["thumbnail_path"] = thumbnail_path
-            
             logger.info(f"Assembled final movie: {final_path}")
             
         except Exception as e:
             logger.error(f"Error assembling final movie: {e}")
             raise
     
-    def get_project_status(self, project_id: str) -> Optional[Dict[str, Any]]:
+    @tracer.traced("movie.thumbnail")
+    async def _create_movie_thumbnail(self, project: Dict[str, Any]):
+        """Create the thumbnail next to the final movie (temp files are pruned on shutdown)"""
+        final_path = Path(project["final_movie_path"])
+        project["thumbnail_path"] = await ffmpeg_service.create_thumbnail(
+            str(final_path), output_path=str(final_path.with_name(f"{final_path.stem}_thumb.jpg"))
+        )
+    
+    async def get_project_status(self, project_id: str) -> Optional[Dict[str, Any]]:
         """Get the current status of a movie project"""
-        return self.active_projects.get(project_id)
+        return self.live_projects.get(project_id) or await self.store.get(project_id)
+    
+    async def list_projects(
+        self, limit: Optional[int] = None, offset: int = 0, status: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """List one page of movie projects (newest first) and the total number of matches"""
+        projects, total = await self.store.list_page(
+            limit or settings.MOVIE_PROJECTS_PAGE_SIZE, offset, status=status
+        )
+        for project in projects:
+            live = self.live_projects.get(project["id"])
+            if live:
+                project.update(status=live["status"], progress=live.get("progress", project["progress"]))
+        return projects, total
+    
+    async def count_active_projects(self) -> int:
+        """Number of projects currently scripting or in production"""
+        return await self.store.count(("script_generation",) + PRODUCTION_STATUSES)
     
-    def list_projects(self) -> List[Dict[str, Any]]:
-        """List all active movie projects"""
-        return list(self.active_projects.values())
+    def _project_files(self, project: Dict[str, Any]) -> List[str]:
+        """Scene clips, continuity frames, final movie and thumbnail of a project"""
+        paths = [
+            scene.get(key) for scene in project.get("scenes", []) for key in ("clip_path", "continuity_frame")
+        ]
+        paths += [project.get("final_movie_path"), project.get("thumbnail_path")]
+        return [path for path in paths if path]
+    
+    def _delete_files(self, paths: List[str]):
+        for path in paths:
+            try:
+                system_metrics.unlink(path)
+            except Exception as e:
+                logger.warning(f"Could not delete movie file {path}: {e}")
     
-    def delete_project(self, project_id: str) -> bool:
+    async def delete_project(self, project_id: str) -> bool:
         """Delete a movie project and clean up files"""
         try:
-            project = self.active_projects.get(project_id)
+            project = await self.store.get(project_id)
             if not project:
                 return False
             
             # Clean up generated files
-            if project.get("generated_clips"):
-                for clip in project["generated_clips"]:
-                    try:
-                        Path(clip["clip_path"]).unlink(missing_ok=True)
-                        if clip.get("continuity_frame"):
-                            Path(clip["continuity_frame"]).unlink(missing_ok=True)
-                    except Exception as e:
-                        logger.warning(f"Could not delete clip file: {e}")
-            
-            # Clean up final movie file
-            if project.get("final_movie_path"):
-                try:
-                    Path(project["final_movie_path"]).unlink(missing_ok=True)
-                except Exception as e:
-                    logger.warning(f"Could not delete movie file: {e}")
-            
-            # Clean up thumbnail
-            if project.get("thumbnail_path"):
-                try:
-                    Path(project["thumbnail_path"]).unlink(missing_ok=True)
-                except Exception as e:
-                    logger.warning(f"Could not delete thumbnail file: {e}")
+            self._delete_files(self._project_files(project))
             
-            # Remove from active projects
-            del self.active_projects[project_id]
+            await self.store.delete(project_id)
+            self.live_projects.pop(project_id, None)
             
             logger.info(f"Deleted project {project_id}")
             return True
@@ -629,20 +1015,107 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
             logger.error(f"Error deleting project {project_id}: {e}")
             return False
     
-    def update_script(self, project_id: str, new_script: str) -> Dict[str, Any]:
-        """Update the script for a movie project"""
+    def _scene_signature(self, scene: Dict[str, Any]) -> Tuple[str, int, str]:
+        """The scene fields that determine its rendered clip"""
+        return (
+            scene.get("visual_prompt", "").strip(),
+            scene.get("duration", 8),
+            scene.get("continuity", "").strip()
+        )
+    
+    def _plan_script_update(self, project: Dict[str, Any], new_script: str) -> Dict[str, Any]:
+        """Diff the current scenes against an edited script and carry over every clip that stays valid"""
+        old_scenes = project.get("scenes", [])
+        new_scenes = self._parse_script_response(new_script, project)["scenes"]
+        if not new_scenes:
+            # Accepting it would discard every rendered clip
+            raise InvalidScriptError("Edited script contains no scenes")
+        
+        # Align old and new scenes by content so inserted or removed scenes don't shift the rest
+        matcher = difflib.SequenceMatcher(
+            a=[self._scene_signature(scene) for scene in old_scenes],
+            b=[self._scene_signature(scene) for scene in new_scenes],
+            autojunk=False
+        )
+        matches = {}
+        for block in matcher.get_matching_blocks():
+            for offset in range(block.size):
+                matches[block.b + offset] = block.a + offset
+        
+        reused = []
+        for index, scene in enumerate(new_scenes):
+            old_index = matches.get(index)
+            old_scene = old_scenes[old_index] if old_index is not None else None
+            if not old_scene or old_scene.get("status") not in ("clip_ready", "completed"):
+                continue
+            # A scene continuing from the previous scene's final frame is only valid if that
+            # frame is the one it was rendered from
+            if scene.get("continuity_required") and not (
+                index - 1 in reused and matches.get(index - 1) == old_index - 1
+            ):
+                continue
+            for key in SCENE_RENDER_STATE:
+                if key in old_scene:
+                    scene[key] = old_scene[key]
+            if index < len(new_scenes) - 1 and not scene.get("continuity_frame"):
+                # Previously the last scene; its clip is kept but it now needs a continuity frame
+                scene["status"] = "clip_ready"
+            reused.append(index)
+        
+        to_render = [scene["id"] for index, scene in enumerate(new_scenes) if index not in reused]
+        kept_paths = {
+            scene.get(key) for scene in new_scenes for key in ("clip_path", "continuity_frame") if scene.get(key)
+        }
+        unchanged = not to_render and len(new_scenes) == len(old_scenes)
+        return {
+            "scenes": new_scenes,
+            "scenes_total": len(new_scenes),
+            "scenes_reused": len(reused),
+            "scenes_to_render": to_render,
+            "estimated_cost": len(to_render) * COST_PER_SCENE,
+            "within_budget": len(to_render) * COST_PER_SCENE <= project.get("budget", 10.0),
+            "unchanged": unchanged,
+            "discarded_files": sorted(
+                scene[key] for scene in old_scenes for key in ("clip_path", "continuity_frame")
+                if scene.get(key) and scene[key] not in kept_paths
+            )
+        }
+    
+    async def estimate_script_update(self, project_id: str, new_script: str) -> Dict[str, Any]:
+        """Report which scenes an edited script would re-render, without changing the project"""
+        project = await self._load_project(project_id)
+        plan = self._plan_script_update(project, new_script)
+        return {key: plan[key] for key in ("scenes_total", "scenes_reused", "scenes_to_render", "estimated_cost", "within_budget")}
+    
+    async def update_script(self, project_id: str, new_script: str) -> Dict[str, Any]:
+        """Update the script for a movie project, keeping clips of scenes the edit leaves intact"""
         try:
-            project = self.active_projects.get(project_id)
-            if not project:
-                raise Exception(f"Project not found: {project_id}")
+            project = await self._load_project(project_id)
+            if project.get("status") in PRODUCTION_STATUSES:
+                raise Exception("Cannot update the script while the movie is in production")
             
+            plan = self._plan_script_update(project, new_script)
             project["script"] = new_script
+            project["scenes"] = plan["scenes"]
+            fields = {"script": new_script}
+            if not plan["unchanged"]:
+                # The assembled movie no longer matches the scene list
+                project.update(final_movie_path=None, thumbnail_path=None, status="script_ready", progress=30)
+                fields.update(final_movie_path=None, thumbnail_path=None, status="script_ready", progress=30)
+            await self.store.replace_scenes(project_id, project["scenes"], **fields)
+            
+            for path in plan["discarded_files"]:
+                try:
+                    system_metrics.unlink(path)
+                except Exception as e:
+                    logger.warning(f"Could not delete clip file: {e}")
             
-            # Re-parse the script to update scenes
-            script_data = self._parse_script_response(new_script, project)
-            project["scenes"] = script_data["scenes"]
-            
-            logger.info(f"Updated script for project {project_id}")
+            project["script_update"] = {
+                key: plan[key] for key in ("scenes_total", "scenes_reused", "scenes_to_render", "estimated_cost", "within_budget")
+            }
+            logger.info(
+                f"Updated script for project {project_id}: {plan['scenes_reused']}/{plan['scenes_total']} scenes reused"
+            )
             return project
             
         except Exception as e:
@@ -652,14 +1125,11 @@ Maintain consistent style throughout. Ensure smooth transitions between scenes."
     def get_estimated_cost(self, project: Dict[str, Any]) -> float:
         """Calculate estimated cost for movie production"""
         try:
-            num_scenes = len(project.get("scenes", []))
+            num_scenes = len(project["scenes"]) if "scenes" in project else project.get("scenes_count", 0)
             if num_scenes == 0:
                 num_scenes = project.get("max_clips", 5)
             
-            # Estimate cost per scene (adjust based on actual API costs)
-            cost_per_scene = 0.25  # $0.25 per 8-second clip
-            
-            total_cost = num_scenes * cost_per_scene
+            total_cost = num_scenes * COST_PER_SCENE
             
             return min(total_cost, project.get("budget", 10.0))
             
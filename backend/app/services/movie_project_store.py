@@ -0,0 +1,308 @@
+"""
+Movie Project Store for VeoGen
+Persists movie projects and their scenes in the movie_projects / movie_scenes tables
+"""
+
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Tuple
+
+from sqlalchemy import select, update, delete, func, or_
+
+from app.config import settings
+from app.database import AsyncSessionLocal, MovieProject, MovieScene
+
+logger = logging.getLogger(__name__)
+
+# Statuses in which a project's production is owned by a worker holding its lease
+PRODUCTION_STATUSES = ("production_started", "generating_clips", "assembling")
+
+# Project dict keys and the movie_projects columns they are stored in
+PROJECT_COLUMNS = {
+    "title": "title",
+    "concept": "description",
+    "style": "style",
+    "preset": "preset",
+    "max_clips": "max_clips",
+    "budget": "budget",
+    "render_mode": "render_mode",
+    "status": "status",
+    "progress": "progress",
+    "script": "script",
+    "final_movie_path": "output_url",
+    "thumbnail_path": "thumbnail_path",
+    "error": "error_message"
+}
+
+# Scene dict keys (and movie_scenes columns) written by per-scene status updates
+SCENE_STATE_COLUMNS = {
+    "status": "status",
+    "clip_path": "output_url",
+    "continuity_frame": "continuity_frame",
+    "reference_frame": "reference_frame",
+    "error": "error_message",
+    "generation_time": "generation_time_seconds",
+    "attempts": "attempts"
+}
+
+class MovieProjectStore:
+    """Async store for movie projects; scenes are written individually as they render"""
+
+    def _scene_to_dict(self, row: MovieScene) -> Dict[str, Any]:
+        return {
+            "id": row.scene_number,
+            "title": row.title or "",
+            "duration": row.duration or 8,
+            "description": row.description or "",
+            "visual_prompt": row.prompt or "",
+            "continuity": row.continuity or "",
+            "continuity_required": bool(row.continuity_required),
+            "status": row.status or "pending",
+            "clip_path": row.output_url,
+            "continuity_frame": row.continuity_frame,
+            "reference_frame": row.reference_frame,
+            "error": row.error_message,
+            "generation_time": row.generation_time_seconds,
+            "attempts": row.attempts or 0
+        }
+
+    def _project_to_dict(self, row: MovieProject, scenes: Optional[List[MovieScene]] = None) -> Dict[str, Any]:
+        project = {
+            "id": str(row.id),
+            "user_id": row.user_id,
+            "title": row.title,
+            "concept": row.description or "",
+            "style": row.style,
+            "preset": row.preset,
+            "max_clips": row.max_clips or 10,
+            "budget": row.budget if row.budget is not None else 5.0,
+            "render_mode": row.render_mode,
+            "status": row.status,
+            "progress": row.progress or 0,
+            "script": row.script,
+            "scenes_count": row.total_scenes or 0,
+            "scenes_completed": row.completed_scenes or 0,
+            "final_movie_path": row.output_url,
+            "thumbnail_path": row.thumbnail_path,
+            "error": row.error_message,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "completed_at": row.completed_at.isoformat() if row.completed_at else None
+        }
+        if scenes is not None:
+            project["scenes"] = [self._scene_to_dict(scene) for scene in scenes]
+            project["generated_clips"] = [
+                {
+                    "scene_id": scene["id"],
+                    "clip_path": scene["clip_path"],
+                    "continuity_frame": scene["continuity_frame"],
+                    "reference_frame": scene["reference_frame"]
+                }
+                for scene in project["scenes"]
+                if scene["status"] == "completed" and scene["clip_path"]
+            ]
+        return project
+
+    def _scene_row(self, project_id: str, scene: Dict[str, Any]) -> MovieScene:
+        return MovieScene(
+            id=str(uuid.uuid4()),
+            project_id=project_id,
+            scene_number=scene["id"],
+            title=scene.get("title"),
+            description=scene.get("description"),
+            prompt=scene.get("visual_prompt") or "",
+            duration=scene.get("duration", 8),
+            continuity=scene.get("continuity"),
+            continuity_required=scene.get("continuity_required", False),
+            status=scene.get("status", "pending"),
+            output_url=scene.get("clip_path"),
+            continuity_frame=scene.get("continuity_frame"),
+            reference_frame=scene.get("reference_frame"),
+            error_message=scene.get("error"),
+            generation_time_seconds=scene.get("generation_time"),
+            attempts=scene.get("attempts", 0)
+        )
+
+    async def create(self, project: Dict[str, Any]):
+        """Insert a new project (without scenes)"""
+        async with AsyncSessionLocal() as db:
+            row = MovieProject(
+                id=project["id"],
+                user_id=project.get("user_id"),
+                created_at=datetime.fromisoformat(project["created_at"])
+            )
+            for key, column in PROJECT_COLUMNS.items():
+                setattr(row, column, project.get(key))
+            db.add(row)
+            await db.commit()
+
+    async def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Load a project with its scenes in scene order"""
+        async with AsyncSessionLocal() as db:
+            row = await db.get(MovieProject, project_id)
+            if not row:
+                return None
+            scenes = await db.scalars(
+                select(MovieScene).where(MovieScene.project_id == project_id).order_by(MovieScene.scene_number)
+            )
+            return self._project_to_dict(row, list(scenes))
+
+    async def list_page(
+        self, limit: int, offset: int = 0, status: Optional[str] = None, user_id: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Return one page of projects (newest first, without scenes) and the total count"""
+        conditions = []
+        if status:
+            conditions.append(MovieProject.status == status)
+        if user_id:
+            conditions.append(MovieProject.user_id == user_id)
+        async with AsyncSessionLocal() as db:
+            total = await db.scalar(select(func.count()).select_from(MovieProject).where(*conditions))
+            rows = await db.scalars(
+                select(MovieProject).where(*conditions)
+                .order_by(MovieProject.created_at.desc())
+                .limit(limit).offset(offset)
+            )
+            return [self._project_to_dict(row) for row in rows], total or 0
+
+    async def count(self, statuses: Optional[Tuple[str, ...]] = None) -> int:
+        async with AsyncSessionLocal() as db:
+            query = select(func.count()).select_from(MovieProject)
+            if statuses:
+                query = query.where(MovieProject.status.in_(statuses))
+            return await db.scalar(query) or 0
+
+    async def owners(self, project_ids: List[str]) -> Dict[str, Optional[str]]:
+        """user_id of each existing project among project_ids"""
+        if not project_ids:
+            return {}
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(MovieProject.id, MovieProject.user_id).where(MovieProject.id.in_(project_ids))
+            )
+            return {str(project_id): user_id for project_id, user_id in rows}
+
+    async def update_project(self, project_id: str, **fields):
+        """Write project-level fields (keys as in the project dict)"""
+        values = {PROJECT_COLUMNS[key]: value for key, value in fields.items() if key in PROJECT_COLUMNS}
+        if fields.get("status") == "completed":
+            values["completed_at"] = datetime.utcnow()
+        if not values:
+            return
+        values["updated_at"] = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(MovieProject).where(MovieProject.id == project_id).values(**values))
+            await db.commit()
+
+    async def replace_scenes(self, project_id: str, scenes: List[Dict[str, Any]], **fields):
+        """Replace a project's scene list (and optionally project fields) in one transaction"""
+        values = {PROJECT_COLUMNS[key]: value for key, value in fields.items() if key in PROJECT_COLUMNS}
+        values.update(
+            total_scenes=len(scenes),
+            completed_scenes=sum(1 for scene in scenes if scene.get("status") == "completed"),
+            updated_at=datetime.utcnow()
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(MovieScene).where(MovieScene.project_id == project_id))
+            db.add_all([self._scene_row(project_id, scene) for scene in scenes])
+            await db.execute(update(MovieProject).where(MovieProject.id == project_id).values(**values))
+            await db.commit()
+
+    async def add_scene(self, project_id: str, scene: Dict[str, Any]):
+        """Append one scene (as a streaming script produces it)"""
+        async with AsyncSessionLocal() as db:
+            db.add(self._scene_row(project_id, scene))
+            await db.execute(
+                update(MovieProject).where(MovieProject.id == project_id)
+                .values(total_scenes=MovieProject.total_scenes + 1, updated_at=datetime.utcnow())
+            )
+            await db.commit()
+
+    async def update_scene(self, project_id: str, scene: Dict[str, Any], progress: Optional[int] = None):
+        """Persist one scene's render state and refresh the project's completed-scene count"""
+        values = {column: scene.get(key) for key, column in SCENE_STATE_COLUMNS.items()}
+        now = datetime.utcnow()
+        values["updated_at"] = now
+        if scene.get("status") == "completed":
+            values["completed_at"] = now
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(MovieScene)
+                .where(MovieScene.project_id == project_id, MovieScene.scene_number == scene["id"])
+                .values(**values)
+            )
+            completed = select(func.count()).select_from(MovieScene).where(
+                MovieScene.project_id == project_id, MovieScene.status == "completed"
+            ).scalar_subquery()
+            project_values = {"completed_scenes": completed, "updated_at": now}
+            if progress is not None:
+                project_values["progress"] = progress
+            await db.execute(update(MovieProject).where(MovieProject.id == project_id).values(**project_values))
+            await db.commit()
+
+    async def delete(self, project_id: str) -> bool:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(MovieScene).where(MovieScene.project_id == project_id))
+            result = await db.execute(delete(MovieProject).where(MovieProject.id == project_id))
+            await db.commit()
+            return result.rowcount > 0
+
+    async def claim(self, project_id: str, owner: str, status: Optional[str] = None) -> bool:
+        """Take (or renew) the production lease; fails while another live worker holds it"""
+        now = datetime.utcnow()
+        values = {
+            "production_owner": owner,
+            "lease_expires_at": now + timedelta(seconds=settings.MOVIE_PRODUCTION_LEASE)
+        }
+        if status:
+            values["status"] = status
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(MovieProject)
+                .where(
+                    MovieProject.id == project_id,
+                    or_(
+                        MovieProject.production_owner.is_(None),
+                        MovieProject.production_owner == owner,
+                        MovieProject.lease_expires_at < now
+                    )
+                )
+                .values(**values)
+            )
+            await db.commit()
+            return result.rowcount > 0
+
+    async def release(self, project_id: str, owner: str):
+        """Drop the production lease if this worker still holds it"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(MovieProject)
+                .where(MovieProject.id == project_id, MovieProject.production_owner == owner)
+                .values(production_owner=None, lease_expires_at=None)
+            )
+            await db.commit()
+
+    async def lease_holder(self, project_id: str) -> Optional[str]:
+        """Worker holding an unexpired production lease on a project, if any"""
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(MovieProject.production_owner).where(
+                    MovieProject.id == project_id,
+                    MovieProject.production_owner.is_not(None),
+                    MovieProject.lease_expires_at >= datetime.utcnow()
+                )
+            )
+
+    async def list_interrupted(self) -> List[str]:
+        """Ids of projects left in production without a live lease holder"""
+        async with AsyncSessionLocal() as db:
+            rows = await db.scalars(
+                select(MovieProject.id).where(
+                    MovieProject.status.in_(PRODUCTION_STATUSES),
+                    or_(MovieProject.lease_expires_at.is_(None), MovieProject.lease_expires_at < datetime.utcnow())
+                ).order_by(MovieProject.created_at.asc())
+            )
+            return [str(project_id) for project_id in rows]
+
+# Global instance
+movie_project_store = MovieProjectStore()
@@ -10,13 +10,13 @@ import logging
 import base64
 import json
 from typing import Optional, Dict, Any, List
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from enum import Enum
-import google.generativeai as genai
-from google.cloud import aiplatform
-from google.cloud.aiplatform_v1.types import prediction_service
 from app.config import settings
-from app.database import get_user_setting
+from app.services import google_sdk
+from app.services.settings_store import settings_store
+from app.services.media_cache import media_cache
+from app.services.mcp_pool import credential_fingerprint
 from app.middleware.metrics import track_music_generation
 from app.utils.logging_config import log_music_generation_event
 
@@ -97,7 +97,7 @@ class LyriaService:
         try:
             if db_session and user_id:
                 # Try to get from user settings first
-                user_key = get_user_setting(db_session, user_id, key_name)
+                user_key = settings_store.get_sync(db_session, user_id, key_name)
                 if user_key:
                     return user_key
         except Exception as e:
@@ -122,21 +122,11 @@ class LyriaService:
             project_id = self._get_api_key_from_user_settings(db_session, user_id, "google_cloud_project") or self.project_id
             
             # Initialize Google Cloud AI Platform
-            if settings.GOOGLE_APPLICATION_CREDENTIALS:
-                aiplatform.init(
-                    project=project_id,
-                    location=self.location,
-                    credentials=settings.GOOGLE_APPLICATION_CREDENTIALS
-                )
-            else:
-                aiplatform.init(
-                    project=project_id,
-                    location=self.location
-                )
+            google_sdk.init_aiplatform(project_id, self.location, settings.GOOGLE_APPLICATION_CREDENTIALS)
             
             # Configure Gemini API for fallback and lyrics generation
             if gemini_key:
-                genai.configure(api_key=gemini_key)
+                google_sdk.configure_genai(gemini_key)
             
             self.initialized = True
             logger.info("Lyria service initialized successfully with Google Cloud AI Platform")
@@ -146,12 +136,36 @@ class LyriaService:
             # Fallback to Gemini if Google Cloud fails
             gemini_key = self._get_api_key_from_user_settings(db_session, user_id, "gemini_api_key")
             if gemini_key:
-                genai.configure(api_key=gemini_key)
+                google_sdk.configure_genai(gemini_key)
                 self.initialized = True
                 logger.info("Falling back to Gemini API for music generation")
             else:
                 raise
     
+    def _credential_fingerprint(self, db_session=None, user_id=None) -> str:
+        """Fingerprint of the Google project and keys a generation for this user runs with"""
+        return credential_fingerprint({
+            "PROJECT_ID": self._get_api_key_from_user_settings(db_session, user_id, "google_cloud_project") or self.project_id,
+            "LOCATION": self.location,
+            "GOOGLE_APPLICATION_CREDENTIALS": settings.GOOGLE_APPLICATION_CREDENTIALS,
+            "GOOGLE_API_KEY": self._get_api_key_from_user_settings(db_session, user_id, "gemini_api_key")
+        })
+    
+    @staticmethod
+    def _audio_bytes(prediction: Any) -> Optional[bytes]:
+        """Audio content of a Lyria prediction (raw or base64 encoded), if it carries any"""
+        if isinstance(prediction, bytes):
+            return prediction
+        if isinstance(prediction, dict):
+            for key in ("bytesBase64Encoded", "audioContent", "audio"):
+                value = prediction.get(key)
+                if isinstance(value, str) and value:
+                    try:
+                        return base64.b64decode(value)
+                    except ValueError:
+                        return None
+        return None
+    
     async def generate_music(self, request: MusicGenerationRequest, db_session=None, user_id=None) -> MusicGenerationResult:
         """
         Generate music using Google Lyria
@@ -164,6 +178,26 @@ class LyriaService:
         Returns:
             MusicGenerationResult with audio URLs and metadata
         """
+        cache_params = {
+            "prompt": request.prompt,
+            "style": request.style,
+            "mood": request.mood,
+            "duration": request.duration,
+            "tempo": request.tempo,
+            "key": request.key,
+            "instruments": request.instruments,
+            "vocal_style": request.vocal_style,
+            "lyrics": request.lyrics,
+            "reference_track": request.reference_track,
+            # Cached audio is only shared between callers using the same Google project and keys
+            "credentials": self._credential_fingerprint(db_session, user_id)
+        }
+        cached = await media_cache.get("music", cache_params)
+        if cached and cached.get("file_path"):
+            result = MusicGenerationResult(**cached["metadata"])
+            result.metadata = {**result.metadata, "audio_path": cached["file_path"], "cached": True}
+            return result
+        
         if not self.initialized:
             await self.initialize(db_session, user_id)
         
@@ -234,6 +268,18 @@ class LyriaService:
             )
             
             logger.info(f"Music generation completed in {duration:.2f}s using {audio_result.get('api_used', 'lyria')}")
+            
+            # Only results with actual audio are cached; the artifact lives in the cache directory
+            if audio_result.get("audio_data"):
+                audio_path = await media_cache.put(
+                    "music",
+                    cache_params,
+                    json.loads(json.dumps(asdict(result), default=str)),
+                    data=audio_result["audio_data"],
+                    extension=".mp3"
+                )
+                if audio_path:
+                    result.metadata["audio_path"] = audio_path
             return result
             
         except Exception as e:
@@ -278,7 +324,7 @@ class LyriaService:
             
             # Call Lyria API via Google Cloud AI Platform
             # Note: This is a simplified version - actual implementation would use the specific Lyria endpoint
-            endpoint = aiplatform.Endpoint(
+            endpoint = google_sdk.aiplatform().Endpoint(
                 endpoint_name=f"projects/{project_id}/locations/{self.location}/endpoints/lyria"
             )
             
@@ -291,6 +337,8 @@ class LyriaService:
             # Extract audio data from response
             audio_data = response.predictions[0]
             
+            audio_bytes = self._audio_bytes(audio_data)
+            
             # Generate waveform data from audio
             waveform_data = self._generate_waveform_from_audio(audio_data, request.duration)
             
@@ -304,6 +352,7 @@ class LyriaService:
                 "preview_url": f"https://storage.googleapis.com/veogen-music/preview_{audio_filename}",
                 "waveform_data": waveform_data,
                 "sheet_music_url": f"https://storage.googleapis.com/veogen-music/sheet_{audio_filename}.pdf",
+                "audio_data": audio_bytes,
                 "api_used": "lyria"
             }
             
@@ -315,7 +364,7 @@ class LyriaService:
         """Generate audio using Gemini API as fallback"""
         try:
             # Use Gemini for music generation (this would be more complex in reality)
-            model = genai.GenerativeModel("gemini-1.5-pro")
+            model = google_sdk.genai().GenerativeModel("gemini-1.5-pro")
             
             # Create music generation prompt
             music_prompt = f"""
@@ -437,7 +486,7 @@ class LyriaService:
     async def _generate_composition(self, prompt: str, request: MusicGenerationRequest, db_session=None, user_id=None) -> Dict[str, Any]:
         """Generate musical composition using AI"""
         try:
-            model = genai.GenerativeModel("gemini-1.5-pro")
+            model = google_sdk.genai().GenerativeModel("gemini-1.5-pro")
             
             composition_prompt = f"""
             Create a detailed musical composition for this prompt: {prompt}
@@ -479,7 +528,7 @@ class LyriaService:
             return None
         
         try:
-            model = genai.GenerativeModel("gemini-1.5-pro")
+            model = google_sdk.genai().GenerativeModel("gemini-1.5-pro")
             
             lyrics_prompt = f"""
             Write song lyrics for a {request.style} song with a {request.mood} mood.
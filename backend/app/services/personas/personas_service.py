@@ -6,8 +6,8 @@ import json
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
-import google.generativeai as genai
 from app.config import settings
+from app.services import google_sdk
 from app.middleware.metrics import track_chat_interaction
 
 logger = logging.getLogger(__name__)
@@ -62,7 +62,7 @@ class PersonasService:
     async def initialize(self):
         """Initialize personas service"""
         try:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
+            google_sdk.configure_genai(settings.GEMINI_API_KEY)
             
             # Generate all personas
             await self._generate_all_personas()
@@ -165,7 +165,7 @@ class PersonasService:
     
     async def _generate_persona_profile(self, persona_type: PersonaType, template: Dict[str, Any]) -> PersonaProfile:
         """Generate a complete persona profile with life story"""
-        model = genai.GenerativeModel("gemini-1.5-pro")
+        model = google_sdk.genai().GenerativeModel("gemini-1.5-pro")
         
         # Generate life story
         life_story_prompt = f"""
@@ -298,7 +298,7 @@ class PersonasService:
             )
             
             # Generate response
-            model = genai.GenerativeModel("gemini-1.5-pro")
+            model = google_sdk.genai().GenerativeModel("gemini-1.5-pro")
             response = await asyncio.to_thread(
                 model.generate_content,
                 conversation_context
@@ -0,0 +1,223 @@
+"""
+Profiler for VeoGen
+On-demand sampling profiler (collapsed stacks) and an always-on event loop / slow request monitor
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, Any, Optional, List
+
+from app.config import settings
+from app.middleware.metrics import EVENT_LOOP_LAG, SLOW_REQUESTS_TOTAL, in_flight_requests
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames of threads that are waiting rather than working (dropped unless include_idle)
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker")
+}
+
+class ProfilerBusy(Exception):
+    """A profile is already running in this worker"""
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    marker = "site-packages" + os.sep
+    if marker in path:
+        path = path.split(marker, 1)[1]
+    elif path.startswith(os.getcwd()):
+        path = os.path.relpath(path)
+    # Semicolons separate frames in the collapsed format
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+class SamplingProfiler:
+    """Samples the Python stacks of every thread in this worker at a fixed interval
+
+    The result is in the collapsed-stack format read by flamegraph.pl,
+    speedscope and inferno: one `thread;outer;...;leaf count` line per
+    distinct stack. Only the worker process that serves the start request
+    is profiled.
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.started_at: Optional[float] = None
+        self.seconds = 0.0
+        self.interval = settings.PROFILER_INTERVAL
+        self.include_idle = False
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: Optional[float] = None, include_idle: bool = False):
+        """Start sampling; stops by itself after `seconds`"""
+        if self.running:
+            raise ProfilerBusy("A profile is already running")
+        self._counts = Counter()
+        self.samples = 0
+        self.seconds = min(seconds, settings.PROFILER_MAX_SECONDS)
+        self.interval = interval or settings.PROFILER_INTERVAL
+        self.include_idle = include_idle
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="veogen-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Profiling started for {self.seconds}s at {self.interval * 1000:.0f}ms intervals")
+
+    def stop(self):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            logger.info(f"Profiling stopped after {self.samples} samples")
+
+    def _run(self):
+        deadline = time.monotonic() + self.seconds
+        own_id = threading.get_ident()
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            self._sample(own_id)
+            self._stop.wait(self.interval)
+
+    def _sample(self, own_id: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+            if not self.include_idle and leaf in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}").replace(";", ":"))
+            self._counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "interval": self.interval,
+            "include_idle": self.include_idle,
+            "samples": self.samples,
+            "stacks": len(self._counts)
+        }
+
+    def collapsed(self) -> str:
+        """Stacks collected so far by the current (or last) profile"""
+        counts = self._counts.copy()
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+def _await_stack(task: asyncio.Task) -> List[str]:
+    """Formatted frames of a task's await chain, outermost first"""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is not None:
+            frames.append(f'  File "{frame.f_code.co_filename}", line {frame.f_lineno}, in {frame.f_code.co_name}\n')
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return frames
+
+class LoopMonitor:
+    """Measures event loop lag and captures stacks of slow requests and loop stalls
+
+    A heartbeat coroutine wakes every LOOP_LAG_INTERVAL seconds and records
+    how late it woke in the event loop lag histogram. On each beat, requests
+    in flight (registered by the metrics middleware) for longer than
+    SLOW_REQUEST_THRESHOLD have their await chain logged once. A watchdog
+    thread logs the loop thread's stack when the heartbeat is overdue by
+    LOOP_BLOCK_THRESHOLD, i.e. while something is blocking the loop.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._sampled: set = set()
+
+    async def _heartbeat(self):
+        interval = settings.LOOP_LAG_INTERVAL
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._last_beat = now
+            EVENT_LOOP_LAG.observe(max(0.0, now - expected))
+            self._sample_slow_requests()
+
+    def _sample_slow_requests(self):
+        now = time.monotonic()
+        for task, (started, method, scope, middleware) in list(in_flight_requests.items()):
+            if task in self._sampled or now - started < settings.SLOW_REQUEST_THRESHOLD:
+                continue
+            self._sampled.add(task)
+            task.add_done_callback(self._sampled.discard)
+            endpoint = middleware.route_template(scope)
+            SLOW_REQUESTS_TOTAL.labels(method=method, endpoint=endpoint).inc()
+            logger.warning(
+                f"Slow request {method} {scope['path']} running for {now - started:.1f}s, awaiting:\n"
+                + "".join(_await_stack(task)),
+                extra={"slow_request": True, "endpoint": endpoint, "elapsed": round(now - started, 3)}
+            )
+
+    def _watch(self):
+        threshold = settings.LOOP_BLOCK_THRESHOLD
+        reported_beat = None
+        while not self._stop.wait(threshold / 2):
+            stalled = time.monotonic() - self._last_beat - settings.LOOP_LAG_INTERVAL
+            if stalled < threshold or reported_beat == self._last_beat:
+                continue
+            # One report per stall: the heartbeat hasn't run since
+            reported_beat = self._last_beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                logger.warning(
+                    f"Event loop blocked for {stalled:.2f}s in:\n" + "".join(traceback.format_stack(frame)),
+                    extra={"loop_blocked": True, "elapsed": round(stalled, 3)}
+                )
+
+    def start(self):
+        """Start the heartbeat and watchdog (called from the application lifespan)"""
+        if self._task is None or self._task.done():
+            self._loop_thread_id = threading.get_ident()
+            self._last_beat = time.monotonic()
+            self._task = asyncio.create_task(self._heartbeat())
+        if self._watchdog is None:
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="veogen-loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._watchdog:
+            self._watchdog.join()
+            self._watchdog = None
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instances
+profiler = SamplingProfiler()
+loop_monitor = LoopMonitor()
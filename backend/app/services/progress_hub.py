@@ -0,0 +1,82 @@
+"""
+Progress Hub for VeoGen
+In-process pub/sub that fans job progress out to WebSocket/SSE watchers
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Set, Optional, Iterable, List
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ProgressSubscription:
+    """One watcher's view of the hub, coalescing updates per job
+
+    Only the latest event per job is kept between deliveries, so a slow
+    client (or a burst of progress ticks) never builds an unbounded backlog.
+    """
+
+    def __init__(self, hub: "ProgressHub", topics: Set[str]):
+        self.hub = hub
+        self.topics = topics
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, event: Dict[str, Any]):
+        self.pending[event["job_id"]] = event
+        self._ready.set()
+
+    async def next_batch(self) -> List[Dict[str, Any]]:
+        """Wait for updates, then return the latest event per job (at most once per coalesce interval)"""
+        await self._ready.wait()
+        await asyncio.sleep(settings.PROGRESS_COALESCE_INTERVAL)
+        self._ready.clear()
+        batch, self.pending = list(self.pending.values()), {}
+        return batch
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+class ProgressHub:
+    """Topic-based fan-out of progress events (`user:<id>`, `movie:<project_id>`)"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[ProgressSubscription]] = {}
+
+    def subscribe(self, topics: Iterable[str]) -> ProgressSubscription:
+        subscription = ProgressSubscription(self, set(topics))
+        for topic in subscription.topics:
+            self.subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ProgressSubscription):
+        for topic in subscription.topics:
+            watchers = self.subscribers.get(topic)
+            if watchers:
+                watchers.discard(subscription)
+                if not watchers:
+                    del self.subscribers[topic]
+
+    def publish(self, topic: str, job_id: str, progress: Optional[int] = None, status: Optional[str] = None,
+                message: Optional[str] = None, **extra: Any):
+        """Publish a progress event; cheap no-op when nobody is watching the topic"""
+        watchers = self.subscribers.get(topic)
+        if not watchers:
+            return
+        event = {
+            "topic": topic,
+            "job_id": job_id,
+            "progress": progress,
+            "status": status,
+            "message": message,
+            "timestamp": time.time(),
+            **extra
+        }
+        for subscription in list(watchers):
+            subscription.offer(event)
+
+# Global instance
+progress_hub = ProgressHub()
@@ -0,0 +1,168 @@
+"""
+Scene Scheduler for VeoGen Movie Maker
+Renders movie scenes concurrently while respecting continuity dependencies
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Any, Callable, Awaitable, AsyncIterator
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# render(scene, continuity_frame) -> clip info dict (or None on failure)
+SceneRenderer = Callable[[Dict[str, Any], Optional[str]], Awaitable[Optional[Dict[str, Any]]]]
+# differs(continuity_frame, clip_info) -> True if the clip must be re-rendered
+ContinuityCheck = Callable[[str, Dict[str, Any]], Awaitable[bool]]
+
+RENDER_MODES = ("sequential", "parallel", "speculative")
+
+class SceneScheduler:
+    """DAG scheduler for scene rendering with per-project and global concurrency caps"""
+
+    def __init__(self, max_per_project: int = None, max_global: int = None):
+        self.max_per_project = max_per_project or settings.MOVIE_SCENE_CONCURRENCY
+        self.global_semaphore = asyncio.Semaphore(max_global or settings.MOVIE_GLOBAL_SCENE_CONCURRENCY)
+
+    @staticmethod
+    def build_dependencies(scenes: List[Dict[str, Any]]) -> Dict[Any, Optional[Any]]:
+        """Map each scene id to the scene whose final frame it continues from (or None)"""
+        dependencies = {}
+        previous_id = None
+        for scene in scenes:
+            required = scene.get("continuity_required", previous_id is not None)
+            dependencies[scene["id"]] = previous_id if required and previous_id is not None else None
+            previous_id = scene["id"]
+        return dependencies
+
+    async def run(
+        self,
+        scenes: List[Dict[str, Any]],
+        render: SceneRenderer,
+        mode: str = "parallel",
+        continuity_differs: Optional[ContinuityCheck] = None
+    ) -> Dict[Any, Optional[Dict[str, Any]]]:
+        """Render all scenes and return clip info keyed by scene id"""
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {mode}")
+
+        dependencies = self.build_dependencies(scenes)
+        project_semaphore = asyncio.Semaphore(1 if mode == "sequential" else self.max_per_project)
+
+        if mode == "speculative":
+            return await self._run_speculative(
+                scenes, dependencies, render, project_semaphore, continuity_differs
+            )
+        return await self._run_dag(scenes, dependencies, render, project_semaphore)
+
+    async def _render_limited(
+        self,
+        scene: Dict[str, Any],
+        continuity_frame: Optional[str],
+        render: SceneRenderer,
+        project_semaphore: asyncio.Semaphore
+    ) -> Optional[Dict[str, Any]]:
+        async with project_semaphore:
+            async with self.global_semaphore:
+                return await render(scene, continuity_frame)
+
+    async def _run_scene(self, scene, parent_id, results, finished, render, project_semaphore):
+        """Render one scene once the scene it continues from has finished"""
+        try:
+            continuity_frame = None
+            if parent_id is not None:
+                # Wait outside the semaphores so blocked scenes don't hold slots
+                await finished[parent_id].wait()
+                parent = results.get(parent_id)
+                if not parent:
+                    # Rendering without the reference would break continuity; leave it for a resume
+                    logger.warning(f"Scene {scene['id']} skipped, scene {parent_id} it continues from failed")
+                    results[scene["id"]] = None
+                    return
+                continuity_frame = parent.get("continuity_frame")
+            results[scene["id"]] = await self._render_limited(
+                scene, continuity_frame, render, project_semaphore
+            )
+        except Exception as e:
+            logger.error(f"Scene {scene['id']} failed to render: {e}")
+            results[scene["id"]] = None
+        finally:
+            finished[scene["id"]].set()
+
+    async def _run_dag(self, scenes, dependencies, render, project_semaphore):
+        """Start each scene as soon as the scene it continues from has finished"""
+        results: Dict[Any, Optional[Dict[str, Any]]] = {}
+        finished = {scene["id"]: asyncio.Event() for scene in scenes}
+
+        await asyncio.gather(*(
+            self._run_scene(scene, dependencies[scene["id"]], results, finished, render, project_semaphore)
+            for scene in scenes
+        ))
+        return results
+
+    async def run_incremental(
+        self,
+        scene_source: AsyncIterator[Dict[str, Any]],
+        render: SceneRenderer,
+        mode: str = "parallel"
+    ) -> Dict[Any, Optional[Dict[str, Any]]]:
+        """Render scenes as they arrive (e.g. from a streaming script), in scene order
+
+        Speculative mode renders like parallel mode here, since later scenes are not known yet.
+        """
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {mode}")
+
+        project_semaphore = asyncio.Semaphore(1 if mode == "sequential" else self.max_per_project)
+        results: Dict[Any, Optional[Dict[str, Any]]] = {}
+        finished: Dict[Any, asyncio.Event] = {}
+        tasks = []
+        previous_id = None
+
+        async for scene in scene_source:
+            required = scene.get("continuity_required", previous_id is not None)
+            parent_id = previous_id if required and previous_id is not None else None
+            finished[scene["id"]] = asyncio.Event()
+            tasks.append(asyncio.create_task(
+                self._run_scene(scene, parent_id, results, finished, render, project_semaphore)
+            ))
+            previous_id = scene["id"]
+
+        await asyncio.gather(*tasks)
+        return results
+
+    async def _run_speculative(self, scenes, dependencies, render, project_semaphore, continuity_differs):
+        """Render every scene without references, then re-render scenes whose reference differs"""
+        independent = {scene["id"]: None for scene in scenes}
+        results = await self._run_dag(scenes, independent, render, project_semaphore)
+
+        if continuity_differs is None:
+            return results
+
+        rerendered = 0
+        for scene in scenes:
+            parent_id = dependencies[scene["id"]]
+            clip = results.get(scene["id"])
+            parent = results.get(parent_id) if parent_id is not None else None
+            if not clip or not parent or not parent.get("continuity_frame"):
+                continue
+
+            try:
+                if not await continuity_differs(parent["continuity_frame"], clip):
+                    continue
+                # Re-rendering changes this scene's final frame, so later scenes are checked against it
+                new_clip = await self._render_limited(
+                    scene, parent["continuity_frame"], render, project_semaphore
+                )
+                if new_clip:
+                    results[scene["id"]] = new_clip
+                    rerendered += 1
+            except Exception as e:
+                logger.error(f"Continuity re-render of scene {scene['id']} failed: {e}")
+
+        logger.info(f"Speculative render finished, {rerendered}/{len(scenes)} scenes re-rendered for continuity")
+        return results
+
+# Global scheduler (shares the global concurrency cap across projects)
+scene_scheduler = SceneScheduler()
@@ -0,0 +1,287 @@
+"""
+Script Parser for VeoGen Movie Maker
+Incremental parsing of movie scripts, either as JSON (structured output) or the `Scene N:` text format
+"""
+
+import json
+import logging
+import re
+from typing import Dict, List, Optional, Any
+
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_FORMATS = ("json", "text")
+
+class ScriptScene(BaseModel):
+    """One scene of a structured (JSON) script"""
+    title: str = ""
+    duration: int = Field(8, ge=1, le=60, description="Scene length in seconds")
+    description: str = ""
+    visual_prompt: str = Field("", description="Prompt for AI video generation")
+    continuity: str = Field("", description='How the scene follows the previous one, or "None"')
+
+    @field_validator("duration", mode="before")
+    @classmethod
+    def _duration_number(cls, value):
+        # Models often answer "8 seconds" or "8s"
+        if isinstance(value, str):
+            match = re.search(r"\d+(?:\.\d+)?", value)
+            if match:
+                return round(float(match.group()))
+        return value
+
+    @model_validator(mode="after")
+    def _has_prompt(self):
+        # Without a visual prompt the description is the best prompt we have
+        if not self.visual_prompt.strip():
+            if not self.description.strip():
+                raise ValueError("scene has neither a visual_prompt nor a description")
+            self.visual_prompt = self.description
+        return self
+
+class StructuredScript(BaseModel):
+    """A complete structured (JSON) script"""
+    title: str = ""
+    synopsis: str = ""
+    style_notes: str = ""
+    scenes: List[ScriptScene] = Field(..., min_length=1)
+    production_notes: str = ""
+
+def requires_continuity(scene: Dict[str, Any]) -> bool:
+    """Whether a scene must start from the previous scene's final frame"""
+    if scene["id"] == 1:
+        return False
+    continuity = scene.get("continuity", "").strip().lower().rstrip(".")
+    return continuity not in ("", "none", "n/a", "independent")
+
+def _scene_dict(scene_id: int, fields: Dict[str, Any]) -> Dict[str, Any]:
+    scene = {
+        "id": scene_id,
+        "title": fields.get("title") or f"Scene {scene_id}",
+        "duration": fields.get("duration", 8),
+        "description": fields.get("description", ""),
+        "visual_prompt": fields.get("visual_prompt", ""),
+        "continuity": fields.get("continuity", ""),
+        "status": "pending"
+    }
+    scene["continuity_required"] = requires_continuity(scene)
+    return scene
+
+# "Scene 3: Title", "**Scene 3 - Title**", "## Scene 3. Title"
+SCENE_HEADER = re.compile(r"^scene\s+(\d+)\s*(?:[:.\-–—]\s*(.*))?$", re.IGNORECASE)
+SCENE_FIELD = re.compile(r"^(duration|description|visual prompt|continuity)\s*:\s*(.*)$", re.IGNORECASE)
+SECTION_HEADER = re.compile(r"^[A-Z][A-Z ]+:$")
+
+def _normalize_line(line: str) -> str:
+    """Strip markdown decoration (headings, bullets, bold) from a script line"""
+    line = line.strip().lstrip("#>").strip()
+    if line.startswith(("- ", "* ")):
+        line = line[2:]
+    return line.replace("**", "").replace("__", "").strip()
+
+class SceneStreamParser:
+    """Tolerant line-based parser that emits each scene as soon as its block is complete
+
+    A scene block is complete once the next `Scene N:` header (or the
+    PRODUCTION NOTES section, or the end of the text) has been seen.
+    Lines that don't start a field continue the previous one, so
+    multi-line descriptions and prompts are kept.
+    """
+
+    def __init__(self):
+        self.scenes: List[Dict[str, Any]] = []
+        self._buffer = ""
+        self._current: Optional[Dict[str, Any]] = None
+        self._field: Optional[str] = None
+        self._done = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of script text and return the scenes it completed"""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        completed = []
+        for line in lines:
+            completed.extend(self._parse_line(line))
+        return completed
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Flush the trailing partial line and the last open scene"""
+        completed = self._parse_line(self._buffer)
+        self._buffer = ""
+        completed.extend(self._close_scene())
+        return completed
+
+    def _close_scene(self) -> List[Dict[str, Any]]:
+        fields, self._current, self._field = self._current, None, None
+        if fields is None:
+            return []
+        if not fields.get("visual_prompt"):
+            # Without a visual prompt the description is the best prompt we have
+            fields["visual_prompt"] = fields.get("description", "")
+        if not fields["visual_prompt"]:
+            logger.warning(f"Dropping script scene without a prompt or description: {fields.get('title')!r}")
+            return []
+        scene = _scene_dict(len(self.scenes) + 1, fields)
+        self.scenes.append(scene)
+        return [scene]
+
+    def _parse_line(self, raw_line: str) -> List[Dict[str, Any]]:
+        if self._done:
+            return []
+        line = _normalize_line(raw_line)
+        upper = line.upper()
+
+        if upper.startswith("PRODUCTION NOTES"):
+            self._done = True
+            return self._close_scene()
+
+        header = SCENE_HEADER.match(line)
+        if header:
+            completed = self._close_scene()
+            self._current = {"title": (header.group(2) or "").strip()}
+            return completed
+
+        if self._current is None or not line:
+            return []
+
+        field = SCENE_FIELD.match(line)
+        if field:
+            name = field.group(1).lower().replace(" ", "_")
+            value = field.group(2).strip()
+            if name == "duration":
+                self._current["duration"] = self._parse_duration(value)
+                self._field = None
+            else:
+                self._current[name] = value
+                self._field = name
+            return []
+
+        if SECTION_HEADER.match(line):
+            # Another script section (e.g. STYLE NOTES:) ends the current field
+            self._field = None
+        elif self._field:
+            previous = self._current.get(self._field, "")
+            self._current[self._field] = f"{previous} {line}".strip()
+        return []
+
+    def _parse_duration(self, value: str) -> int:
+        match = re.search(r"\d+(?:\.\d+)?", value)
+        if not match:
+            logger.debug(f"Unparseable scene duration {value!r}, using 8 seconds")
+            return 8
+        return max(1, round(float(match.group())))
+
+class JsonSceneStreamParser:
+    """Parser for structured (JSON) scripts that emits each scene object once it is closed
+
+    Scenes are validated against ScriptScene as they complete. If the
+    response turns out not to be JSON at all, finish() falls back to the
+    tolerant text parser over the whole response.
+    """
+
+    SCENES_KEY = re.compile(r'"scenes"\s*:\s*\[')
+
+    def __init__(self):
+        self.scenes: List[Dict[str, Any]] = []
+        self.document: Optional[StructuredScript] = None
+        self.invalid_scenes = 0
+        self.text = ""
+        self._pos = 0
+        self._in_array = False
+        self._array_done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self.text += text
+        if not self._in_array and not self._array_done:
+            match = self.SCENES_KEY.search(self.text)
+            if not match:
+                return []
+            self._in_array = True
+            self._pos = match.end()
+        return self._scan() if self._in_array else []
+
+    def _scan(self) -> List[Dict[str, Any]]:
+        completed = []
+        text = self.text
+        while self._pos < len(text) and self._in_array:
+            char = text[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    scene = self._accept(text[self._object_start:self._pos + 1])
+                    if scene:
+                        completed.append(scene)
+            elif char == "]" and self._depth == 0:
+                self._in_array = False
+                self._array_done = True
+            self._pos += 1
+        return completed
+
+    def _accept(self, raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            fields = ScriptScene.model_validate(json.loads(raw)).model_dump()
+        except (ValueError, ValidationError) as e:
+            self.invalid_scenes += 1
+            logger.warning(f"Skipping invalid script scene: {e}")
+            return None
+        scene = _scene_dict(len(self.scenes) + 1, fields)
+        self.scenes.append(scene)
+        return scene
+
+    def finish(self) -> List[Dict[str, Any]]:
+        try:
+            self.document = StructuredScript.model_validate_json(strip_code_fence(self.text))
+        except ValidationError as e:
+            logger.info(f"Structured script did not validate as a whole: {e.error_count()} errors")
+
+        if self.scenes or self.document:
+            return []
+
+        # Not JSON after all: the model answered in the text format
+        logger.warning("Structured script response contained no JSON scenes, parsing it as text")
+        fallback = SceneStreamParser()
+        scenes = fallback.feed(self.text) + fallback.finish()
+        self.scenes.extend(scenes)
+        return scenes
+
+def strip_code_fence(text: str) -> str:
+    """Remove a ```json ... ``` fence around a model response"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+def scene_parser(script_format: str):
+    """A fresh incremental parser for the given script format"""
+    if script_format not in SCRIPT_FORMATS:
+        raise ValueError(f"Unknown script format: {script_format}")
+    return JsonSceneStreamParser() if script_format == "json" else SceneStreamParser()
+
+def looks_like_json(script: str) -> bool:
+    return strip_code_fence(script).startswith("{")
+
+def parse_scenes(script: str) -> List[Dict[str, Any]]:
+    """Parse every scene of a complete script, whichever format it is in"""
+    parser = scene_parser("json" if looks_like_json(script) else "text")
+    return parser.feed(script) + parser.finish()
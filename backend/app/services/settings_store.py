@@ -0,0 +1,152 @@
+"""
+Settings Store for VeoGen
+Batched user-settings reads and writes with an in-process, version-invalidated snapshot cache
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import (
+    SessionLocal, AsyncSessionLocal, UserSettings,
+    decode_setting, encode_setting, get_all_user_settings_async
+)
+
+logger = logging.getLogger(__name__)
+
+class UserSettingsStore:
+    """Decoded per-user settings snapshots
+
+    A user's rows are loaded with one query and cached as a dict. Every write
+    bumps the user's version, so a snapshot loaded before (or during) a write
+    is never served afterwards. SETTINGS_CACHE_TTL bounds how long another
+    worker process's writes can go unseen.
+    """
+
+    def __init__(self):
+        self._snapshots: "OrderedDict[str, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot:
+                version, loaded_at, values = snapshot
+                if version == self._versions.get(user_id, 0) and time.monotonic() - loaded_at < settings.SETTINGS_CACHE_TTL:
+                    self._snapshots.move_to_end(user_id)
+                    self.hits += 1
+                    return values
+                del self._snapshots[user_id]
+            self.misses += 1
+            return None
+
+    def _version(self, user_id: str) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def _store(self, user_id: str, version: int, values: Dict[str, Any]):
+        with self._lock:
+            if version != self._versions.get(user_id, 0):
+                return  # a write landed while loading; the next read reloads
+            self._snapshots[user_id] = (version, time.monotonic(), values)
+            self._snapshots.move_to_end(user_id)
+            while len(self._snapshots) > settings.SETTINGS_CACHE_MAX_USERS:
+                self._snapshots.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """Drop the user's snapshot and bump their version"""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._snapshots.pop(user_id, None)
+
+    async def get_all(self, db: Optional[AsyncSession], user_id: str) -> Dict[str, Any]:
+        """All of a user's settings, from the snapshot or a single query"""
+        values = self._cached(user_id)
+        if values is None:
+            version = self._version(user_id)
+            if db is None:
+                async with AsyncSessionLocal() as session:
+                    values = await get_all_user_settings_async(session, user_id)
+            else:
+                values = await get_all_user_settings_async(db, user_id)
+            self._store(user_id, version, values)
+        return dict(values)
+
+    async def get(self, db: Optional[AsyncSession], user_id: str, key: str, default=None):
+        values = await self.get_all(db, user_id)
+        value = values.get(key)
+        return default if value is None else value
+
+    def get_all_sync(self, db: Optional[Session], user_id: str) -> Dict[str, Any]:
+        """Synchronous variant for code running in worker threads"""
+        values = self._cached(user_id)
+        if values is None:
+            version = self._version(user_id)
+            session = db or SessionLocal()
+            try:
+                rows = session.query(UserSettings).filter(UserSettings.user_id == user_id).all()
+                values = {row.setting_key: decode_setting(row) for row in rows}
+            finally:
+                if db is None:
+                    session.close()
+            self._store(user_id, version, values)
+        return dict(values)
+
+    def get_sync(self, db: Optional[Session], user_id: str, key: str, default=None):
+        value = self.get_all_sync(db, user_id).get(key)
+        return default if value is None else value
+
+    async def set_many(self, db: AsyncSession, user_id: str, values: Dict[str, Tuple[Any, str]]):
+        """Write {key: (value, value_type)} in one transaction"""
+        if not values:
+            return
+        try:
+            result = await db.scalars(
+                select(UserSettings).where(
+                    UserSettings.user_id == user_id,
+                    UserSettings.setting_key.in_(list(values))
+                )
+            )
+            existing = {row.setting_key: row for row in result}
+            now = datetime.utcnow()
+            for key, (value, value_type) in values.items():
+                row = existing.get(key)
+                if row:
+                    row.setting_value = encode_setting(value, value_type)
+                    row.setting_type = value_type
+                    row.updated_at = now
+                else:
+                    db.add(UserSettings(
+                        user_id=user_id,
+                        setting_key=key,
+                        setting_value=encode_setting(value, value_type),
+                        setting_type=value_type
+                    ))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to save settings for user {user_id}: {e}")
+            raise
+        finally:
+            self.invalidate(user_id)
+
+    async def set(self, db: AsyncSession, user_id: str, key: str, value, value_type: str = "string"):
+        await self.set_many(db, user_id, {key: (value, value_type)})
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cached_users": len(self._snapshots), "hits": self.hits, "misses": self.misses}
+
+# Global instance
+settings_store = UserSettingsStore()
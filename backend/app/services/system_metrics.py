@@ -0,0 +1,173 @@
+"""
+System Metrics Collector for VeoGen
+Background sampling of CPU/memory/disk and incremental file storage accounting
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import psutil
+
+from app.config import settings
+from app.middleware.metrics import (
+    SYSTEM_CPU_USAGE, SYSTEM_MEMORY_USAGE, SYSTEM_DISK_USAGE, FILE_STORAGE_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+class SystemMetricsCollector:
+    """Keeps the system and storage gauges current off the request path
+
+    CPU, memory and disk usage are sampled every SYSTEM_METRICS_INTERVAL
+    seconds. Storage usage per directory is kept up to date by our own
+    writes and deletes (record_write / unlink), and reconciled against a
+    full os.scandir walk every STORAGE_RECONCILE_INTERVAL seconds to pick
+    up files written by subprocesses or other workers. A /metrics scrape
+    only reads the gauges.
+    """
+
+    def __init__(self):
+        self.storage_roots: Dict[str, str] = {
+            "uploads": os.path.abspath(settings.UPLOAD_DIR),
+            "outputs": os.path.abspath(settings.OUTPUT_DIR),
+            "temp": os.path.abspath(settings.TEMP_DIR),
+            "logs": os.path.abspath(settings.LOG_DIR)
+        }
+        self._storage_bytes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.last_reconcile: Optional[float] = None
+
+    def _storage_type(self, path: Union[str, Path]) -> Optional[str]:
+        path = os.path.abspath(path)
+        for storage_type, root in self.storage_roots.items():
+            if path.startswith(root + os.sep):
+                return storage_type
+        return None
+
+    def _adjust(self, storage_type: str, delta: int):
+        with self._lock:
+            total = max(0, self._storage_bytes.get(storage_type, 0) + delta)
+            self._storage_bytes[storage_type] = total
+            FILE_STORAGE_BYTES.labels(storage_type=storage_type).set(total)
+
+    @staticmethod
+    def file_size(path: Union[str, Path]) -> int:
+        """Size of a file about to be overwritten (0 if it doesn't exist)"""
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    def record_write(self, path: Union[str, Path], previous_size: int = 0):
+        """Account for a file we just wrote (previous_size if it replaced an existing file)"""
+        storage_type = self._storage_type(path)
+        if storage_type is None:
+            return
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            return
+        self._adjust(storage_type, size - previous_size)
+
+    def unlink(self, path: Union[str, Path]):
+        """Delete a file (if it exists) and account for the freed space"""
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            return
+        Path(path).unlink(missing_ok=True)
+        storage_type = self._storage_type(path)
+        if storage_type is not None:
+            self._adjust(storage_type, -size)
+
+    def storage_bytes(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._storage_bytes)
+
+    @staticmethod
+    def _directory_size(root: str) -> int:
+        total = 0
+        pending = [root]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                total += entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return total
+
+    def reconcile_storage(self):
+        """Recount every storage directory (blocking; run in a worker thread)
+
+        Writes recorded while a directory is being walked may be counted
+        twice or not at all; the next reconciliation corrects them.
+        """
+        for storage_type, root in self.storage_roots.items():
+            if not os.path.isdir(root):
+                continue
+            size = self._directory_size(root)
+            with self._lock:
+                self._storage_bytes[storage_type] = size
+                FILE_STORAGE_BYTES.labels(storage_type=storage_type).set(size)
+        self.last_reconcile = time.monotonic()
+
+    def sample_system(self):
+        """Sample CPU, memory and disk usage (blocking; run in a worker thread)"""
+        SYSTEM_CPU_USAGE.set(psutil.cpu_percent(interval=None))
+
+        memory = psutil.virtual_memory()
+        SYSTEM_MEMORY_USAGE.labels(type='used').set(memory.used)
+        SYSTEM_MEMORY_USAGE.labels(type='available').set(memory.available)
+        SYSTEM_MEMORY_USAGE.labels(type='total').set(memory.total)
+
+        for partition in psutil.disk_partitions():
+            try:
+                disk_usage = psutil.disk_usage(partition.mountpoint)
+            except (PermissionError, OSError):
+                continue
+            SYSTEM_DISK_USAGE.labels(mount_point=partition.mountpoint, type='used').set(disk_usage.used)
+            SYSTEM_DISK_USAGE.labels(mount_point=partition.mountpoint, type='free').set(disk_usage.free)
+            SYSTEM_DISK_USAGE.labels(mount_point=partition.mountpoint, type='total').set(disk_usage.total)
+
+    async def _collect_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sample_system)
+                if (
+                    self.last_reconcile is None
+                    or time.monotonic() - self.last_reconcile >= settings.STORAGE_RECONCILE_INTERVAL
+                ):
+                    await asyncio.to_thread(self.reconcile_storage)
+            except Exception as e:
+                logger.warning(f"Failed to update system metrics: {e}")
+            await asyncio.sleep(settings.SYSTEM_METRICS_INTERVAL)
+
+    def start(self):
+        """Start the background collector (called from the application lifespan)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._collect_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+system_metrics = SystemMetricsCollector()
@@ -0,0 +1,293 @@
+"""
+Tracing for VeoGen
+Lightweight OpenTelemetry-compatible spans with in-memory and OTLP-JSON file export
+"""
+
+import functools
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, List, Iterator
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+STATUS_CODES = {"unset": 0, "ok": 1, "error": 2}
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("veogen_current_span", default=None)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class Span:
+    """One timed operation; trace/span ids follow W3C Trace Context"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.events: List[Dict[str, Any]] = []
+        self.status = "unset"
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, error: BaseException):
+        self.status = "error"
+        self.status_message = str(error) or type(error).__name__
+        self.events.append({
+            "name": "exception",
+            "time_ns": time.time_ns(),
+            "attributes": {"exception.type": type(error).__name__, "exception.message": str(error)}
+        })
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.status == "unset":
+                self.status = "ok"
+
+    @property
+    def duration(self) -> float:
+        """Seconds (so far, for a span still running)"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_ns / 1e9,
+            "duration": round(self.duration, 6),
+            "status": self.status,
+            "status_message": self.status_message,
+            "attributes": dict(self.attributes),
+            "events": list(self.events)
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON encoding"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "events": [
+                {
+                    "name": event["name"],
+                    "timeUnixNano": str(event["time_ns"]),
+                    "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in event["attributes"].items()]
+                }
+                for event in self.events
+            ],
+            "status": {"code": STATUS_CODES[self.status], "message": self.status_message}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+class _NoopSpan:
+    """Stand-in yielded while tracing is disabled"""
+    trace_id = span_id = parent_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """Creates spans around service stages and keeps finished spans for inspection
+
+    The current span lives in a context variable, so it follows the code
+    into child tasks (asyncio.create_task) and worker threads
+    (asyncio.to_thread). Finished spans are kept in a bounded in-memory
+    buffer and, when TRACE_EXPORT_FILE is set, appended to it as OTLP/JSON
+    lines (readable by the OpenTelemetry Collector's otlpjsonfile receiver).
+    File export runs on a background thread fed by a bounded queue, so span
+    serialization and disk writes never stall the event loop; spans that
+    don't fit in the queue are dropped from the file (and counted).
+    """
+
+    def __init__(self):
+        self.enabled = settings.TRACING_ENABLED
+        self.finished: deque = deque(maxlen=settings.TRACE_BUFFER_SIZE)
+        self.export_path = settings.TRACE_EXPORT_FILE
+        self.dropped = 0
+        self._export_queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=settings.TRACE_EXPORT_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.trace_id if span else None
+
+    def set_attributes(self, **attributes):
+        """Set attributes on the current span (if any)"""
+        span = _current_span.get()
+        if span:
+            span.set_attributes(**attributes)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes) -> Iterator[Span]:
+        """Time a block as a child of the current span (or as a new trace)
+
+        Usable in both sync and async code; an exception escaping the block
+        marks the span as failed and is re-raised.
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        parent = _current_span.get()
+        span = Span(
+            name,
+            parent.trace_id if parent else secrets.token_hex(16),
+            parent.span_id if parent else None,
+            kind,
+            attributes
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self._export(span)
+
+    def traced(self, name: str, kind: str = "internal", **attributes):
+        """Decorator running a coroutine function inside a span"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name, kind, **attributes):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def inject(self, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Add the W3C traceparent header for the current span to outbound request headers"""
+        headers = dict(headers or {})
+        span = _current_span.get()
+        if span:
+            headers["traceparent"] = f"00-{span.trace_id}-{span.span_id}-01"
+        return headers
+
+    def _export(self, span: Span):
+        with self._lock:
+            self.finished.append(span)
+            if not self.export_path:
+                return
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_spans, name="veogen-trace-export", daemon=True)
+                self._writer.start()
+        try:
+            self._export_queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Trace export queue full, {self.dropped} spans not written to {self.export_path}")
+
+    def _write_spans(self):
+        """Export thread: append queued spans to the export file until the None sentinel"""
+        export_file = None
+        while True:
+            span = self._export_queue.get()
+            if span is None:
+                break
+            if not self.export_path:
+                continue
+            try:
+                if export_file is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.export_path)), exist_ok=True)
+                    export_file = open(self.export_path, "a", encoding="utf-8")
+                export_file.write(json.dumps({
+                    "resourceSpans": [{
+                        "resource": {"attributes": [
+                            {"key": "service.name", "value": {"stringValue": "veogen-backend"}}
+                        ]},
+                        "scopeSpans": [{"scope": {"name": "veogen"}, "spans": [span.to_otlp()]}]
+                    }]
+                }) + "\n")
+                # Flush once the backlog is written rather than per span
+                if self._export_queue.empty():
+                    export_file.flush()
+            except OSError as e:
+                logger.warning(f"Could not export span to {self.export_path}, disabling file export: {e}")
+                self.export_path = None
+        if export_file:
+            export_file.close()
+
+    def get_trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Finished spans of a trace, in start order"""
+        with self._lock:
+            spans = [span for span in self.finished if span.trace_id == trace_id]
+        return [span.to_dict() for span in sorted(spans, key=lambda span: span.start_ns)]
+
+    def recent_traces(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Finished root spans, newest first"""
+        with self._lock:
+            roots = [span for span in self.finished if span.parent_id is None]
+        return [span.to_dict() for span in reversed(roots[-limit:])]
+
+    def close(self):
+        """Write out queued spans and stop the export thread"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer:
+            self._export_queue.put(None)
+            writer.join()
+
+class TraceContextFilter(logging.Filter):
+    """Stamp log records with the current trace and span id"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = _current_span.get()
+        if span:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return True
+
+# Global instance
+tracer = Tracer()
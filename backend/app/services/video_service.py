@@ -158,21 +158,21 @@ class VideoService:
                 "jobs": []
             }
             
-    async def download_video(self, job_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    async def get_video_file(self, job_id: str, user_id: int) -> Optional[Dict[str, Any]]:
         """
-        Download a completed video file
+        Locate a completed video file for download
         
         Args:
             job_id: Job ID
             user_id: User ID for authorization
             
         Returns:
-            Video file data or None if not found/authorized
+            Dictionary with url, filename and content_type, or None if not found/authorized
         """
         try:
-            return await self.mcp_service.download_media_file(job_id, user_id)
+            return await self.mcp_service.get_media_file(job_id, user_id)
         except Exception as e:
-            logger.error(f"Error downloading video: {e}")
+            logger.error(f"Error locating video file: {e}")
             return None
             
     async def delete_job(self, job_id: str, user_id: int) -> Dict[str, Any]:
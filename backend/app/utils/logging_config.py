@@ -1,21 +1,50 @@
 """
 Enhanced logging configuration for VeoGen with structured logging
 """
+import atexit
+import copy
 import logging
 import logging.config
+import logging.handlers
 import json
-import sys
+import queue
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import os
 
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON serialization when installed
+    orjson = None
+
+def dumps(entry: Dict[str, Any]) -> str:
+    """Serialize a log entry; values JSON can't represent are logged as strings"""
+    if orjson is not None:
+        return orjson.dumps(entry, default=str).decode()
+    return json.dumps(entry, default=str)
+
+def _timestamp(record: logging.LogRecord) -> str:
+    # The time the event was logged, not the time the logging thread got to it
+    return datetime.utcfromtimestamp(record.created).isoformat() + 'Z'
+
+# LogRecord attributes that are not "extra" fields
+RESERVED_ATTRS = frozenset({
+    'name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 'filename', 'module', 'lineno',
+    'funcName', 'created', 'msecs', 'relativeCreated', 'thread', 'threadName', 'processName',
+    'process', 'getMessage', 'exc_info', 'exc_text', 'stack_info', 'message', 'taskName'
+})
+
 class JSONFormatter(logging.Formatter):
     """
     Custom JSON formatter for structured logging
     """
     def format(self, record: logging.LogRecord) -> str:
         log_entry = {
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'timestamp': _timestamp(record),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -25,19 +54,18 @@ class JSONFormatter(logging.Formatter):
             'service': 'veogen-backend'
         }
         
-        # Add exception info if present
+        # Add exception info if present (already rendered to text when the record was queued)
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_entry['exception'] = record.exc_text
             
         # Add extra fields from record
         for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 
-                          'filename', 'module', 'lineno', 'funcName', 'created', 
-                          'msecs', 'relativeCreated', 'thread', 'threadName', 
-                          'processName', 'process', 'getMessage', 'exc_info', 'exc_text', 'stack_info']:
+            if key not in RESERVED_ATTRS:
                 log_entry[key] = value
                 
-        return json.dumps(log_entry)
+        return dumps(log_entry)
 
 class VideoGenerationFormatter(logging.Formatter):
     """
@@ -45,19 +73,19 @@ class VideoGenerationFormatter(logging.Formatter):
     """
     def format(self, record: logging.LogRecord) -> str:
         log_entry = {
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'timestamp': _timestamp(record),
             'level': record.levelname,
             'service': 'video-generation',
             'message': record.getMessage()
         }
         
         # Add video-specific fields
-        video_fields = ['job_id', 'style', 'status', 'duration', 'progress', 'error_type']
+        video_fields = ['job_id', 'style', 'status', 'duration', 'progress', 'error_type', 'trace_id', 'span_id']
         for field in video_fields:
             if hasattr(record, field):
                 log_entry[field] = getattr(record, field)
                 
-        return json.dumps(log_entry)
+        return dumps(log_entry)
 
 class MovieMakerFormatter(logging.Formatter):
     """
@@ -65,19 +93,19 @@ class MovieMakerFormatter(logging.Formatter):
     """
     def format(self, record: logging.LogRecord) -> str:
         log_entry = {
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'timestamp': _timestamp(record),
             'level': record.levelname,
             'service': 'movie-maker',
             'message': record.getMessage()
         }
         
         # Add movie-specific fields
-        movie_fields = ['project_id', 'scene_id', 'style', 'status', 'progress', 'scene_type']
+        movie_fields = ['project_id', 'scene_id', 'style', 'status', 'progress', 'scene_type', 'trace_id', 'span_id']
         for field in movie_fields:
             if hasattr(record, field):
                 log_entry[field] = getattr(record, field)
                 
-        return json.dumps(log_entry)
+        return dumps(log_entry)
 
 class FFmpegFormatter(logging.Formatter):
     """
@@ -85,130 +113,213 @@ class FFmpegFormatter(logging.Formatter):
     """
     def format(self, record: logging.LogRecord) -> str:
         log_entry = {
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'timestamp': _timestamp(record),
             'level': record.levelname,
             'service': 'ffmpeg',
             'message': record.getMessage()
         }
         
         # Add FFmpeg-specific fields
-        ffmpeg_fields = ['operation_type', 'input_file', 'output_file', 'duration', 'error_code']
+        ffmpeg_fields = ['operation_type', 'input_file', 'output_file', 'duration', 'error_code', 'trace_id', 'span_id']
         for field in ffmpeg_fields:
             if hasattr(record, field):
                 log_entry[field] = getattr(record, field)
                 
-        return json.dumps(log_entry)
+        return dumps(log_entry)
 
-# Logging configuration
-LOGGING_CONFIG = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'json': {
-            '()': JSONFormatter,
-        },
-        'video_generation': {
-            '()': VideoGenerationFormatter,
-        },
-        'movie_maker': {
-            '()': MovieMakerFormatter,
-        },
-        'ffmpeg': {
-            '()': FFmpegFormatter,
-        },
-        'simple': {
-            'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        }
-    },
-    'handlers': {
-        'console': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'json',
-            'stream': sys.stdout
-        },
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.handlers.RotatingFileHandler',
-            'filename': '/app/logs/app.log',
-            'maxBytes': 10485760,  # 10MB
-            'backupCount': 5,
-            'formatter': 'json'
-        },
-        'video_file': {
-            'level': 'DEBUG',
-            'class': 'logging.handlers.RotatingFileHandler',
-            'filename': '/app/logs/video_generation.log',
-            'maxBytes': 10485760,
-            'backupCount': 5,
-            'formatter': 'video_generation'
-        },
-        'movie_file': {
-            'level': 'DEBUG',
-            'class': 'logging.handlers.RotatingFileHandler',
-            'filename': '/app/logs/movie_maker.log',
-            'maxBytes': 10485760,
-            'backupCount': 5,
-            'formatter': 'movie_maker'
-        },
-        'ffmpeg_file': {
-            'level': 'DEBUG',
-            'class': 'logging.handlers.RotatingFileHandler',
-            'filename': '/app/logs/ffmpeg.log',
-            'maxBytes': 10485760,
-            'backupCount': 5,
-            'formatter': 'ffmpeg'
-        },
-        'error_file': {
-            'level': 'ERROR',
-            'class': 'logging.handlers.RotatingFileHandler',
-            'filename': '/app/logs/error.log',
-            'maxBytes': 10485760,
-            'backupCount': 10,
-            'formatter': 'json'
-        }
-    },
-    'loggers': {
-        '': {  # Root logger
-            'handlers': ['console', 'file', 'error_file'],
-            'level': 'INFO',
-            'propagate': False
-        },
-        'app.services.video': {
-            'handlers': ['video_file', 'console'],
-            'level': 'DEBUG',
-            'propagate': False
-        },
-        'app.services.movie_maker': {
-            'handlers': ['movie_file', 'console'],
-            'level': 'DEBUG',
-            'propagate': False
+def _file_handler(log_dir: str, filename: str, formatter: str, level: str = 'DEBUG', backup_count: int = 5) -> Dict[str, Any]:
+    return {
+        'level': level,
+        'class': 'logging.handlers.RotatingFileHandler',
+        'filename': os.path.join(log_dir, filename),
+        'maxBytes': 10485760,  # 10MB
+        'backupCount': backup_count,
+        'formatter': formatter,
+        'filters': ['trace_context']
+    }
+
+def build_logging_config(log_dir: str) -> Dict[str, Any]:
+    """Logging configuration writing its files to log_dir"""
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'filters': {
+            'trace_context': {
+                '()': 'app.services.tracing.TraceContextFilter',
+            }
         },
-        'app.services.ffmpeg': {
-            'handlers': ['ffmpeg_file', 'console'],
-            'level': 'DEBUG',
-            'propagate': False
+        'formatters': {
+            'json': {
+                '()': JSONFormatter,
+            },
+            'video_generation': {
+                '()': VideoGenerationFormatter,
+            },
+            'movie_maker': {
+                '()': MovieMakerFormatter,
+            },
+            'ffmpeg': {
+                '()': FFmpegFormatter,
+            },
+            'simple': {
+                'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            }
         },
-        'uvicorn': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
-            'propagate': False
+        'handlers': {
+            'console': {
+                'level': 'INFO',
+                'class': 'logging.StreamHandler',
+                'formatter': 'json',
+                'filters': ['trace_context'],
+                'stream': 'ext://sys.stdout'
+            },
+            'file': _file_handler(log_dir, 'app.log', 'json'),
+            'video_file': _file_handler(log_dir, 'video_generation.log', 'video_generation'),
+            'movie_file': _file_handler(log_dir, 'movie_maker.log', 'movie_maker'),
+            'ffmpeg_file': _file_handler(log_dir, 'ffmpeg.log', 'ffmpeg'),
+            'error_file': _file_handler(log_dir, 'error.log', 'json', level='ERROR', backup_count=10)
         },
-        'fastapi': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
-            'propagate': False
+        'loggers': {
+            '': {  # Root logger
+                'handlers': ['console', 'file', 'error_file'],
+                'level': 'INFO',
+                'propagate': False
+            },
+            'app.services.video': {
+                'handlers': ['video_file', 'console'],
+                'level': 'DEBUG',
+                'propagate': False
+            },
+            'app.services.movie_maker': {
+                'handlers': ['movie_file', 'console'],
+                'level': 'DEBUG',
+                'propagate': False
+            },
+            'app.services.ffmpeg': {
+                'handlers': ['ffmpeg_file', 'console'],
+                'level': 'DEBUG',
+                'propagate': False
+            },
+            'uvicorn': {
+                'handlers': ['console', 'file'],
+                'level': 'INFO',
+                'propagate': False
+            },
+            'fastapi': {
+                'handlers': ['console', 'file'],
+                'level': 'INFO',
+                'propagate': False
+            }
         }
     }
-}
+
+# Logging configuration
+LOGGING_CONFIG = build_logging_config(settings.LOG_DIR)
+
+class RoutedQueueHandler(logging.handlers.QueueHandler):
+    """Hands a logger's records to the logging thread, tagged with that logger's handler set
+    
+    Runs on the calling thread, so the message is rendered here (its
+    arguments may change before the logging thread gets to it) and the
+    trace context filter runs here too. When the queue is full the record
+    is dropped and counted rather than blocking the event loop.
+    """
+    
+    def __init__(self, log_queue: queue.Queue, route: str, listener: "LogListener"):
+        super().__init__(log_queue)
+        self.route = route
+        self.listener = listener
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait((self.route, record))
+        except queue.Full:
+            self.listener.dropped += 1
+
+class LogListener(logging.handlers.QueueListener):
+    """Single background thread that formats and writes every queued record"""
+    
+    def __init__(self, log_queue: queue.Queue, routes: Dict[str, List[logging.Handler]]):
+        super().__init__(log_queue)
+        self.routes = routes
+        self.dropped = 0
+    
+    def handle(self, item):
+        route, record = item
+        for handler in self.routes[route]:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            warning = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                f"Dropped {dropped} log records: logging queue full", None, None
+            )
+            for handler in self.routes[""]:
+                if warning.levelno >= handler.level:
+                    handler.handle(warning)
+    
+    def enqueue_sentinel(self):
+        # Blocking put: the queue may be full at shutdown
+        self.queue.put(self._sentinel)
+    
+    def stop(self):
+        if self._thread:
+            super().stop()
+
+_listener: Optional[LogListener] = None
+
+def _start_queue_pipeline(config: Dict[str, Any]):
+    """Move each configured logger's handlers behind a queue drained by one logging thread"""
+    global _listener
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    routes: Dict[str, List[logging.Handler]] = {}
+    listener = LogListener(log_queue, routes)
+    
+    from app.services.tracing import TraceContextFilter
+    for name in config['loggers']:
+        logger = logging.getLogger(name or None)
+        routes[name] = list(logger.handlers)
+        queue_handler = RoutedQueueHandler(log_queue, name, listener)
+        queue_handler.addFilter(TraceContextFilter())
+        logger.handlers = [queue_handler]
+    
+    listener.start()
+    _listener = listener
+
+def shutdown_logging():
+    """Write out queued records, stop the logging thread and log directly from then on"""
+    global _listener
+    if _listener:
+        listener, _listener = _listener, None
+        listener.stop()
+        for name, handlers in listener.routes.items():
+            logging.getLogger(name or None).handlers = handlers
 
 def setup_logging():
     """Setup logging configuration"""
+    shutdown_logging()
+    
     # Ensure log directory exists
-    os.makedirs('/app/logs', exist_ok=True)
+    os.makedirs(settings.LOG_DIR, exist_ok=True)
     
     # Apply logging configuration
-    logging.config.dictConfig(LOGGING_CONFIG)
+    config = build_logging_config(settings.LOG_DIR)
+    logging.config.dictConfig(config)
+    
+    # File and console writes happen on the logging thread, never on the event loop
+    if settings.LOG_QUEUE_ENABLED:
+        _start_queue_pipeline(config)
+        atexit.register(shutdown_logging)
     
     # Get root logger
     logger = logging.getLogger(__name__)
@@ -217,6 +328,40 @@ def setup_logging():
         'component': 'logging'
     })
 
+class ProgressLogLimiter:
+    """Lets through at most one progress log per job every LOG_PROGRESS_INTERVAL seconds
+    
+    Status changes and completion (100%) are always logged.
+    """
+    
+    MAX_TRACKED_JOBS = 4096
+    
+    def __init__(self):
+        self._last: "OrderedDict[str, tuple]" = OrderedDict()
+    
+    def allow(self, job_id: str, progress: Optional[float], status: Optional[str] = None) -> bool:
+        now = time.monotonic()
+        last = self._last.get(job_id)
+        finished = progress is not None and progress >= 100
+        if last and not finished and last[1] == status and now - last[0] < settings.LOG_PROGRESS_INTERVAL:
+            return False
+        if finished:
+            self._last.pop(job_id, None)
+        else:
+            self._last[job_id] = (now, status)
+            self._last.move_to_end(job_id)
+            if len(self._last) > self.MAX_TRACKED_JOBS:
+                self._last.popitem(last=False)
+        return True
+
+progress_log_limiter = ProgressLogLimiter()
+
+def log_progress(logger: logging.Logger, job_id: str, progress: Optional[float], message: str,
+                 status: Optional[str] = None, **extra):
+    """Log a job's progress, rate limited per job"""
+    if progress_log_limiter.allow(job_id, progress, status):
+        logger.info(message, extra={'job_id': job_id, 'progress': progress, 'status': status, **extra}, stacklevel=2)
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger with the specified name"""
     return logging.getLogger(name)
@@ -232,12 +377,8 @@ def log_video_generation_start(logger: logging.Logger, job_id: str, style: str,
     })
 
 def log_video_generation_progress(logger: logging.Logger, job_id: str, progress: float):
-    """Log video generation progress"""
-    logger.info("Video generation progress", extra={
-        'job_id': job_id,
-        'progress': progress,
-        'status': 'in_progress'
-    })
+    """Log video generation progress (rate limited per job)"""
+    log_progress(logger, job_id, progress, "Video generation progress", status='in_progress')
 
 def log_video_generation_complete(logger: logging.Logger, job_id: str, style: str, duration: float, output_file: str):
     """Log video generation completion"""
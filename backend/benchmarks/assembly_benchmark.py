@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark movie assembly (FFmpegService.concatenate_videos) for 5/20/50-clip movies
+
+Generates synthetic 8-second clips with FFmpeg's lavfi sources and times:
+  - stream-copy concat (no transitions, matching clips)
+  - single-pass xfade assembly (transitions)
+
+Usage: python benchmarks/assembly_benchmark.py [--clips 5 20 50] [--duration 8]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ffmpeg import ffmpeg_service
+
+async def make_clip(path: Path, index: int, duration: float):
+    """Create a small synthetic clip with video and audio"""
+    cmd = [
+        ffmpeg_service.ffmpeg_path,
+        "-f", "lavfi", "-i", f"testsrc2=size=640x360:rate=24:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency={220 + index * 10}:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", "-y", str(path)
+    ]
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    await process.wait()
+
+async def time_assembly(clips, output: Path, with_transitions: bool) -> float:
+    start = time.perf_counter()
+    await ffmpeg_service.concatenate_videos(
+        [str(c) for c in clips], str(output), with_transitions=with_transitions
+    )
+    return time.perf_counter() - start
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clips", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--duration", type=float, default=8.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp = Path(temp_dir)
+        clips = [temp / f"clip_{i:03d}.mp4" for i in range(max(args.clips))]
+        print(f"Generating {len(clips)} synthetic {args.duration}s clips...")
+        await asyncio.gather(*(make_clip(c, i, args.duration) for i, c in enumerate(clips)))
+
+        print(f"{'clips':>6} {'movie length':>13} {'stream copy':>12} {'xfade':>10}")
+        for count in args.clips:
+            subset = clips[:count]
+            copy_time = await time_assembly(subset, temp / f"copy_{count}.mp4", False)
+            xfade_time = await time_assembly(subset, temp / f"xfade_{count}.mp4", True)
+            print(f"{count:>6} {count * args.duration:>12.0f}s {copy_time:>11.2f}s {xfade_time:>9.2f}s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
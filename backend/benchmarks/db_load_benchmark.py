@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Load test the database-bound endpoints (/auth/login and /settings) of a running API
+
+Registers (or reuses) a load-test user, then fires --requests calls at each endpoint
+from --concurrency concurrent clients and reports throughput and p50/p95/p99 latency.
+Run it against the server before and after a change and compare the reports; --output
+appends each run as a JSON line so runs can be diffed later.
+
+Usage: python benchmarks/db_load_benchmark.py [--url http://localhost:8000] [--concurrency 50]
+                                              [--requests 1000] [--label after] [--output results.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+API_PREFIX = "/api/v1"
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def ensure_user(client: httpx.AsyncClient, email: str, password: str):
+    """Register the load-test user; an existing account is reused"""
+    response = await client.post(f"{API_PREFIX}/auth/register", json={"email": email, "password": password})
+    if response.status_code not in (200, 400):
+        raise RuntimeError(f"Registering {email} failed: {response.status_code} {response.text}")
+
+async def run_load(client: httpx.AsyncClient, method: str, path: str, body, concurrency: int, total: int):
+    """Issue `total` requests from `concurrency` workers; returns (latencies, errors, wall seconds)"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+def report(name: str, latencies, errors: int, elapsed: float):
+    summary = {
+        "endpoint": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000
+    }
+    print(
+        f"{name:<22} {summary['requests']:>6} req {summary['errors']:>5} err {summary['rps']:>8.1f} req/s  "
+        f"p50 {summary['p50_ms']:>7.1f}ms  p95 {summary['p95_ms']:>7.1f}ms  p99 {summary['p99_ms']:>7.1f}ms  "
+        f"max {summary['max_ms']:>7.1f}ms"
+    )
+    return summary
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60.0) as client:
+        await ensure_user(client, args.email, args.password)
+        credentials = {"email": args.email, "password": args.password}
+        scenarios = [
+            ("POST /auth/login", "POST", f"{API_PREFIX}/auth/login", credentials),
+            ("GET /settings", "GET", f"{API_PREFIX}/settings/", None),
+            ("POST /settings", "POST", f"{API_PREFIX}/settings/", {"theme": "dark", "default_duration": 5})
+        ]
+
+        results = []
+        print(f"{args.label}: {args.requests} requests per endpoint, concurrency {args.concurrency}, {args.url}")
+        for name, method, path, body in scenarios:
+            # Warm connection pools on both sides before measuring
+            await run_load(client, method, path, body, args.concurrency, args.concurrency)
+            latencies, errors, elapsed = await run_load(client, method, path, body, args.concurrency, args.requests)
+            results.append(report(name, latencies, errors, elapsed))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--email", default="loadtest@veogen.local")
+    parser.add_argument("--password", default="LoadTest123")
+    parser.add_argument("--label", default="run", help="name for this run, e.g. before / after")
+    parser.add_argument("--output", help="append results as a JSON line to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps({"label": args.label, "concurrency": args.concurrency, "results": results}) + "\n")
+
+if __name__ == "__main__":
+    main()
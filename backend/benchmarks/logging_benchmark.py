@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark log-heavy video job throughput with synchronous and queued logging
+
+Runs --jobs concurrent simulated video jobs, each reporting --updates progress
+callbacks that log like the video router does, and reports job throughput and
+the worst event-loop stall (seen by a 10ms ticker) for:
+  - sync:        handlers write on the calling thread (LOG_QUEUE_ENABLED=False)
+  - queue:       handlers run on the logging thread, every update logged
+  - queue+limit: handlers run on the logging thread, progress logs rate limited
+                 (the current behavior)
+
+--disk-latency-ms adds a delay to every log file write to simulate a slow or
+contended disk. Log files go to a temporary directory; console output is
+discarded.
+
+Usage: python benchmarks/logging_benchmark.py [--jobs 20] [--updates 100] [--disk-latency-ms 1]
+"""
+
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import os
+import sys
+import tempfile
+import time
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.utils import logging_config
+from app.utils.logging_config import setup_logging, shutdown_logging, log_progress
+
+logger = logging.getLogger("app.routers.video")
+
+async def ticker(stop: asyncio.Event, interval: float = 0.01):
+    """Worst lateness of a periodic timer, i.e. the longest event loop stall"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+async def video_job(job_id: str, updates: int, rate_limited: bool):
+    """A job whose generation reports progress `updates` times"""
+    for i in range(1, updates + 1):
+        progress = i * 100 // updates
+        message = f"Generating video ({i}/{updates})"
+        if rate_limited:
+            log_progress(logger, job_id, progress, f"Job {job_id} progress: {progress}% - {message}", "processing")
+        else:
+            logger.info(f"Job {job_id} progress: {progress}% - {message}")
+        await asyncio.sleep(0)
+    logger.info(f"Video generation completed for job {job_id}")
+
+async def run_jobs(jobs: int, updates: int, rate_limited: bool):
+    """Returns (seconds, worst stall)"""
+    stop = asyncio.Event()
+    lag = asyncio.create_task(ticker(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(video_job(f"job-{n}", updates, rate_limited) for n in range(jobs)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await lag
+
+def run_variant(name: str, queued: bool, rate_limited: bool, args, out):
+    settings.LOG_QUEUE_ENABLED = queued
+    logging_config.progress_log_limiter = logging_config.ProgressLogLimiter()
+    with open(os.devnull, "w") as devnull:
+        real_stdout, sys.stdout = sys.stdout, devnull
+        try:
+            setup_logging()
+            elapsed, stall = asyncio.run(run_jobs(args.jobs, args.updates, rate_limited))
+            listener = logging_config._listener
+            dropped = listener.dropped if listener else 0
+            drain_start = time.perf_counter()
+            shutdown_logging()
+            drain = time.perf_counter() - drain_start
+        finally:
+            sys.stdout = real_stdout
+    print(
+        f"{name:<12} {elapsed:>8.2f}s {args.jobs / elapsed:>9.1f} {stall * 1000:>10.1f}ms"
+        f" {drain:>8.2f}s {dropped:>8}",
+        file=out
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=100, help="progress callbacks per job")
+    parser.add_argument("--disk-latency-ms", type=float, default=1.0, help="delay added to each log file write")
+    args = parser.parse_args()
+
+    settings.LOG_DIR = tempfile.mkdtemp(prefix="veogen_logs_")
+    latency = args.disk_latency_ms / 1000
+    file_emit = logging.handlers.RotatingFileHandler.emit
+
+    def slow_emit(self, record):
+        time.sleep(latency)
+        file_emit(self, record)
+
+    if latency:
+        logging.handlers.RotatingFileHandler.emit = slow_emit
+
+    print(f"{args.jobs} jobs x {args.updates} progress updates, {args.disk_latency_ms}ms per log file write")
+    print(f"{'variant':<12} {'time':>9} {'jobs/s':>9} {'worst stall':>12} {'drain':>9} {'dropped':>8}")
+    run_variant("sync", False, False, args, sys.stdout)
+    run_variant("queue", True, False, args, sys.stdout)
+    run_variant("queue+limit", True, True, args, sys.stdout)
+    print(f"\nLogs written to {settings.LOG_DIR}")
+
+if __name__ == "__main__":
+    main()
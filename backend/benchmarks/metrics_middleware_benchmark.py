@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-request overhead of the Prometheus metrics middleware
+
+Builds an app with --routers routers of --routes-per-router parameterized
+routes (about the size of the real API), then drives it directly over ASGI
+(no server, no HTTP client) and reports mean microseconds per request:
+  - bare:   the app without the middleware
+  - linear: the middleware resolving the endpoint label by matching every
+            route again (the old get_route_name)
+  - scope:  the middleware reading the route the router matched
+
+Requests cycle over the last router's routes (the linear scan's worst case)
+plus unmatched paths. Also checks that unique unmatched paths all share one
+endpoint label.
+
+Exits with status 1 if the middleware overhead exceeds --budget-us or
+unmatched paths create new label sets.
+
+Usage: python benchmarks/metrics_middleware_benchmark.py [--requests 20000] [--budget-us 60]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import Match
+
+from app.middleware.metrics import PrometheusMetricsMiddleware, REGISTRY, UNMATCHED_ROUTE
+
+class LinearScanMetricsMiddleware(PrometheusMetricsMiddleware):
+    """The middleware with the old label lookup: match every route again"""
+
+    def route_template(self, scope) -> str:
+        for route in scope["app"].routes:
+            match, _ = route.matches({"type": "http", "path": scope["path"], "method": scope["method"]})
+            if match == Match.FULL:
+                return route.path
+        return scope["path"]
+
+def build_app(routers: int, routes_per_router: int) -> FastAPI:
+    app = FastAPI()
+    for r in range(routers):
+        router = APIRouter()
+        for n in range(routes_per_router):
+            async def endpoint(item_id: str):
+                return {"id": item_id}
+            router.add_api_route(f"/resource{n}/{{item_id}}", endpoint, methods=["GET"])
+        app.include_router(router, prefix=f"/api/v1/router{r}")
+    return app
+
+def request_paths(routers: int, routes_per_router: int):
+    last = routers - 1
+    paths = [f"/api/v1/router{last}/resource{n}/abc" for n in range(routes_per_router)]
+    return paths + ["/api/v1/nope/123"]
+
+def scope_for(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"content-length", b"0")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80)
+    }
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+async def drive(asgi_app, paths, requests: int) -> float:
+    """Mean microseconds per request"""
+    start = time.perf_counter()
+    for i in range(requests):
+        await asgi_app(scope_for(paths[i % len(paths)]), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+def endpoint_labels() -> set:
+    return {
+        sample.labels["endpoint"]
+        for metric in REGISTRY.collect() if metric.name == "veogen_http_requests"
+        for sample in metric.samples
+    }
+
+async def main_async(args):
+    app = build_app(args.routers, args.routes_per_router)
+    paths = request_paths(args.routers, args.routes_per_router)
+    variants = {
+        "bare": app,
+        "linear": LinearScanMetricsMiddleware(app),
+        "scope": PrometheusMetricsMiddleware(app)
+    }
+    print(f"{len(app.routes)} routes, {args.requests} requests per variant")
+
+    # Warm up label children and the router before timing
+    for asgi_app in variants.values():
+        await drive(asgi_app, paths, len(paths) * 4)
+
+    timings = {}
+    for name, asgi_app in variants.items():
+        timings[name] = min([await drive(asgi_app, paths, args.requests) for _ in range(args.repeat)])
+        overhead = timings[name] - timings["bare"]
+        print(f"{name:<8} {timings[name]:>8.1f}us/request  overhead {overhead:>7.1f}us")
+
+    problems = []
+    overhead = timings["scope"] - timings["bare"]
+    if overhead > args.budget_us:
+        problems.append(f"middleware overhead {overhead:.1f}us exceeds the {args.budget_us}us budget")
+
+    before = endpoint_labels()
+    scoped = variants["scope"]
+    for _ in range(1000):
+        await scoped(scope_for(f"/probe/{uuid.uuid4().hex}"), receive, send)
+    added = endpoint_labels() - before
+    if added - {UNMATCHED_ROUTE}:
+        problems.append(f"unmatched paths created {len(added)} new endpoint labels")
+    print(f"1000 unique unmatched paths -> endpoint labels added: {sorted(added) or 'none'}")
+
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+    print(f"\nMiddleware overhead within the {args.budget_us}us budget")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per variant (best is reported)")
+    parser.add_argument("--routers", type=int, default=10)
+    parser.add_argument("--routes-per-router", type=int, default=8)
+    parser.add_argument("--budget-us", type=float, default=60.0, help="allowed middleware overhead per request")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
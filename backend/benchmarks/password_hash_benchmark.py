@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent password verification (login bursts) per core
+
+Verifies --logins bcrypt hashes from --concurrency concurrent tasks and reports
+throughput, throughput per worker thread, and the worst event-loop stall seen
+by a 10ms ticker while the burst runs:
+  - inline: bcrypt called directly in the coroutine (the old behavior)
+  - pool:   PasswordHasher with 1, 2, 4 ... up to --max-workers threads
+
+Usage: python benchmarks/password_hash_benchmark.py [--logins 64] [--concurrency 32] [--rounds 12]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.password_hasher import PasswordHasher, hash_password, verify_password
+
+PASSWORD = "CorrectHorse1"
+
+async def ticker(stop: asyncio.Event, interval: float = 0.01):
+    """Worst lateness of a periodic timer, i.e. the longest event loop stall"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+async def burst(verify, hashed: str, logins: int, concurrency: int):
+    """Run `logins` verifications from `concurrency` tasks; returns (seconds, worst stall)"""
+    remaining = iter(range(logins))
+
+    async def worker():
+        for _ in remaining:
+            if not await verify(PASSWORD, hashed):
+                raise RuntimeError("password verification failed")
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(ticker(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await lag
+
+async def main_async(args):
+    settings.BCRYPT_ROUNDS = args.rounds
+    hashed = hash_password(PASSWORD, args.rounds)
+
+    async def inline_verify(password, hashed_password):
+        return verify_password(password, hashed_password)
+
+    print(f"{args.logins} logins, concurrency {args.concurrency}, bcrypt rounds {args.rounds}, {os.cpu_count()} CPUs")
+    print(f"{'mode':<12} {'workers':>7} {'logins/s':>10} {'per worker':>11} {'max stall':>11}")
+
+    elapsed, stall = await burst(inline_verify, hashed, args.logins, args.concurrency)
+    print(f"{'inline':<12} {1:>7} {args.logins / elapsed:>10.1f} {args.logins / elapsed:>11.1f} {stall * 1000:>9.1f}ms")
+
+    workers = 1
+    while workers <= args.max_workers:
+        settings.PASSWORD_HASH_WORKERS = workers
+        settings.PASSWORD_HASH_MAX_PENDING = max(settings.PASSWORD_HASH_MAX_PENDING, args.concurrency)
+        hasher = PasswordHasher()
+        try:
+            elapsed, stall = await burst(hasher.verify, hashed, args.logins, args.concurrency)
+        finally:
+            hasher.shutdown()
+        rate = args.logins / elapsed
+        print(f"{'pool':<12} {workers:>7} {rate:>10.1f} {rate / workers:>11.1f} {stall * 1000:>9.1f}ms")
+        workers *= 2
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
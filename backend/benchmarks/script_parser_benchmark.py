@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Check and benchmark the movie script parsers against the script response corpus
+
+Every response in benchmarks/script_corpus is parsed with the parser for its
+requested format (manifest.json), both whole and streamed in --chunk sized
+pieces, and checked against the expected scene count and continuity flags.
+Then each parse is timed over --iterations runs.
+
+Exits with status 1 if any response parses differently from the manifest.
+
+Usage: python benchmarks/script_parser_benchmark.py [--iterations 200] [--chunk 16]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.script_parser import scene_parser
+
+CORPUS_DIR = Path(__file__).parent / "script_corpus"
+
+def parse(script: str, script_format: str, chunk: int = 0):
+    """Parse a response whole (chunk=0) or streamed in chunk-sized pieces"""
+    parser = scene_parser(script_format)
+    pieces = [script[i:i + chunk] for i in range(0, len(script), chunk)] if chunk else [script]
+    scenes = []
+    for piece in pieces:
+        scenes.extend(parser.feed(piece))
+    return scenes + parser.finish()
+
+def check(name: str, script: str, expected: dict, chunk: int) -> list:
+    """Problems with one corpus response (empty if it parses as expected)"""
+    problems = []
+    whole = parse(script, expected["format"])
+    streamed = parse(script, expected["format"], chunk)
+    if len(whole) != expected["scenes"]:
+        problems.append(f"{name}: {len(whole)} scenes, expected {expected['scenes']}")
+    continuity = [scene["continuity_required"] for scene in whole]
+    if continuity != expected["continuity"]:
+        problems.append(f"{name}: continuity {continuity}, expected {expected['continuity']}")
+    if streamed != whole:
+        problems.append(f"{name}: streamed parse differs from whole parse")
+    if any(not scene["visual_prompt"] for scene in whole):
+        problems.append(f"{name}: scene without a visual prompt")
+    return problems
+
+def time_parse(script: str, script_format: str, chunk: int, iterations: int) -> float:
+    """Mean microseconds per parse"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        parse(script, script_format, chunk)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--chunk", type=int, default=16, help="characters per streamed chunk")
+    args = parser.parse_args()
+
+    # Invalid scenes in the corpus are expected; keep the output to the report
+    logging.disable(logging.WARNING)
+    manifest = json.loads((CORPUS_DIR / "manifest.json").read_text())
+
+    problems = []
+    print(f"{'response':<28} {'format':>6} {'scenes':>7} {'whole':>10} {'streamed':>10}")
+    for name, expected in manifest.items():
+        script = (CORPUS_DIR / name).read_text()
+        problems.extend(check(name, script, expected, args.chunk))
+        whole_us = time_parse(script, expected["format"], 0, args.iterations)
+        streamed_us = time_parse(script, expected["format"], args.chunk, args.iterations)
+        scenes = len(parse(script, expected["format"]))
+        print(f"{name:<28} {expected['format']:>6} {scenes:>7} {whole_us:>8.0f}us {streamed_us:>8.0f}us")
+
+    if problems:
+        print(f"\n{len(problems)} problems:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"\nAll {len(manifest)} responses parsed as expected")
+
+if __name__ == "__main__":
+    main()
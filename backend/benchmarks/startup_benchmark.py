@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-start cost of importing the application (app.main)
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters and reports:
+  - wall-clock import time (median of --runs)
+  - the most expensive modules by cumulative import time
+
+Use --budget to fail (exit 1) when the median import time exceeds a number of
+seconds, so startup regressions can be caught in CI.
+
+Usage: python benchmarks/startup_benchmark.py [--runs 5] [--top 25] [--budget 2.0]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_once(module: str):
+    """Import a module in a fresh interpreter; returns (wall seconds, importtime stderr)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors[-20:]))
+    return elapsed, result.stderr
+
+def parse_importtime(output: str):
+    """Parse -X importtime lines into {module: (self_us, cumulative_us)}"""
+    costs = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            costs[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return costs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget", type=float, default=None, help="fail if median import time exceeds this (seconds)")
+    args = parser.parse_args()
+
+    timings = []
+    costs = {}
+    for _ in range(args.runs):
+        elapsed, output = import_once(args.module)
+        timings.append(elapsed)
+        costs = parse_importtime(output)
+
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s over {args.runs} runs")
+    print()
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    ranked = sorted(costs.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in ranked[:args.top]:
+        print(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {name}")
+
+    if args.budget is not None and median > args.budget:
+        print(f"\nFAIL: median import time {median:.3f}s exceeds budget {args.budget:.3f}s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
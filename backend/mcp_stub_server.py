@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Local stub MCP server for offline development and testing
+
+Speaks the same HTTP surface the backend uses with the Go MCP servers:
+  GET  /health          - readiness probe
+  POST /jsonrpc         - tools/call, with progress notifications for progressToken
+  GET  /notifications   - newline-delimited JSON notification stream
+  GET  /files/{name}    - placeholder media for returned URLs
+
+Usage: python mcp_stub_server.py --server veo --port 8081 [--delay 0.2] [--fail-after N]
+
+Enable it for the whole backend with MCP_STUB_SERVERS=true.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import uuid
+
+from aiohttp import web
+
+def tool_result(server: str, tool: str, base_url: str, arguments: dict) -> dict:
+    """Fake tool output in the shape MCPMediaService expects"""
+    if tool in ("veo_t2v", "veo_i2v"):
+        return {"video_url": f"{base_url}/files/{uuid.uuid4().hex}.mp4"}
+    if tool == "imagen_t2i":
+        count = int(arguments.get("num_images", 1))
+        return {"image_urls": [f"{base_url}/files/{uuid.uuid4().hex}.png" for _ in range(count)]}
+    if tool == "lyria_generate_music":
+        return {"music_url": f"{base_url}/files/{uuid.uuid4().hex}.mp3"}
+    if tool == "chirp_tts":
+        return {"audio_data": "UklGRgAAAABXQVZF"}
+    if tool == "list_chirp_voices":
+        return {"voices": ["en-US-Neural2-F", "en-US-Neural2-D"]}
+    if tool == "media_info":
+        return {"info": {"duration": 8.0, "width": 1280, "height": 720}}
+    return {"status": "ok", "server": server, "tool": tool}
+
+class StubMCPServer:
+    def __init__(self, server: str, port: int, delay: float, fail_after: int):
+        self.server = server
+        self.port = port
+        self.delay = delay
+        self.fail_after = fail_after
+        self.calls = 0
+        self.subscribers = set()
+
+    async def publish(self, notification: dict):
+        line = (json.dumps(notification) + "\n").encode()
+        for queue in list(self.subscribers):
+            queue.put_nowait(line)
+
+    async def health(self, request):
+        return web.json_response({"status": "healthy", "server": self.server})
+
+    async def jsonrpc(self, request):
+        body = await request.json()
+        params = body.get("params", {})
+        tool = params.get("name")
+        arguments = params.get("arguments", {})
+        self.calls += 1
+        if self.fail_after and self.calls > self.fail_after:
+            # Simulate a crash so the supervisor's restart path can be exercised
+            os._exit(1)
+
+        token = arguments.get("progressToken")
+        if token:
+            for progress in (10, 35, 60, 85, 100):
+                await asyncio.sleep(self.delay)
+                await self.publish({
+                    "jsonrpc": "2.0",
+                    "method": "notifications/progress",
+                    "params": {
+                        "progressToken": token,
+                        "progress": progress,
+                        "status": "processing" if progress < 100 else "completed",
+                        "message": f"{self.server} {tool}: {progress}%"
+                    }
+                })
+
+        base_url = f"http://localhost:{self.port}"
+        return web.json_response({
+            "jsonrpc": "2.0",
+            "id": body.get("id"),
+            "result": tool_result(self.server, tool, base_url, arguments)
+        })
+
+    async def notifications(self, request):
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        queue = asyncio.Queue()
+        self.subscribers.add(queue)
+        try:
+            while True:
+                await response.write(await queue.get())
+        finally:
+            self.subscribers.discard(queue)
+
+    async def files(self, request):
+        name = request.match_info["name"]
+        return web.Response(body=f"stub media {name}\n".encode() * 1024, content_type="application/octet-stream")
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/health", self.health)
+        app.router.add_post("/jsonrpc", self.jsonrpc)
+        app.router.add_get("/notifications", self.notifications)
+        app.router.add_get("/files/{name}", self.files)
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub MCP server")
+    parser.add_argument("--server", default="veo")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay", type=float, default=float(os.getenv("MCP_STUB_DELAY", "0.2")))
+    parser.add_argument("--fail-after", type=int, default=int(os.getenv("MCP_STUB_FAIL_AFTER", "0")))
+    args = parser.parse_args()
+
+    stub = StubMCPServer(args.server, args.port, args.delay, args.fail_after)
+    print(f"Stub MCP server '{args.server}' listening on port {args.port}", flush=True)
+    web.run_app(stub.app(), host="127.0.0.1", port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
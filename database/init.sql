@@ -69,6 +69,36 @@ CREATE TABLE IF NOT EXISTS movie_scenes (
     UNIQUE(project_id, scene_number)
 );
 
+-- Movie maker state that the application keeps alongside the base schema
+-- Project, scene and owner ids are application strings (e.g. the development user "user-1"), not UUIDs
+ALTER TABLE movie_scenes DROP CONSTRAINT IF EXISTS movie_scenes_project_id_fkey;
+ALTER TABLE movie_projects DROP CONSTRAINT IF EXISTS movie_projects_user_id_fkey;
+ALTER TABLE movie_projects ALTER COLUMN id DROP DEFAULT;
+ALTER TABLE movie_projects ALTER COLUMN id TYPE VARCHAR(255) USING id::text;
+ALTER TABLE movie_projects ALTER COLUMN user_id TYPE VARCHAR(255) USING user_id::text;
+ALTER TABLE movie_scenes ALTER COLUMN id DROP DEFAULT;
+ALTER TABLE movie_scenes ALTER COLUMN id TYPE VARCHAR(255) USING id::text;
+ALTER TABLE movie_scenes ALTER COLUMN project_id TYPE VARCHAR(255) USING project_id::text;
+ALTER TABLE movie_scenes ADD CONSTRAINT movie_scenes_project_id_fkey
+    FOREIGN KEY (project_id) REFERENCES movie_projects(id) ON DELETE CASCADE;
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS preset VARCHAR(50);
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS max_clips INTEGER DEFAULT 10;
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS budget DOUBLE PRECISION DEFAULT 5.0;
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS render_mode VARCHAR(20);
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS progress INTEGER DEFAULT 0;
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS script TEXT;
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS thumbnail_path TEXT;
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS error_message TEXT;
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS production_owner VARCHAR(255);
+ALTER TABLE movie_projects ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP;
+ALTER TABLE movie_scenes ADD COLUMN IF NOT EXISTS title VARCHAR(255);
+ALTER TABLE movie_scenes ADD COLUMN IF NOT EXISTS description TEXT;
+ALTER TABLE movie_scenes ADD COLUMN IF NOT EXISTS continuity TEXT;
+ALTER TABLE movie_scenes ADD COLUMN IF NOT EXISTS continuity_required BOOLEAN DEFAULT FALSE;
+ALTER TABLE movie_scenes ADD COLUMN IF NOT EXISTS continuity_frame TEXT;
+ALTER TABLE movie_scenes ADD COLUMN IF NOT EXISTS reference_frame TEXT;
+ALTER TABLE movie_scenes ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 0;
+
 -- API usage tracking
 CREATE TABLE IF NOT EXISTS api_usage (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -99,6 +129,7 @@ CREATE INDEX IF NOT EXISTS idx_video_generations_status ON video_generations(sta
 CREATE INDEX IF NOT EXISTS idx_video_generations_created_at ON video_generations(created_at);
 CREATE INDEX IF NOT EXISTS idx_movie_projects_user_id ON movie_projects(user_id);
 CREATE INDEX IF NOT EXISTS idx_movie_projects_status ON movie_projects(status);
+CREATE INDEX IF NOT EXISTS idx_movie_projects_created_at ON movie_projects(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_movie_scenes_project_id ON movie_scenes(project_id);
 CREATE INDEX IF NOT EXISTS idx_movie_scenes_status ON movie_scenes(status);
 CREATE INDEX IF NOT EXISTS idx_api_usage_user_id ON api_usage(user_id);